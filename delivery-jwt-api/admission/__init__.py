@@ -0,0 +1,31 @@
+from .limiter import ConcurrencyLimiter, Overloaded, TokenBuckets
+
+from runtime import declareState, WORKER
+from config import ADMISSION_LIMITS, LOGIN_USERNAME_BUCKET, LOGIN_ADDRESS_BUCKET, \
+        LOGIN_BUCKETS_MAX_KEYS
+
+
+limiters = {
+    name: ConcurrencyLimiter(
+        name, limit["concurrency"], limit["queue"], limit["deadline"].total_seconds()
+    )
+    for name, limit in ADMISSION_LIMITS.items()
+}
+loginByUsername = TokenBuckets(
+    LOGIN_USERNAME_BUCKET["capacity"],
+    LOGIN_USERNAME_BUCKET["refill"].total_seconds(),
+    LOGIN_BUCKETS_MAX_KEYS
+)
+loginByAddress = TokenBuckets(
+    LOGIN_ADDRESS_BUCKET["capacity"],
+    LOGIN_ADDRESS_BUCKET["refill"].total_seconds(),
+    LOGIN_BUCKETS_MAX_KEYS
+)
+declareState(
+    "admission.limiters", WORKER,
+    "ADMISSION_LIMITS apply to each worker, the host admits workers times more"
+)
+declareState(
+    "admission.loginBuckets", WORKER,
+    "login buckets are counted per worker, the host allows workers times the login rate"
+)
@@ -0,0 +1,141 @@
+from asyncio import CancelledError, Future, get_running_loop, wait_for, \
+        TimeoutError as AsyncTimeoutError
+from collections import deque, OrderedDict
+from time import monotonic
+
+from typing import Deque, Hashable, Tuple
+
+
+class Overloaded(Exception):
+    """Запрос отклонен, повторить можно через retry_after секунд"""
+
+    def __init__(self, message: str, reason: str, retry_after: float):
+        """
+        :param message: Причина отказа
+        :type message: str
+        :param reason: Код причины для метрик: "queue_full" или "deadline"
+        :type reason: str
+        :param retry_after: Через сколько секунд повторить запрос
+        :type retry_after: float
+        """
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Ограничение одновременных запросов с ограниченной очередью ожидания
+
+    Свободный слот передается первому ожидающему в порядке очереди.
+    Запрос отклоняется сразу, если очередь заполнена, и по истечении
+    deadline, если слот за это время не освободился.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, deadline: float):
+        """
+        :param name: Класс маршрутов, для сообщений и метрик
+        :type name: str
+        :param concurrency: Максимум одновременных запросов
+        :type concurrency: int
+        :param queue_size: Максимум запросов в очереди
+        :type queue_size: int
+        :param deadline: Максимальное время ожидания в очереди в секундах
+        :type deadline: float
+        """
+        self.name = name
+        self.concurrency = concurrency
+        self.queueSize = queue_size
+        self.deadline = deadline
+        self.active = 0
+        self._waiters: Deque[Future] = deque()
+
+    async def acquire(self) -> None:
+        """Занимает слот, при необходимости ожидая в очереди
+
+        :raises Overloaded: Если очередь заполнена или истек deadline
+        """
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queueSize:
+            raise Overloaded(f"Too many {self.name} requests in queue", "queue_full", self.deadline)
+        waiter = get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await wait_for(waiter, self.deadline)
+        except CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        except AsyncTimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return
+            raise Overloaded(
+                f"{self.name.capitalize()} request waited longer than {self.deadline:g}s",
+                "deadline",
+                self.deadline
+            ) from None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        """Освобождает слот, передавая его первому ожидающему"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @property
+    def queued(self) -> int:
+        """Количество запросов в очереди"""
+        return len(self._waiters)
+
+
+class TokenBuckets:
+    """Token bucket для каждого ключа, например имени пользователя или IP
+
+    Бакет вмещает capacity токенов и пополняется на один токен каждые
+    refill секунд. Хранится не больше max_keys бакетов, давно не
+    использованные вытесняются: их бакет все равно был бы полным.
+    """
+
+    def __init__(self, capacity: int, refill: float, max_keys: int):
+        """
+        :param capacity: Размер бакета
+        :type capacity: int
+        :param refill: Секунд на один токен
+        :type refill: float
+        :param max_keys: Максимум хранимых бакетов
+        :type max_keys: int
+        """
+        self.capacity = capacity
+        self.refill = refill
+        self._maxKeys = max_keys
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: Hashable) -> float:
+        """Забирает токен из бакета ключа
+
+        :param key: Ключ бакета
+        :type key: Hashable
+        :return: 0, если токен получен, иначе через сколько секунд появится следующий
+        :rtype: float
+        """
+        now = monotonic()
+        tokens, updated = self._buckets.pop(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) / self.refill)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) * self.refill
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self._maxKeys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
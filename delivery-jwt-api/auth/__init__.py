@@ -1 +1,5 @@
-from .jwt import verifyToken, createTokens
\ No newline at end of file
+from .jwt import verifyToken, createTokens, issueTokens, clearTokenCache, keyRing
+from .keys import KeyRing, SigningKey
+from .hashing import PasswordHasher, HashingQueueFull
+from .passwords import calibratePasswordHash
+from .revocation import RevocationIndex, revocationIndex, REVOCATIONS_TOPIC
\ No newline at end of file
@@ -0,0 +1,120 @@
+from asyncio import Semaphore, get_running_loop
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from time import perf_counter
+
+from typing import Any, Callable, Dict, Optional
+
+from metrics import passwordHashLatency, recordPhase
+from .passwords import checkPasswordHash, hashAlgorithm, makePasswordHash, needsRehash
+
+
+class HashingQueueFull(Exception):
+    """Очередь на хеширование паролей переполнена"""
+
+
+class PasswordHasher:
+    """Асинхронное хеширование паролей в пуле воркеров
+
+    Хеширование выполняется вне event loop, количество ожидающих задач ограничено.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        queue_size: int,
+        executor: str = "thread",
+        algorithm: str = "scrypt",
+        params: Optional[Dict[str, int]] = None
+    ):
+        """
+        :param workers: Количество воркеров пула
+        :type workers: int
+        :param queue_size: Максимум задач, ожидающих свободного воркера
+        :type queue_size: int
+        :param executor: Тип пула: "thread" или "process", defaults to "thread"
+        :type executor: str, optional
+        :param algorithm: Алгоритм для новых хешей, defaults to "scrypt"
+        :type algorithm: str, optional
+        :param params: Параметры алгоритма, defaults to None
+        :type params: Optional[Dict[str, int]], optional
+        """
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor type: {executor}")
+        self._workers = workers
+        self._kind = executor
+        self._executor: Executor = None
+        self._slots = Semaphore(workers + queue_size)
+        self.algorithm = algorithm
+        self.params = params or {"n": 2 ** 14, "r": 8, "p": 1}
+
+    def _getExecutor(self) -> Executor:
+        if self._executor is None:
+            if self._kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="hasher"
+                )
+        return self._executor
+
+    async def _submit(self, algorithm: str, func: Callable[..., Any], *args: Any) -> Any:
+        if self._slots.locked():
+            raise HashingQueueFull("Password hashing queue is full")
+        started = perf_counter()
+        try:
+            async with self._slots:
+                submitted = perf_counter()
+                try:
+                    return await get_running_loop().run_in_executor(
+                        self._getExecutor(), func, *args
+                    )
+                finally:
+                    passwordHashLatency.observe(perf_counter() - submitted, algorithm)
+        finally:
+            recordPhase("hash", perf_counter() - started)
+
+    async def hash(self, password: str) -> str:
+        """Вычисляет хеш пароля в пуле воркеров
+
+        :param password: Пароль пользователя
+        :type password: str
+        :raises HashingQueueFull: Если очередь переполнена
+        :return: Хеш пароля в формате algorithm$params$salt$hash
+        :rtype: str
+        """
+        return await self._submit(
+            self.algorithm, makePasswordHash, password, self.algorithm, self.params
+        )
+
+    async def verify(self, password: str, hashed: str, salt: Optional[str] = None) -> bool:
+        """Проверяет пароль в пуле воркеров за постоянное время
+
+        :param password: Пароль пользователя
+        :type password: str
+        :param hashed: Сохраненный хеш пароля
+        :type hashed: str
+        :param salt: Salt для хеша в старом формате, defaults to None
+        :type salt: Optional[str], optional
+        :raises HashingQueueFull: Если очередь переполнена
+        :return: True если пароль верный
+        :rtype: bool
+        """
+        return await self._submit(
+            hashAlgorithm(hashed), checkPasswordHash, password, hashed, salt
+        )
+
+    def needsRehash(self, hashed: str) -> bool:
+        """Проверяет, нужно ли пересчитать хеш с текущими настройками
+
+        :param hashed: Сохраненный хеш пароля
+        :type hashed: str
+        :return: True если хеш устарел
+        :rtype: bool
+        """
+        return needsRehash(hashed, self.algorithm, self.params)
+
+    def shutdown(self) -> None:
+        """Останавливает пул воркеров"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
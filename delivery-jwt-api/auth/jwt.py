@@ -6,43 +6,127 @@ from jwt import (
 )
 from fastapi import HTTPException, status
 from datetime import datetime, timezone
+from hashlib import blake2b
+from time import time, perf_counter
+from uuid import uuid4
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
-from config import ACCESS_EXPIRE, ALGORITHM, SECRET_KEY_JWT 
+from cache import LRUCache
+from metrics import jwtVerifyLatency, recordPhase
+from runtime import declareState, WORKER
+from config import ACCESS_EXPIRE, TOKEN_CACHE_SIZE, JWT_KEYS, JWT_ACTIVE_KID, \
+        REFRESH_EXPIRE
+from .keys import KeyRing
 
 
-def createTokens(username: str) -> Dict[str, str]:
-    """Создает JWT токен доступа для аутентификации пользователя
+tokenCache = LRUCache(TOKEN_CACHE_SIZE)
+declareState("tokenCache", WORKER, "verified token payloads, each worker verifies a token once")
+keyRing = KeyRing.fromConfig(JWT_KEYS, JWT_ACTIVE_KID)
 
-    :param username: Имя пользователя для включения в токен
+
+def _tokenDigest(token: str) -> bytes:
+    """Ключ кэша токенов, зависящий от набора ключей подписи
+
+    После ротации ключей старые записи перестают совпадать.
+    """
+    return blake2b(token.encode(), key=keyRing.fingerprint, digest_size=16).digest()
+
+def clearTokenCache() -> None:
+    """Очищает кэш проверенных токенов"""
+    tokenCache.clear()
+
+
+def _sign(payload: Dict[str, Any]) -> str:
+    return encode(
+        payload,
+        keyRing.active.signingKey,
+        keyRing.active.algorithm,
+        headers=keyRing.signingHeaders()
+    )
+
+def issueTokens(
+    username: str,
+    family: Optional[str] = None
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Создает пару access и refresh токенов, подписанных активным ключом
+
+    Оба токена получают собственный jti и общий идентификатор семейства fam,
+    по которому отзывается вся цепочка ротаций refresh токена.
+
+    :param username: Имя пользователя для включения в токены
     :type username: str
-    :return: Словарь с токеном JWT
-    :rtype: Dict[str, str]
+    :param family: Семейство refresh токенов, defaults to None (новое семейство)
+    :type family: Optional[str], optional
+    :return: Словарь с токенами и payload refresh токена
+    :rtype: Tuple[Dict[str, str], Dict[str, Any]]
     """
+    family = family or uuid4().hex
+    now = datetime.now(timezone.utc)
     access_payload = {
         "type": "access",
         "sub": username,
-        "exp": datetime.now(timezone.utc) + ACCESS_EXPIRE
+        "jti": uuid4().hex,
+        "fam": family,
+        "exp": now + ACCESS_EXPIRE
     }
-    
-    return {
-        "access_token": encode(access_payload, SECRET_KEY_JWT, ALGORITHM)
+    refresh_payload = {
+        "type": "refresh",
+        "sub": username,
+        "jti": uuid4().hex,
+        "fam": family,
+        "exp": int((now + REFRESH_EXPIRE).timestamp())
+    }
+    tokens = {
+        "access_token": _sign(access_payload),
+        "refresh_token": _sign(refresh_payload)
     }
+    return tokens, refresh_payload
+
+def createTokens(username: str) -> Dict[str, str]:
+    """Создает JWT токены доступа и обновления для аутентификации пользователя
+
+    :param username: Имя пользователя для включения в токен
+    :type username: str
+    :return: Словарь с токенами JWT
+    :rtype: Dict[str, str]
+    """
+    return issueTokens(username)[0]
+
+def _observeVerify(started: float, cache: str) -> None:
+    elapsed = perf_counter() - started
+    jwtVerifyLatency.observe(elapsed, cache)
+    recordPhase("jwt", elapsed)
 
 def verifyToken(token: str) -> Dict[str, Any]:
     """Проверяет и декодирует JWT токен
 
+    Ключ проверки выбирается по kid из заголовка токена,
+    проверенные токены кэшируются до их exp. Отзыв не сбрасывает кэш:
+    jti и fam проверяются по revocationIndex после проверки подписи.
+
     :param token: JWT токен для верификации
     :type token: str
     :raises HTTPException: Если токен просрочен или невалиден
     :return: Декодированный payload
     :rtype: Dict[str, Any]
     """
+    started = perf_counter()
+    digest = _tokenDigest(token)
+    payload = tokenCache.get(digest)
+    if payload is not None:
+        _observeVerify(started, "hit")
+        return dict(payload)
     try:
-        payload = decode(token, SECRET_KEY_JWT, algorithms=[ALGORITHM])
-        return payload
+        key = keyRing.keyFor(token)
+        payload = decode(token, key.verifyingKey, algorithms=[key.algorithm])
+        expires = payload.get("exp")
+        if expires is not None:
+            tokenCache.set(digest, payload, expires - time())
+        return dict(payload)
     except ExpiredSignatureError:
         raise HTTPException(detail="Token expired", status_code=status.HTTP_400_BAD_REQUEST)
     except InvalidTokenError:
-        raise HTTPException(detail="Invalid token", status_code=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        raise HTTPException(detail="Invalid token", status_code=status.HTTP_400_BAD_REQUEST)
+    finally:
+        _observeVerify(started, "miss")
\ No newline at end of file
@@ -0,0 +1,149 @@
+from jwt import get_unverified_header, InvalidTokenError
+from jwt.algorithms import get_default_algorithms, requires_cryptography
+from hashlib import sha256
+
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class SigningKey:
+    """Ключ подписи JWT с идентификатором kid"""
+
+    def __init__(
+        self,
+        kid: str,
+        algorithm: str,
+        secret: Optional[str] = None,
+        private_key: Optional[str] = None,
+        public_key: Optional[str] = None
+    ):
+        """
+        :param kid: Идентификатор ключа в заголовке токена
+        :type kid: str
+        :param algorithm: Алгоритм подписи (HS256, RS256, EdDSA, ...)
+        :type algorithm: str
+        :param secret: Общий секрет для HS* алгоритмов, defaults to None
+        :type secret: Optional[str], optional
+        :param private_key: Закрытый ключ в формате PEM, defaults to None
+        :type private_key: Optional[str], optional
+        :param public_key: Открытый ключ в формате PEM, defaults to None
+        :type public_key: Optional[str], optional
+        :raises ValueError: Если ключ не подходит для алгоритма
+        """
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms:
+            if algorithm in requires_cryptography:
+                raise ValueError(
+                    f"Algorithm {algorithm} requires the cryptography package: "
+                    "pip install \"pyjwt[crypto]\""
+                )
+            raise ValueError(f"Unknown JWT algorithm: {algorithm}")
+        self.kid = kid
+        self.algorithm = algorithm
+        self.symmetric = algorithm.startswith("HS")
+        handler = algorithms[algorithm]
+        if self.symmetric:
+            if not secret:
+                raise ValueError(f"Key {kid}: secret is required for {algorithm}")
+            self.signingKey = self.verifyingKey = secret
+            self._material = secret.encode()
+        else:
+            if not private_key and not public_key:
+                raise ValueError(f"Key {kid}: private_key or public_key is required")
+            self.signingKey = handler.prepare_key(private_key) if private_key else None
+            self.verifyingKey = self.signingKey.public_key() if self.signingKey is not None \
+                else handler.prepare_key(public_key)
+            self._material = (private_key or public_key).encode()
+        self._handler = handler
+
+    @property
+    def canSign(self) -> bool:
+        return self.signingKey is not None
+
+    def fingerprint(self) -> bytes:
+        return sha256(self.kid.encode() + b"\0" + self.algorithm.encode() + b"\0" + self._material).digest()
+
+    def jwk(self) -> Dict[str, Any]:
+        """Открытый ключ в формате JWK
+
+        :return: JWK со значениями kid, alg и use
+        :rtype: Dict[str, Any]
+        """
+        jwk = self._handler.to_jwk(self.verifyingKey, as_dict=True)
+        jwk.update({"kid": self.kid, "alg": self.algorithm, "use": "sig"})
+        return jwk
+
+
+class KeyRing:
+    """Набор ключей подписи JWT: один активный и несколько принимаемых при ротации"""
+
+    def __init__(self, keys: Iterable[SigningKey], active_kid: str):
+        """
+        :param keys: Ключи, токены которых принимаются
+        :type keys: Iterable[SigningKey]
+        :param active_kid: kid ключа для подписи новых токенов
+        :type active_kid: str
+        :raises ValueError: Если активный ключ не найден или не может подписывать
+        """
+        self._keys = {key.kid: key for key in keys}
+        active = self._keys.get(active_kid)
+        if active is None or not active.canSign:
+            raise ValueError(f"Active key {active_kid} is missing or has no signing key")
+        self.active = active
+        self.fingerprint = sha256(
+            b"".join(key.fingerprint() for key in self._keys.values())
+        ).digest()
+
+    @classmethod
+    def fromConfig(cls, keys: List[Dict[str, str]], active_kid: str) -> "KeyRing":
+        """Создает набор ключей из конфигурации
+
+        Ключи задаются словарями с kid, algorithm и secret либо путями
+        private_key_file / public_key_file к PEM файлам.
+
+        :param keys: Описание ключей
+        :type keys: List[Dict[str, str]]
+        :param active_kid: kid активного ключа
+        :type active_kid: str
+        :return: Набор ключей
+        :rtype: KeyRing
+        """
+        loaded = []
+        for item in keys:
+            options = dict(item)
+            for name in ("private_key", "public_key"):
+                path = options.pop(f"{name}_file", None)
+                if path:
+                    with open(path) as file:
+                        options[name] = file.read()
+            loaded.append(SigningKey(**options))
+        return cls(loaded, active_kid)
+
+    def signingHeaders(self) -> Dict[str, str]:
+        return {"kid": self.active.kid}
+
+    def keyFor(self, token: str) -> SigningKey:
+        """Выбирает ключ проверки по kid из заголовка токена
+
+        Токены без kid проверяются активным ключом.
+
+        :param token: JWT токен
+        :type token: str
+        :raises InvalidTokenError: Если kid неизвестен
+        :return: Ключ проверки
+        :rtype: SigningKey
+        """
+        kid = get_unverified_header(token).get("kid")
+        if kid is None:
+            return self.active
+        key = self._keys.get(kid)
+        if key is None:
+            raise InvalidTokenError(f"Unknown key id: {kid}")
+        return key
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Открытые ключи в формате JWKS, общие секреты не публикуются
+
+        :return: Документ JWKS
+        :rtype: Dict[str, List[Dict[str, Any]]]
+        """
+        return {"keys": [key.jwk() for key in self._keys.values() if not key.symmetric]}
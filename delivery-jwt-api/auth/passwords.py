@@ -0,0 +1,163 @@
+from hashlib import pbkdf2_hmac, scrypt
+from hmac import compare_digest
+from os import urandom
+from time import perf_counter
+
+from typing import Any, Dict, Optional, Tuple
+
+from misc import hashPassword
+
+
+SCRYPT = "scrypt"
+PBKDF2_SHA256 = "pbkdf2_sha256"
+LEGACY = "pbkdf2_legacy"
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+
+def _derive(algorithm: str, params: Dict[str, int], password: str, salt: bytes) -> bytes:
+    if algorithm == SCRYPT:
+        n, r, p = params["n"], params["r"], params["p"]
+        return scrypt(
+            password.encode('utf-8'),
+            salt=salt,
+            n=n,
+            r=r,
+            p=p,
+            maxmem=256 * n * r * p,
+            dklen=KEY_SIZE
+        )
+    if algorithm == PBKDF2_SHA256:
+        return pbkdf2_hmac(
+            'sha256',
+            password.encode('utf-8'),
+            salt,
+            params["i"],
+            dklen=KEY_SIZE
+        )
+    raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+
+def _parse(hashed: str) -> Tuple[str, Dict[str, int], bytes, bytes]:
+    algorithm, params, salt, key = hashed.split("$")
+    return (
+        algorithm,
+        {k: int(v) for k, v in (item.split("=") for item in params.split(","))},
+        bytes.fromhex(salt),
+        bytes.fromhex(key)
+    )
+
+def isLegacyHash(hashed: str) -> bool:
+    """Проверяет, сохранен ли хеш в старом формате без параметров
+
+    :param hashed: Хеш пароля из базы данных
+    :type hashed: str
+    :return: True для хеша в старом формате
+    :rtype: bool
+    """
+    return "$" not in hashed
+
+def hashAlgorithm(hashed: str) -> str:
+    """Возвращает алгоритм сохраненного хеша для метрик
+
+    :param hashed: Хеш пароля из базы данных
+    :type hashed: str
+    :return: Алгоритм хеша, pbkdf2_legacy для старого формата
+    :rtype: str
+    """
+    if isLegacyHash(hashed):
+        return LEGACY
+    return hashed.split("$", 1)[0]
+
+def makePasswordHash(password: str, algorithm: str, params: Dict[str, int]) -> str:
+    """Вычисляет хеш пароля в формате algorithm$params$salt$hash
+
+    :param password: Пароль пользователя
+    :type password: str
+    :param algorithm: Алгоритм: scrypt или pbkdf2_sha256
+    :type algorithm: str
+    :param params: Параметры алгоритма (n, r, p для scrypt, i для pbkdf2_sha256)
+    :type params: Dict[str, int]
+    :return: Хеш пароля
+    :rtype: str
+    """
+    salt = urandom(SALT_SIZE)
+    key = _derive(algorithm, params, password, salt)
+    encoded = ",".join(f"{k}={v}" for k, v in sorted(params.items()))
+    return f"{algorithm}${encoded}${salt.hex()}${key.hex()}"
+
+def checkPasswordHash(password: str, hashed: str, salt: Optional[str] = None) -> bool:
+    """Проверяет пароль за постоянное время
+
+    Хеши в старом формате проверяются через misc.hashPassword с salt из базы.
+
+    :param password: Пароль пользователя
+    :type password: str
+    :param hashed: Сохраненный хеш пароля
+    :type hashed: str
+    :param salt: Salt для хеша в старом формате, defaults to None
+    :type salt: Optional[str], optional
+    :return: True если пароль верный
+    :rtype: bool
+    """
+    if isLegacyHash(hashed):
+        if salt is None:
+            return False
+        return compare_digest(hashPassword(password, salt), hashed)
+    try:
+        algorithm, params, raw_salt, key = _parse(hashed)
+    except ValueError:
+        return False
+    return compare_digest(_derive(algorithm, params, password, raw_salt), key)
+
+def needsRehash(hashed: str, algorithm: str, params: Dict[str, int]) -> bool:
+    """Проверяет, отличается ли хеш от текущих настроек
+
+    :param hashed: Сохраненный хеш пароля
+    :type hashed: str
+    :param algorithm: Текущий алгоритм
+    :type algorithm: str
+    :param params: Текущие параметры алгоритма
+    :type params: Dict[str, int]
+    :return: True если хеш нужно пересчитать
+    :rtype: bool
+    """
+    if isLegacyHash(hashed):
+        return True
+    try:
+        current, current_params, _, _ = _parse(hashed)
+    except ValueError:
+        return True
+    return current != algorithm or current_params != params
+
+def calibratePasswordHash(
+    algorithm: str,
+    target: float,
+    base: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Подбирает параметры алгоритма под целевое время проверки пароля
+
+    Стоимость удваивается, пока одно вычисление не займет не меньше target.
+
+    :param algorithm: Алгоритм: scrypt или pbkdf2_sha256
+    :type algorithm: str
+    :param target: Целевое время одного вычисления в секундах
+    :type target: float
+    :param base: Начальные параметры, defaults to None
+    :type base: Optional[Dict[str, int]], optional
+    :return: Параметры и измеренное время вычисления
+    :rtype: Dict[str, Any]
+    """
+    if algorithm == SCRYPT:
+        params, cost = dict(base or {"n": 2 ** 10, "r": 8, "p": 1}), "n"
+    elif algorithm == PBKDF2_SHA256:
+        params, cost = dict(base or {"i": 10000}), "i"
+    else:
+        raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+    salt = urandom(SALT_SIZE)
+    while True:
+        started = perf_counter()
+        _derive(algorithm, params, "calibration", salt)
+        elapsed = perf_counter() - started
+        if elapsed >= target:
+            return {"algorithm": algorithm, "params": params, "seconds": elapsed}
+        params[cost] *= 2
@@ -0,0 +1,156 @@
+from hashlib import blake2b
+from heapq import heappop, heappush
+from time import time
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES
+from runtime import declareState, SHARED
+
+
+REVOCATIONS_TOPIC = "revocations"
+
+
+class BloomFilter:
+    """Фильтр Блума: быстрый отрицательный ответ без обращения к точному набору"""
+
+    def __init__(self, bits: int, hashes: int):
+        """
+        :param bits: Размер фильтра в битах
+        :type bits: int
+        :param hashes: Количество хеш-функций
+        :type hashes: int
+        """
+        self._bits = bits
+        self._hashes = hashes
+        self._array = bytearray((bits + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = blake2b(item.encode(), digest_size=8 * self._hashes).digest()
+        for index in range(self._hashes):
+            yield int.from_bytes(digest[index * 8:(index + 1) * 8], "little") % self._bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class RevocationIndex:
+    """Набор отозванных jti и семейств refresh токенов с истечением по exp
+
+    Проверка выполняется за O(1) без обращения к базе данных, истекшие
+    записи удаляются по мере добавления и проверки.
+    """
+
+    def __init__(self, bloom_bits: int = 0, bloom_hashes: int = 4):
+        """
+        :param bloom_bits: Размер фильтра Блума в битах, 0 отключает фильтр, defaults to 0
+        :type bloom_bits: int, optional
+        :param bloom_hashes: Количество хеш-функций фильтра, defaults to 4
+        :type bloom_hashes: int, optional
+        """
+        self._revoked: Dict[str, float] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        self._bloomBits = bloom_bits
+        self._bloomHashes = bloom_hashes
+        self._bloom: Optional[BloomFilter] = None
+        self._rebuildBloom()
+
+    def _rebuildBloom(self) -> None:
+        self._bloomStale = 0
+        if not self._bloomBits:
+            return
+        self._bloom = BloomFilter(self._bloomBits, self._bloomHashes)
+        for jti in self._revoked:
+            self._bloom.add(jti)
+
+    def _purge(self, now: float) -> None:
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, jti = heappop(self._expiry)
+            if self._revoked.get(jti) == expires:
+                del self._revoked[jti]
+                removed += 1
+        if removed and self._bloom is not None:
+            self._bloomStale += removed
+            if self._bloomStale > len(self._revoked):
+                self._rebuildBloom()
+
+    def add(self, jti: str, expires: float) -> None:
+        """Отзывает идентификатор до момента expires
+
+        :param jti: jti токена или идентификатор семейства
+        :type jti: str
+        :param expires: Время истечения в секундах Unix
+        :type expires: float
+        """
+        now = time()
+        self._purge(now)
+        if expires <= now or expires <= self._revoked.get(jti, 0):
+            return
+        self._revoked[jti] = expires
+        heappush(self._expiry, (expires, jti))
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    def load(self, entries: Iterable[Tuple[str, float]]) -> None:
+        """Заменяет содержимое индекса сохраненными записями
+
+        :param entries: Пары (идентификатор, время истечения)
+        :type entries: Iterable[Tuple[str, float]]
+        """
+        self._revoked.clear()
+        self._expiry.clear()
+        self._rebuildBloom()
+        for jti, expires in entries:
+            self.add(jti, expires)
+
+    def isRevoked(self, jti: Optional[str]) -> bool:
+        """Проверяет, отозван ли идентификатор
+
+        :param jti: jti токена или идентификатор семейства
+        :type jti: Optional[str]
+        :return: True если идентификатор отозван
+        :rtype: bool
+        """
+        if jti is None:
+            return False
+        if self._bloom is not None and jti not in self._bloom:
+            return False
+        expires = self._revoked.get(jti)
+        if expires is None:
+            return False
+        now = time()
+        if expires <= now:
+            self._purge(now)
+            return False
+        return True
+
+    async def follow(self, subscription: Any) -> None:
+        """Добавляет отзывы, опубликованные другими воркерами, до отмены задачи
+
+        :param subscription: Подписка брокера событий на REVOCATIONS_TOPIC,
+            событие - словарь {jti: время истечения}
+        :type subscription: Any
+        """
+        while True:
+            for event in await subscription.get():
+                for jti, expires in event.items():
+                    self.add(jti, expires)
+
+    def __len__(self) -> int:
+        return len(self._revoked)
+
+
+revocationIndex = RevocationIndex(REVOCATION_BLOOM_BITS, REVOCATION_BLOOM_HASHES)
+declareState(
+    "revocationIndex", SHARED,
+    "loaded from revoked_tokens at startup, new revocations arrive through the events broker "
+    "(needs EVENTS_BROKER = \"unix\" with several workers)"
+)
@@ -0,0 +1,396 @@
+"""Нагрузочный бенчмарк основных эндпоинтов: пропускная способность и p50/p95/p99
+
+Приложение вызывается напрямую через ASGI, без сети, с временной базой SQLite.
+Виртуальные пользователи (--concurrency) выполняют запросы из смеси --mix:
+    default  - вход, создание и чтение заказов, обновление доставок
+    reads    - GET /orders/{id} и немного PATCH /deliveries/{id}
+    writes   - POST /orders и PATCH /deliveries/{id}
+    auth     - регистрация и вход, упирается в хеширование паролей
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.load --mix default --requests 5000 --concurrency 32
+    python -m benchmarks.load --save baseline-default.json
+    python -m benchmarks.load --compare baseline-default.json --threshold 0.25
+
+В режиме --compare процесс завершается с кодом 1, если пропускная способность
+упала или задержка выросла больше чем на threshold относительно baseline.
+Операции, выполненные меньше --min-count раз, сравниваются только в итоге:
+их хвостовые перцентили слишком шумные.
+"""
+from argparse import ArgumentParser
+from asyncio import gather, run
+from json import dump, dumps, load, loads
+from math import ceil
+from os.path import join
+from platform import python_version
+from random import Random
+from statistics import median as statisticsMedian
+from sys import exit
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from urllib.parse import urlencode
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+
+MIXES: Dict[str, Dict[str, int]] = {
+    "default": {"login": 2, "createOrder": 18, "getOrder": 55, "patchDelivery": 25},
+    "reads": {"getOrder": 90, "patchDelivery": 10},
+    "writes": {"createOrder": 50, "patchDelivery": 50},
+    "auth": {"register": 50, "login": 50},
+}
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+PASSWORD = "benchmark-password"
+STATUSES = ("created delivery request", "picked up", "in transit", "delivered")
+
+
+class Client:
+    """Вызывает ASGI-приложение напрямую, как это сделал бы сервер"""
+
+    def __init__(self, app: Any, address: str):
+        """
+        :param app: ASGI приложение
+        :type app: Any
+        :param address: IP клиента в scope
+        :type address: str
+        """
+        self._app = app
+        self._address = address
+        self.token: Optional[str] = None
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: bytes = b"",
+        content_type: Optional[bytes] = None
+    ) -> Tuple[int, bytes]:
+        """Выполняет запрос и возвращает статус и тело ответа
+
+        :param method: HTTP-метод
+        :type method: str
+        :param path: Путь
+        :type path: str
+        :param body: Тело запроса, defaults to b""
+        :type body: bytes, optional
+        :param content_type: Content-Type тела, defaults to None
+        :type content_type: Optional[bytes], optional
+        :return: Статус и тело ответа
+        :rtype: Tuple[int, bytes]
+        """
+        headers = [(b"host", b"benchmark")]
+        if self.token is not None:
+            headers.append((b"authorization", f"Bearer {self.token}".encode()))
+        if content_type is not None:
+            headers.append((b"content-type", content_type))
+            headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": headers,
+            "client": (self._address, 40000),
+            "server": ("benchmark", 80),
+        }
+        response: Dict[str, Any] = {"status": 500, "body": []}
+        received = False
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal received
+            if received:
+                return {"type": "http.disconnect"}
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+
+        await self._app(scope, receive, send)
+        return response["status"], b"".join(response["body"])
+
+    async def json(self, method: str, path: str, payload: Any) -> Tuple[int, bytes]:
+        return await self.request(method, path, dumps(payload).encode(), b"application/json")
+
+
+class Workload:
+    """Общее состояние виртуальных пользователей: созданные заказы и счетчик имен"""
+
+    def __init__(self, seed: int):
+        self.orders: List[int] = []
+        self.users = 0
+        self.random = Random(seed)
+
+    def username(self) -> str:
+        self.users += 1
+        return f"courier{self.users}"
+
+    async def register(self, client: Client) -> int:
+        status_code, _ = await client.json(
+            "POST", "/auth/register", {"username": self.username(), "password": PASSWORD}
+        )
+        return status_code
+
+    async def login(self, client: Client, username: Optional[str] = None) -> int:
+        username = username or f"courier{self.random.randint(1, max(self.users, 1))}"
+        status_code, body = await client.request(
+            "POST", "/auth/login",
+            urlencode({"username": username, "password": PASSWORD}).encode(),
+            b"application/x-www-form-urlencoded"
+        )
+        if status_code < 400 and client.token is None:
+            client.token = loads(body)["data"]["result"]["access_token"]
+        return status_code
+
+    async def createOrder(self, client: Client) -> int:
+        status_code, body = await client.json("POST", "/orders", {
+            "name": "Заказ",
+            "description": "Хрупкое",
+            "pickUpAddress": "Москва, ул. Тверская, 1",
+            "deliveryAddress": "Москва, ул. Арбат, 10",
+            "weight": self.random.randint(1, 50),
+            "dimensions": "30x20x10",
+        })
+        if status_code < 400:
+            self.orders.append(loads(body)["data"]["id"])
+        return status_code
+
+    async def getOrder(self, client: Client) -> int:
+        status_code, _ = await client.request("GET", f"/orders/{self.random.choice(self.orders)}")
+        return status_code
+
+    async def patchDelivery(self, client: Client) -> int:
+        status_code, _ = await client.json(
+            "PATCH", f"/deliveries/{self.random.choice(self.orders)}",
+            {"Status": self.random.choice(STATUSES)}
+        )
+        return status_code
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Перцентиль по методу ближайшего ранга
+
+    :param values: Отсортированные значения
+    :type values: Sequence[float]
+    :param fraction: Доля от 0 до 1
+    :type fraction: float
+    :return: Значение перцентиля
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, ceil(fraction * len(values)) - 1))]
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    summary = {
+        "count": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1e3 if latencies else 0.0,
+    }
+    for name, fraction in PERCENTILES:
+        summary[f"{name}_ms"] = percentile(latencies, fraction) * 1e3
+    return summary
+
+async def drive(
+    workload: Workload,
+    clients: List[Client],
+    mix: Dict[str, int],
+    requests: int
+) -> Dict[str, Any]:
+    """Выполняет requests запросов смеси mix всеми клиентами одновременно
+
+    :return: Сводка по операциям и итог
+    :rtype: Dict[str, Any]
+    """
+    names, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    errors: Dict[str, int] = {name: 0 for name in names}
+    remaining = requests
+
+    async def virtualUser(client: Client) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            name = workload.random.choices(names, weights)[0]
+            started = perf_counter()
+            status_code = await getattr(workload, name)(client)
+            latencies[name].append(perf_counter() - started)
+            if status_code >= 400:
+                errors[name] += 1
+
+    started = perf_counter()
+    await gather(*(virtualUser(client) for client in clients))
+    elapsed = perf_counter() - started
+    every = [value for values in latencies.values() for value in values]
+    return {
+        "total": summarize(every, sum(errors.values()), elapsed),
+        "operations": {
+            name: summarize(values, errors[name], elapsed)
+            for name, values in latencies.items()
+            if values
+        },
+    }
+
+def median(rounds: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Медиана каждой метрики по раундам, отдельно для итога и операций"""
+    def combine(summaries: List[Dict[str, float]]) -> Dict[str, float]:
+        return {key: statisticsMedian([summary[key] for summary in summaries]) for key in summaries[0]}
+
+    names = [name for name in rounds[0]["operations"] if all(name in r["operations"] for r in rounds)]
+    return {
+        "total": combine([r["total"] for r in rounds]),
+        "operations": {name: combine([r["operations"][name] for r in rounds]) for name in names},
+    }
+
+async def benchmark(
+    mix: str,
+    requests: int,
+    concurrency: int,
+    orders: int,
+    warmup: int,
+    seed: int,
+    admission: bool,
+    rounds: int
+) -> Dict[str, Any]:
+    """Поднимает приложение на временной базе и измеряет смесь запросов
+
+    Замер повторяется rounds раз, каждая метрика - медиана по раундам.
+
+    :return: Результаты в формате baseline
+    :rtype: Dict[str, Any]
+    """
+    with TemporaryDirectory(prefix="delivery-load-") as directory:
+        config.DATABASE_URL = f"sqlite+aiosqlite:///{join(directory, 'load.db')}"
+        config.DATABASE_READ_URL = None
+        config.DELIVERY_WRITE_BUFFER = False
+        if not admission:
+            config.ADMISSION_LIMITS = {}
+            config.LOGIN_USERNAME_BUCKET = dict(config.LOGIN_USERNAME_BUCKET, capacity=10 ** 9)
+            config.LOGIN_ADDRESS_BUCKET = dict(config.LOGIN_ADDRESS_BUCKET, capacity=10 ** 9)
+        # Конфигурация должна быть изменена до импорта приложения
+        from main import app
+        from loader import lifespan
+
+        async with lifespan(app):
+            workload = Workload(seed)
+            clients = [Client(app, f"10.0.{index // 256}.{index % 256}") for index in range(concurrency)]
+            for client in clients:
+                await workload.register(client)
+                await workload.login(client, f"courier{workload.users}")
+            while len(workload.orders) < orders:
+                await workload.createOrder(clients[len(workload.orders) % concurrency])
+            if warmup:
+                await drive(workload, clients, MIXES[mix], warmup)
+            measured = [
+                await drive(workload, clients, MIXES[mix], requests) for _ in range(rounds)
+            ]
+
+    return {
+        "mix": mix,
+        "requests": requests,
+        "concurrency": concurrency,
+        "rounds": rounds,
+        "admission": admission,
+        "python": python_version(),
+        **median(measured),
+    }
+
+def regressions(
+    baseline: Dict[str, Any],
+    result: Dict[str, Any],
+    threshold: float,
+    min_count: int
+) -> List[str]:
+    """Сравнивает результаты с baseline
+
+    Регрессия - падение пропускной способности или рост перцентилей задержки
+    больше чем на threshold (доля) в целом или для отдельной операции.
+
+    :return: Описания регрессий
+    :rtype: List[str]
+    """
+    found = []
+    sections = [("total", baseline["total"], result["total"])] + [
+        (name, baseline["operations"][name], summary)
+        for name, summary in result["operations"].items()
+        if name in baseline["operations"] and summary["count"] >= min_count
+    ]
+    for section, before, after in sections:
+        if after["throughput"] < before["throughput"] * (1 - threshold):
+            found.append(
+                f"{section}: throughput {before['throughput']:.0f} -> {after['throughput']:.0f} req/s"
+            )
+        for name, _ in PERCENTILES:
+            key = f"{name}_ms"
+            if after[key] > before[key] * (1 + threshold):
+                found.append(f"{section}: {name} {before[key]:.2f} -> {after[key]:.2f} ms")
+    return found
+
+def report(result: Dict[str, Any]) -> None:
+    print(
+        f"mix={result['mix']} requests={result['requests']} "
+        f"concurrency={result['concurrency']} rounds={result['rounds']} "
+        f"admission={result['admission']}"
+    )
+    print(f"{'operation':>14} {'count':>7} {'errors':>6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(result["operations"].items()) + [("total", result["total"])]
+    for name, summary in rows:
+        print(
+            f"{name:>14} {summary['count']:>7} {summary['errors']:>6} {summary['throughput']:>9.0f} "
+            f"{summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--orders", type=int, default=500, help="заказов до начала замера")
+    parser.add_argument("--warmup", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3, help="замеров, метрики - медиана")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--admission", action="store_true", help="не отключать ADMISSION_LIMITS и лимиты входа")
+    parser.add_argument("--save", help="сохранить результаты как baseline в JSON")
+    parser.add_argument("--compare", help="сравнить с baseline из JSON")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--min-count", type=int, default=200)
+    arguments = parser.parse_args()
+
+    result = run(benchmark(
+        arguments.mix,
+        arguments.requests,
+        arguments.concurrency,
+        arguments.orders,
+        arguments.warmup,
+        arguments.seed,
+        arguments.admission,
+        arguments.rounds
+    ))
+    report(result)
+    if arguments.save:
+        with open(arguments.save, "w", encoding="utf-8") as file:
+            dump(result, file, ensure_ascii=False, indent=2)
+    if arguments.compare:
+        with open(arguments.compare, encoding="utf-8") as file:
+            baseline = load(file)
+        if baseline["mix"] != result["mix"] or baseline["concurrency"] != result["concurrency"]:
+            print("warning: baseline was recorded with a different mix or concurrency")
+        found = regressions(baseline, result, arguments.threshold, arguments.min_count)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            exit(1)
+        print(f"no regressions beyond {arguments.threshold:.0%}")
@@ -0,0 +1,98 @@
+"""Микробенчмарк накладных расходов JWT middleware на запрос
+
+Сравнивает прежний вариант через app.middleware("http") (BaseHTTPMiddleware)
+с ASGI JWTMiddleware. Пользователь заранее помещается в usersCache, поэтому
+база данных не используется.
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.middleware --requests 20000
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+
+from fastapi import Request, status
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from typing import Any, Callable, Dict
+
+from auth import createTokens, verifyToken
+from config import ALLOWED_ENDPOINTS_WITHOUT_AUTH
+from loader import AdapterDB
+from middlewaries import JWTMiddleware
+from misc import problemResponse
+from models import User
+
+
+async def legacyJwtMiddleware(request: Request, call_next: Callable[[Request], Any]):
+    """Прежняя реализация middleware через app.middleware("http")"""
+    if request.url.path in ALLOWED_ENDPOINTS_WITHOUT_AUTH:
+        return await call_next(request)
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return problemResponse(detail="Missing authorization header", status_code=status.HTTP_401_UNAUTHORIZED)
+    try:
+        payload = verifyToken(auth_header.split(" ")[1])
+        request.state.user = AdapterDB.usersCache.get(payload["sub"])
+    except Exception as e:
+        return problemResponse(detail=str(e), status_code=status.HTTP_401_UNAUTHORIZED)
+    return await call_next(request)
+
+async def endpoint(_: Request) -> PlainTextResponse:
+    return PlainTextResponse("ok")
+
+def makeApp(kind: str) -> Any:
+    app = Starlette(routes=[Route("/orders/1", endpoint)])
+    if kind == "legacy":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacyJwtMiddleware)
+    elif kind == "asgi":
+        app.add_middleware(JWTMiddleware)
+    return app
+
+async def measure(app: Any, token: str, requests: int) -> float:
+    """Возвращает среднее время обработки запроса в микросекундах"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/orders/1",
+        "raw_path": b"/orders/1",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1),
+        "server": ("testserver", 80),
+    }
+
+    async def receive() -> Dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(_: Dict[str, Any]) -> None:
+        pass
+
+    for _ in range(min(requests, 1000)):
+        await app(dict(scope), receive, send)
+    started = perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (perf_counter() - started) / requests * 1e6
+
+async def main(requests: int) -> None:
+    username = "benchmark"
+    AdapterDB.usersCache.set(username, User(Username=username))
+    token = createTokens(username)["access_token"]
+    results = {kind: await measure(makeApp(kind), token, requests) for kind in ("none", "legacy", "asgi")}
+    for kind, value in results.items():
+        overhead = value - results["none"]
+        print(f"{kind:>7}: {value:8.1f} us/request, middleware overhead {overhead:7.1f} us")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    run(main(parser.parse_args().requests))
@@ -0,0 +1,201 @@
+"""Проверка планов запросов DatabaseAdapter на большом объеме данных
+
+Выполняет каждый публичный метод DatabaseAdapter на заполненной базе SQLite,
+перехватывает все SQL-запросы, которые он отправляет (включая загрузку
+связей ORM), и для каждого выполняет EXPLAIN QUERY PLAN. Проверка не
+проходит, если план содержит полный просмотр таблицы orders, deliveries,
+users или refresh_tokens, кроме однократных загрузок при старте воркера
+(STARTUP_SCANS). Сортировка во временном B-дереве выводится как
+предупреждение. Для каждого запроса выводится время выполнения.
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.seed --database /tmp/large.db --orders 1000000
+    python -m benchmarks.queryplans --database /tmp/large.db
+    python -m benchmarks.queryplans --orders 200000    # временная база
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from datetime import datetime, timedelta
+from os.path import join
+from re import compile as compileRegex
+from sys import exit
+from tempfile import TemporaryDirectory
+from time import perf_counter, time
+from uuid import uuid4
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import Engine
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database import DatabaseAdapter, searchQuery
+from database.instrumentation import currentOperation
+from models import Order, User
+from .seed import createAdapter, seed
+from config import DELIVERY_FINAL_STATUSES
+
+
+CHECKED_TABLES = ("orders", "deliveries", "users", "refresh_tokens")
+FULL_SCAN = compileRegex(r"^SCAN (" + "|".join(CHECKED_TABLES) + r")$")
+TEMP_SORT = compileRegex(r"^USE TEMP B-TREE")
+STARTUP_SCANS = ("pendingDeadlines",)
+
+
+class StatementLog:
+    """Собирает SQL-запросы движков с именем метода DatabaseAdapter и временем"""
+
+    def __init__(self):
+        self.statements: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.enabled = True
+
+    def install(self) -> None:
+        @event.listens_for(Engine, "before_cursor_execute")
+        def beforeCursorExecute(conn, cursor, statement, parameters, context, executemany):
+            conn.info["plan_started"] = perf_counter()
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def afterCursorExecute(conn, cursor, statement, parameters, context, executemany):
+            if not self.enabled:
+                return
+            elapsed = perf_counter() - conn.info.pop("plan_started")
+            if executemany and parameters and isinstance(parameters[0], (list, tuple)):
+                parameters = parameters[0]
+            key = (currentOperation.get() or "other", statement)
+            entry = self.statements.setdefault(key, {"parameters": parameters, "calls": 0, "elapsed": 0.0})
+            entry["calls"] += 1
+            entry["elapsed"] += elapsed
+
+async def scenario(adapter: DatabaseAdapter) -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    """Вызовы всех публичных методов адаптера на существующих данных
+
+    :param adapter: Инициализированный адаптер с заполненной базой
+    :type adapter: DatabaseAdapter
+    :return: Пары (название шага, вызов)
+    :rtype: List[Tuple[str, Callable[[], Awaitable[Any]]]]
+    """
+    async with adapter.newSession() as session:
+        last_order = await session.scalar(select(func.max(Order.ID)))
+        username = await session.scalar(
+            select(User.Username).where(User.ID == select(func.max(User.ID)).scalar_subquery())
+        )
+    middle = last_order // 2
+    page = await adapter.listOrders(1, created_from=datetime.now() - timedelta(days=180))
+    cursor = (page[0].CreationDate, page[0].ID)
+    today = datetime.now()
+    family = uuid4().hex
+    first = {"jti": uuid4().hex, "fam": family, "sub": username, "exp": time() + 3600}
+    second = dict(first, jti=uuid4().hex)
+    order = {
+        "name": "Заказ", "pickup": "Москва", "delivery": "Казань",
+        "weight": 1, "dimensions": "1x1x1", "description": None
+    }
+
+    async def firstChunk() -> None:
+        chunks = adapter.streamOrders(1000)
+        try:
+            await chunks.__anext__()
+        finally:
+            await chunks.aclose()
+
+    return [
+        ("getUser", lambda: adapter.getUser(username)),
+        ("getUser missing", lambda: adapter.getUser("missing-user")),
+        ("createUser", lambda: adapter.createUser(f"qp{uuid4().hex[:16]}", "password")),
+        ("updateUserPassword", lambda: adapter.updateUserPassword(username, "hash")),
+        ("createOrder", lambda: adapter.createOrder("Заказ", "Москва", "Казань", 1, "1x1x1")),
+        ("createOrders", lambda: adapter.createOrders([order] * 100)),
+        ("getOrder", lambda: adapter.getOrder(middle)),
+        ("deliveryExists", lambda: adapter.deliveryExists(middle)),
+        ("listOrders", lambda: adapter.listOrders(50)),
+        ("listOrders cursor", lambda: adapter.listOrders(50, cursor)),
+        ("listOrders status", lambda: adapter.listOrders(50, status="cancelled")),
+        ("listOrders created", lambda: adapter.listOrders(
+            50, created_from=today - timedelta(days=30), created_to=today - timedelta(days=29)
+        )),
+        ("listOrders target", lambda: adapter.listOrders(
+            50, target_from=today - timedelta(days=30), target_to=today - timedelta(days=29)
+        )),
+        ("listOrders target wide", lambda: adapter.listOrders(
+            50, target_from=today - timedelta(days=60)
+        )),
+        ("streamOrders", firstChunk),
+        ("updateDelivery", lambda: adapter.updateDelivery(middle, Status="in transit")),
+        ("updateDeliveries", lambda: adapter.updateDeliveries(
+            [(middle + index, {"Status": "delivered"}) for index in range(100)]
+        )),
+        ("deleteOrder", lambda: adapter.deleteOrder(middle - 1)),
+        ("createRefreshToken", lambda: adapter.createRefreshToken(first)),
+        ("rotateRefreshToken", lambda: adapter.rotateRefreshToken(first["jti"], second)),
+        ("rotateRefreshToken reused", lambda: adapter.rotateRefreshToken(first["jti"], second)),
+        ("revokeTokens", lambda: adapter.revokeTokens([(uuid4().hex, time() + 3600)])),
+        ("loadRevokedTokens", adapter.loadRevokedTokens),
+        ("pendingDeadlines", lambda: adapter.pendingDeadlines(DELIVERY_FINAL_STATUSES)),
+        ("loadStats", adapter.loadStats),
+        ("reconcileStats", adapter.reconcileStats),
+        ("searchOrders", lambda: adapter.searchOrders(searchQuery("Тверская", 8), 20)),
+    ]
+
+async def explain(adapter: DatabaseAdapter, statement: str, parameters: Any) -> List[str]:
+    """Возвращает строки EXPLAIN QUERY PLAN запроса
+
+    :return: Поле detail каждой строки плана
+    :rtype: List[str]
+    """
+    async with adapter.newSession() as session:
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", tuple(parameters or ())
+        )
+        return [row[-1] for row in result]
+
+async def check(adapter: DatabaseAdapter) -> bool:
+    """Выполняет сценарий, печатает планы и время запросов
+
+    :return: True, если полных просмотров таблиц нет
+    :rtype: bool
+    """
+    steps = await scenario(adapter)
+    log = StatementLog()
+    log.install()
+    for _, call in steps:
+        await call()
+    log.enabled = False
+
+    passed = True
+    for (operation, statement), entry in log.statements.items():
+        if statement.lstrip().upper().startswith(("BEGIN", "COMMIT", "ROLLBACK", "ANALYZE")):
+            continue
+        plan = await explain(adapter, statement, entry["parameters"])
+        scans = [detail for detail in plan if FULL_SCAN.match(detail)]
+        if scans and operation in STARTUP_SCANS:
+            status = "startup"
+        else:
+            passed = passed and not scans
+            status = "FULL SCAN" if scans else "sort" if any(map(TEMP_SORT.match, plan)) else "ok"
+        elapsed = entry["elapsed"] / entry["calls"] * 1e3
+        print(f"{status:>9} {operation:<20} {elapsed:9.2f} ms  {' '.join(statement.split())[:100]}")
+        for detail in plan:
+            print(f"{'':>31}{detail}")
+    return passed
+
+async def main(database: Optional[str], orders: int) -> bool:
+    with TemporaryDirectory(prefix="delivery-plans-") as directory:
+        adapter = createAdapter(database or join(directory, "plans.db"))
+        await adapter.init()
+        try:
+            if database is None:
+                await seed(adapter, orders, max(orders // 100, 1), 10000)
+            return await check(adapter)
+        finally:
+            await adapter.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="заполненный файл SQLite, см. benchmarks.seed")
+    parser.add_argument("--orders", type=int, default=200000, help="размер временной базы без --database")
+    arguments = parser.parse_args()
+    if not run(main(arguments.database, arguments.orders)):
+        print("query plan check failed: full table scans found")
+        exit(1)
+    print("query plan check passed")
@@ -0,0 +1,118 @@
+"""Поиск заказов: индекс FTS5 против LIKE '%...%' на большом объеме данных
+
+Для каждого запроса выполняет DatabaseAdapter.searchOrders (FTS5, лучшие
+совпадения первыми) и эквивалентный по словам запрос LIKE '%слово%' по
+Name, PickUpAddress и DeliveryAddress, который просматривает всю таблицу
+orders. Выводит p50/p95 по видам запросов и ускорение по медиане. LIKE с
+ORDER BY ID LIMIT останавливается на первых найденных строках, поэтому
+по частым словам он быстр, а по редким просматривает всю таблицу.
+Совпадения не идентичны: FTS5 ищет префиксы слов, LIKE - подстроки.
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.seed --database /tmp/large.db --orders 1000000
+    python -m benchmarks.search --database /tmp/large.db
+    python -m benchmarks.search --orders 1000000    # временная база
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from os.path import join
+from random import Random
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import joinedload
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database import DatabaseAdapter, searchQuery
+from models import Order
+from config import SEARCH_MAX_TERMS
+from .load import percentile
+from .seed import CITIES, STREETS, createAdapter, seed
+
+
+MISSING = ("Самара", "Воронеж", "Пушкина", "Садовая")
+
+def makeQueries(random: Random, last_order: int, count: int) -> List[Tuple[str, str]]:
+    """Запросы четырех видов по словарю benchmarks.seed
+
+    city и street - частые слова, совпадает до трети заказов; name - номер
+    заказа, совпадают единицы; missing - слово, которого нет в данных.
+
+    :return: Пары (вид запроса, строка поиска)
+    :rtype: List[Tuple[str, str]]
+    """
+    kinds = (
+        ("city", lambda: random.choice(CITIES)),
+        ("street", lambda: f"{random.choice(STREETS).split()[-1]} {random.randint(1, 200)}"),
+        ("name", lambda: str(random.randint(1, last_order))),
+        ("missing", lambda: random.choice(MISSING)),
+    )
+    return [(kind, make()) for kind, make in (kinds[index % len(kinds)] for index in range(count))]
+
+async def likeSearch(adapter: DatabaseAdapter, text: str, limit: int) -> List[Order]:
+    """Поиск подстрок через LIKE с полным просмотром orders"""
+    columns = (Order.Name, Order.PickUpAddress, Order.DeliveryAddress)
+    conditions = [or_(*(column.like(f"%{word}%") for column in columns)) for word in text.split()]
+    async with adapter.newSession() as session:
+        result = await session.execute(
+            select(Order).where(and_(*conditions)).options(joinedload(Order.delivery))
+                .order_by(Order.ID).limit(limit)
+        )
+        return list(result.scalars())
+
+async def timed(call: Callable[[], Awaitable[List[Any]]]) -> Tuple[float, int]:
+    started = perf_counter()
+    rows = await call()
+    return perf_counter() - started, len(rows)
+
+async def benchmark(adapter: DatabaseAdapter, queries: int, limit: int, seed_value: int) -> None:
+    async with adapter.newSession() as session:
+        last_order = await session.scalar(select(func.max(Order.ID))) or 1
+    timings: Dict[str, Dict[str, List[float]]] = {}
+    for kind, text in makeQueries(Random(seed_value), last_order, queries):
+        match = searchQuery(text, SEARCH_MAX_TERMS)
+        fts, fts_rows = await timed(lambda: adapter.searchOrders(match, limit))
+        like, like_rows = await timed(lambda: likeSearch(adapter, text, limit))
+        entry = timings.setdefault(kind, {"fts": [], "like": []})
+        entry["fts"].append(fts)
+        entry["like"].append(like)
+        print(f"{kind:>7} {text!r:<24} fts {fts * 1e3:9.2f} ms ({fts_rows:>3})  "
+              f"like {like * 1e3:9.2f} ms ({like_rows:>3})")
+
+    print(f"\n{'query':>7} {'count':>6} {'fts p50':>10} {'fts p95':>10} "
+          f"{'like p50':>10} {'like p95':>10} {'speedup':>8}")
+    for kind, entry in timings.items():
+        fts, like = sorted(entry["fts"]), sorted(entry["like"])
+        print(f"{kind:>7} {len(fts):>6} {percentile(fts, 0.5) * 1e3:10.2f} "
+              f"{percentile(fts, 0.95) * 1e3:10.2f} {percentile(like, 0.5) * 1e3:10.2f} "
+              f"{percentile(like, 0.95) * 1e3:10.2f} {median(like) / median(fts):7.2f}x")
+
+async def main(database: Optional[str], orders: int, queries: int, limit: int, seed_value: int) -> None:
+    with TemporaryDirectory(prefix="delivery-search-") as directory:
+        adapter = createAdapter(database or join(directory, "search.db"))
+        await adapter.init()
+        try:
+            if not adapter.searchAvailable:
+                print("order search is unavailable: SQLite with FTS5 is required")
+                return
+            if database is None:
+                started = perf_counter()
+                await seed(adapter, orders, max(orders // 100, 1), 10000, seed_value)
+                print(f"seeded {orders} orders in {perf_counter() - started:.1f}s")
+            await benchmark(adapter, queries, limit, seed_value)
+        finally:
+            await adapter.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="заполненный файл SQLite, см. benchmarks.seed")
+    parser.add_argument("--orders", type=int, default=1000000, help="размер временной базы без --database")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    arguments = parser.parse_args()
+    run(main(arguments.database, arguments.orders, arguments.queries, arguments.limit, arguments.seed))
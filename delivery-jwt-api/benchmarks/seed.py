@@ -0,0 +1,181 @@
+"""Заполнение базы синтетическими заказами, доставками и пользователями
+
+Строки вставляются через SQLAlchemy Core (executemany) пачками по --batch
+в отдельных транзакциях. ID заказов назначаются заранее, поэтому доставки
+не требуют RETURNING. У всех пользователей один заранее вычисленный хеш
+пароля "password". После загрузки выполняется ANALYZE, чтобы планировщик
+учитывал новые объемы.
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.seed --orders 1000000 --users 10000
+    python -m benchmarks.seed --database /tmp/large.db --orders 10000000
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from datetime import datetime, timedelta
+from random import Random
+from time import perf_counter
+
+from sqlalchemy import func, insert, select, text
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from auth import PasswordHasher
+from auth.passwords import makePasswordHash
+from database import DatabaseAdapter
+from models import Order, Delivery, User
+from config import DATABASE_URL, DATABASE_PROFILE, DATABASE_PRAGMAS
+
+
+STATUSES = ("created delivery request", "picked up", "in transit", "delivered", "cancelled")
+STATUS_WEIGHTS = (10, 5, 10, 70, 5)
+CITIES = ("Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург")
+STREETS = ("ул. Тверская", "ул. Арбат", "Невский пр.", "ул. Баумана", "ул. Ленина")
+PASSWORD = "password"
+
+
+def createAdapter(database: Optional[str]) -> DatabaseAdapter:
+    """Создает адаптер для базы из аргумента --database или DATABASE_URL
+
+    :param database: Путь к файлу SQLite, defaults to None
+    :type database: Optional[str]
+    :return: Адаптер базы данных, еще не инициализированный
+    :rtype: DatabaseAdapter
+    """
+    url = f"sqlite+aiosqlite:///{database}" if database else DATABASE_URL
+    return DatabaseAdapter(
+        url,
+        PasswordHasher(1, 1),
+        profile=DATABASE_PROFILE,
+        pragmas=DATABASE_PRAGMAS
+    )
+
+def orderRows(first_id: int, count: int, random: Random, now: datetime) -> Iterator[Dict[str, Any]]:
+    """Синтетические заказы, CreationDate равномерно за последний год"""
+    for order_id in range(first_id, first_id + count):
+        yield {
+            "ID": order_id,
+            "Name": f"Заказ {order_id}",
+            "Description": "Хрупкое" if order_id % 4 == 0 else None,
+            "PickUpAddress": f"{random.choice(CITIES)}, {random.choice(STREETS)}, {random.randint(1, 200)}",
+            "DeliveryAddress": f"{random.choice(CITIES)}, {random.choice(STREETS)}, {random.randint(1, 200)}",
+            "Weight": random.randint(1, 50),
+            "Dimensions": f"{random.randint(5, 100)}x{random.randint(5, 100)}x{random.randint(5, 100)}",
+            "CreationDate": now - timedelta(seconds=random.randint(0, 365 * 24 * 3600)),
+        }
+
+def deliveryRows(orders: List[Dict[str, Any]], random: Random) -> List[Dict[str, Any]]:
+    """Доставки заказов, у части задано TargetTimeDelivery"""
+    statuses = random.choices(STATUSES, STATUS_WEIGHTS, k=len(orders))
+    return [
+        {
+            "ID": order["ID"],
+            "Status": status,
+            "TargetTimeDelivery": order["CreationDate"] + timedelta(hours=random.randint(2, 96))
+                if index % 3 else None,
+        }
+        for index, (order, status) in enumerate(zip(orders, statuses))
+    ]
+
+async def seed(
+    adapter: DatabaseAdapter,
+    orders: int,
+    users: int,
+    batch_size: int,
+    seed_value: int = 1,
+    progress: Optional[Callable[[str, int, int], None]] = None
+) -> Dict[str, int]:
+    """Добавляет в базу orders заказов с доставками и users пользователей
+
+    :param adapter: Инициализированный адаптер базы данных
+    :type adapter: DatabaseAdapter
+    :param orders: Количество заказов
+    :type orders: int
+    :param users: Количество пользователей
+    :type users: int
+    :param batch_size: Строк в одной транзакции
+    :type batch_size: int
+    :param seed_value: Начальное значение генератора, defaults to 1
+    :type seed_value: int, optional
+    :param progress: Колбэк (таблица, вставлено, всего), вызывается и перед
+        началом загрузки таблицы, defaults to None
+    :type progress: Optional[Callable[[str, int, int], None]], optional
+    :return: Количество вставленных строк по таблицам
+    :rtype: Dict[str, int]
+    """
+    random = Random(seed_value)
+    now = datetime.now()
+    async with adapter.newSession() as session:
+        first_order = (await session.scalar(select(func.max(Order.ID))) or 0) + 1
+        first_user = (await session.scalar(select(func.max(User.ID))) or 0) + 1
+
+    rows = orderRows(first_order, orders, random, now)
+    if progress is not None:
+        progress("orders", 0, orders)
+    for inserted in range(0, orders, batch_size):
+        batch = [next(rows) for _ in range(min(batch_size, orders - inserted))]
+        async with adapter.newSession() as session:
+            connection = await session.connection()
+            await connection.execute(insert(Order.__table__), batch)
+            await connection.execute(insert(Delivery.__table__), deliveryRows(batch, random))
+            await session.commit()
+        if progress is not None:
+            progress("orders", inserted + len(batch), orders)
+
+    hashed = makePasswordHash(PASSWORD, "scrypt", {"n": 2 ** 14, "r": 8, "p": 1})
+    if progress is not None:
+        progress("users", 0, users)
+    for inserted in range(0, users, batch_size):
+        count = min(batch_size, users - inserted)
+        async with adapter.newSession() as session:
+            connection = await session.connection()
+            await connection.execute(insert(User.__table__), [
+                {"ID": user_id, "Username": f"user{user_id}", "Password": hashed}
+                for user_id in range(first_user + inserted, first_user + inserted + count)
+            ])
+            await session.commit()
+        if progress is not None:
+            progress("users", inserted + count, users)
+
+    async with adapter.newSession() as session:
+        await session.execute(text("ANALYZE"))
+        await session.commit()
+    return {"orders": orders, "deliveries": orders, "users": users}
+
+async def main(database: Optional[str], orders: int, users: int, batch_size: int, seed_value: int) -> None:
+    adapter = createAdapter(database)
+    await adapter.init()
+    started = perf_counter()
+    reported: Dict[str, Tuple[int, float]] = {}
+
+    def progress(table: str, inserted: int, total: int) -> None:
+        last, table_started = reported.setdefault(table, (0, perf_counter()))
+        if inserted and (inserted - last >= total // 20 or inserted == total):
+            reported[table] = (inserted, table_started)
+            rate = inserted / (perf_counter() - table_started)
+            print(f"{table}: {inserted}/{total} ({rate:.0f} rows/s)")
+
+    try:
+        counts = await seed(adapter, orders, users, batch_size, seed_value, progress)
+    finally:
+        await adapter.close()
+    elapsed = perf_counter() - started
+    total = sum(counts.values())
+    print(f"inserted {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", help="файл SQLite, по умолчанию DATABASE_URL")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=None, help="по умолчанию 1%% от --orders")
+    parser.add_argument("--batch", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    arguments = parser.parse_args()
+    run(main(
+        arguments.database,
+        arguments.orders,
+        arguments.users if arguments.users is not None else max(arguments.orders // 100, 1),
+        arguments.batch,
+        arguments.seed
+    ))
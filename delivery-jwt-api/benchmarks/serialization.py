@@ -0,0 +1,111 @@
+"""Микробенчмарк сериализации ответов: JSONResponse со словарями против моделей ответа
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.serialization --orders 50 --iterations 2000
+"""
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from time import perf_counter
+from tracemalloc import start, stop, get_traced_memory, reset_peak
+
+from fastapi.responses import JSONResponse
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from misc import modelResponse, successResponse
+from models import Order, Delivery, OrderPage
+from routes.orders import _serializeOrder
+from serialization import BACKENDS, useBackend
+
+
+def makeOrders(count: int) -> List[Order]:
+    created = datetime(2026, 1, 1, 12, 30, 15, 123456)
+    return [
+        Order(
+            ID=index,
+            Name=f"Заказ {index}",
+            Description="Хрупкое" if index % 2 else None,
+            PickUpAddress="Москва, ул. Тверская, 1",
+            DeliveryAddress="Москва, ул. Арбат, 10",
+            Weight=index % 50 + 1,
+            Dimensions="30x20x10",
+            CreationDate=created + timedelta(seconds=index),
+            delivery=Delivery(
+                Status="created delivery request",
+                TargetTimeDelivery=created + timedelta(days=1) if index % 3 else None
+            )
+        )
+        for index in range(count)
+    ]
+
+def orderDict(order: Order, isoformat: bool) -> Dict[str, Any]:
+    target = order.delivery.TargetTimeDelivery
+    return {
+        "id": order.ID,
+        "description": order.Description,
+        "status": order.delivery.Status,
+        "target_time_delivery": target.isoformat() if isoformat and target else target,
+        "dimensions": order.Dimensions,
+        "weight": order.Weight,
+        "deliveryAddress": order.DeliveryAddress,
+        "pickUpAddress": order.PickUpAddress,
+        "name": order.Name,
+        "creation_date": order.CreationDate.isoformat() if isoformat else order.CreationDate
+    }
+
+def legacyPage(orders: List[Order]) -> bytes:
+    """Прежний путь: словари с ручным isoformat и JSONResponse"""
+    return JSONResponse(
+        content={"success": True, "data": {
+            "orders": [orderDict(order, True) for order in orders], "next_cursor": None
+        }}
+    ).body
+
+def envelopePage(orders: List[Order]) -> bytes:
+    """Словари с datetime, выбранный JSON-бэкенд и готовый конверт"""
+    return successResponse(
+        200, orders=[orderDict(order, False) for order in orders], next_cursor=None
+    ).body
+
+def modelPage(orders: List[Order]) -> bytes:
+    """Модель ответа, TypeAdapter и готовый конверт"""
+    return modelResponse(
+        200, {"orders": [_serializeOrder(order) for order in orders], "next_cursor": None}, OrderPage
+    ).body
+
+def measure(render: Callable[[List[Order]], bytes], orders: List[Order], iterations: int) -> Tuple[float, int]:
+    """Возвращает байт в секунду и пиковый объем выделенной памяти на один ответ"""
+    size = 0
+    started = perf_counter()
+    for _ in range(iterations):
+        size += len(render(orders))
+    elapsed = perf_counter() - started
+    start()
+    reset_peak()
+    render(orders)
+    peak = get_traced_memory()[1]
+    stop()
+    return size / elapsed, peak
+
+def main(count: int, iterations: int) -> None:
+    orders = makeOrders(count)
+    legacy, legacy_peak = measure(legacyPage, orders, iterations)
+    print(f"{'JSONResponse':>20}: {legacy / 2 ** 20:8.1f} MiB/s, peak {legacy_peak / 1024:8.1f} KiB")
+    paths = [("models", modelPage)] + [(backend, envelopePage) for backend in BACKENDS]
+    for name, render in paths:
+        if render is envelopePage:
+            useBackend(name)
+        fast, fast_peak = measure(render, orders, iterations)
+        print(
+            f"{name:>20}: {fast / 2 ** 20:8.1f} MiB/s, peak {fast_peak / 1024:8.1f} KiB"
+            f" ({fast / legacy:.1f}x)"
+        )
+    useBackend()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=2000)
+    arguments = parser.parse_args()
+    main(arguments.orders, arguments.iterations)
\ No newline at end of file
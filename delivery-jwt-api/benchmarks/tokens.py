@@ -0,0 +1,46 @@
+"""Микробенчмарк проверки JWT: с кэшем проверенных токенов и без него
+
+Запуск из каталога delivery-jwt-api:
+    python -m benchmarks.tokens --tokens 100 --iterations 50000
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from jwt import decode
+
+from typing import Callable, List
+
+from auth import createTokens, verifyToken, clearTokenCache, keyRing
+
+
+def throughput(verify: Callable[[str], object], tokens: List[str], iterations: int) -> float:
+    """Возвращает количество проверенных токенов в секунду"""
+    started = perf_counter()
+    for index in range(iterations):
+        verify(tokens[index % len(tokens)])
+    return iterations / (perf_counter() - started)
+
+def decodeUncached(token: str) -> dict:
+    """Проверяет токен так же, как verifyToken, но без кэша
+
+    Ключ и алгоритм выбираются по kid из заголовка токена,
+    поэтому сравнение показывает выигрыш только от кэша.
+    """
+    key = keyRing.keyFor(token)
+    return decode(token, key.verifyingKey, algorithms=[key.algorithm])
+
+def main(count: int, iterations: int) -> None:
+    tokens = [createTokens(f"courier{index}")["access_token"] for index in range(count)]
+    clearTokenCache()
+    uncached = throughput(decodeUncached, tokens, iterations)
+    cached = throughput(verifyToken, tokens, iterations)
+    print(f"uncached: {uncached:12.0f} tokens/s")
+    print(f"  cached: {cached:12.0f} tokens/s ({cached / uncached:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=50000)
+    arguments = parser.parse_args()
+    main(arguments.tokens, arguments.iterations)
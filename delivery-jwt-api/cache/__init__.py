@@ -0,0 +1 @@
+from .lru import LRUCache
\ No newline at end of file
@@ -0,0 +1,135 @@
+from collections import OrderedDict
+from time import monotonic
+
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Ограниченный по размеру LRU-кэш с TTL для каждой записи
+
+    Чтобы не вернуть в кэш значение, прочитанное до инвалидации, читатель
+    берет version() до чтения источника и передает ее в set(since=...):
+    если ключ с тех пор инвалидирован, значение не сохраняется. Журнал
+    инвалидаций ограничен maxsize ключами, для вытесненных из него ключей
+    используется отметка самого позднего вытеснения.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """
+        :param maxsize: Максимальное количество записей
+        :type maxsize: int
+        :param ttl: Время жизни записи по умолчанию в секундах, defaults to None
+        :type ttl: Optional[float], optional
+        """
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._epoch = 0
+        self._invalidated: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._invalidatedFloor = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def version(self) -> int:
+        """Отметка для set(since=...), берется до чтения источника
+
+        :return: Номер последней инвалидации
+        :rtype: int
+        """
+        return self._epoch
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение из кэша, если запись есть и не истекла
+
+        :param key: Ключ записи
+        :type key: Hashable
+        :return: Значение или None
+        :rtype: Optional[Any]
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, expires = item
+        if expires is not None and expires <= monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[float] = None,
+        since: Optional[int] = None
+    ) -> None:
+        """Сохраняет значение в кэш
+
+        TTL записи не превышает TTL кэша по умолчанию.
+
+        :param key: Ключ записи
+        :type key: Hashable
+        :param value: Значение
+        :type value: Any
+        :param ttl: Время жизни записи в секундах, defaults to None
+        :type ttl: Optional[float], optional
+        :param since: version() до чтения значения, запись пропускается,
+            если ключ инвалидирован позже, defaults to None
+        :type since: Optional[int], optional
+        """
+        if self._maxsize <= 0:
+            return
+        if since is not None and self._invalidated.get(key, self._invalidatedFloor) > since:
+            return
+        if ttl is None or (self._ttl is not None and ttl > self._ttl):
+            ttl = self._ttl
+        if ttl is not None and ttl <= 0:
+            self.invalidate(key)
+            return
+        expires = monotonic() + ttl if ttl is not None else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Удаляет запись из кэша
+
+        :param key: Ключ записи
+        :type key: Hashable
+        """
+        self._data.pop(key, None)
+        self._epoch += 1
+        self._invalidated[key] = self._epoch
+        self._invalidated.move_to_end(key)
+        while len(self._invalidated) > max(self._maxsize, 1):
+            _, self._invalidatedFloor = self._invalidated.popitem(last=False)
+
+    def clear(self) -> None:
+        """Очищает кэш"""
+        self._data.clear()
+        self._epoch += 1
+        self._invalidated.clear()
+        self._invalidatedFloor = self._epoch
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает счетчики кэша
+
+        :return: Размер, попадания, промахи и вытеснения
+        :rtype: Dict[str, int]
+        """
+        return {
+            "size": len(self._data),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -2,7 +2,65 @@ from datetime import timedelta
 
 PROHIBITED_DATA_UPDATE_DELIVERY = ('ID', 'DeliveryID')
 DATABASE_URL = 'sqlite+aiosqlite:///example.db'
+DATABASE_POOL_SIZE = None
+DATABASE_MAX_OVERFLOW = None
+DATABASE_PROFILE = "auto"
+DATABASE_READ_URL = None
+DATABASE_PRAGMAS = {}
 SECRET_KEY_JWT = 'jwt_key'
 ALGORITHM = "HS256"
 ACCESS_EXPIRE = timedelta(minutes=30)
-ALLOWED_ENDPOINTS_WITHOUT_AUTH = ("/auth/login", "/auth/register", "/docs", "/openapi.json")
\ No newline at end of file
+ALLOWED_ENDPOINTS_WITHOUT_AUTH = ("/auth/login", "/auth/register", "/auth/refresh", "/docs", "/openapi.json", "/.well-known/jwks.json", "/metrics")
+USERS_CACHE_SIZE = 1024
+USERS_CACHE_TTL = timedelta(minutes=5)
+HASH_WORKERS = 4
+HASH_QUEUE_SIZE = 64
+HASH_EXECUTOR = "thread"
+PASSWORD_HASH_ALGORITHM = "scrypt"
+PASSWORD_HASH_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+ORDERS_BATCH_MAX_SIZE = 5000
+DELIVERIES_BATCH_MAX_SIZE = 5000
+ORDERS_PAGE_SIZE = 50
+ORDERS_PAGE_MAX_SIZE = 500
+ORDERS_EXPORT_CHUNK_SIZE = 1000
+ORDERS_SORT_MAX_MATCHES = 10000
+ORDERS_CACHE_SIZE = 10000
+ORDERS_CACHE_TTL = timedelta(seconds=30)
+DATABASE_REQUEST_SESSION = True
+TOKEN_CACHE_SIZE = 10000
+JWT_KEYS = [
+    {"kid": "default", "algorithm": ALGORITHM, "secret": SECRET_KEY_JWT},
+]
+JWT_ACTIVE_KID = "default"
+REFRESH_EXPIRE = timedelta(days=30)
+REVOCATION_BLOOM_BITS = 0
+REVOCATION_BLOOM_HASHES = 4
+JSON_BACKEND = "auto"
+SLOW_REQUEST_THRESHOLD = None
+EVENTS_BROKER = "local"
+EVENTS_SOCKET_DIR = "/tmp/delivery-jwt-api-events"
+EVENTS_HEARTBEAT = timedelta(seconds=15)
+EVENTS_MAX_TOPICS = 100
+DELIVERY_WRITE_BUFFER = False
+DELIVERY_FLUSH_INTERVAL = timedelta(milliseconds=200)
+DELIVERY_FLUSH_MAX_ENTRIES = 1000
+OVERDUE_TRACKER = True
+DELIVERY_FINAL_STATUSES = ("delivered", "cancelled")
+STATS_MAX_AGE = timedelta(seconds=1)
+STATS_HOURS = 24
+STATS_MAX_HOURS = 24 * 31
+SEARCH_MAX_RESULTS = 1000
+SEARCH_MAX_TERMS = 8
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+SERVER_WORKERS = 1
+ADMISSION_LIMITS = {
+    "auth": {"concurrency": 8, "queue": 32, "deadline": timedelta(seconds=2)},
+    "writes": {"concurrency": 32, "queue": 256, "deadline": timedelta(seconds=5)},
+    "reads": {"concurrency": 64, "queue": 512, "deadline": timedelta(seconds=5)},
+}
+ADMISSION_EXEMPT_ENDPOINTS = ("/metrics", "/docs", "/openapi.json", "/.well-known/jwks.json")
+ADMISSION_STREAM_ENDPOINTS = ("/deliveries/{order_id}/events",)
+LOGIN_USERNAME_BUCKET = {"capacity": 5, "refill": timedelta(seconds=12)}
+LOGIN_ADDRESS_BUCKET = {"capacity": 30, "refill": timedelta(seconds=2)}
+LOGIN_BUCKETS_MAX_KEYS = 100000
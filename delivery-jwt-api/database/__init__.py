@@ -1 +1,6 @@
-from .adapter import DatabaseAdapter
\ No newline at end of file
+from .adapter import DatabaseAdapter
+from .profiles import EngineProfile, PROFILES, profileFor, registerProfile
+from .writebuffer import DeliveryWriteBuffer, deliveryState
+from .overdue import OverdueTracker, DELIVERY_STATES_TOPIC
+from .stats import StatsMirror, STATS_TRIGGERS, hourBucket
+from .search import searchQuery, SEARCH_TABLE
\ No newline at end of file
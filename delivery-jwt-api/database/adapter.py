@@ -1,26 +1,418 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy import update, select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy import update, select, insert, delete, func, text, Select, and_, or_, exists
+from sqlalchemy.orm import joinedload, contains_eager, aliased
+from sqlalchemy.exc import OperationalError
+from collections import Counter
+from contextlib import asynccontextmanager
+from logging import getLogger
+from datetime import datetime, timezone
 
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, List, Tuple, AsyncIterator, Callable, Iterable
 from models import Order, Delivery, \
-        DB, User
-from misc import generateSalt, hashPassword
-from config import PROHIBITED_DATA_UPDATE_DELIVERY
+        DB, User, RefreshToken, RevokedToken, StatusCount, HourlyOrderCount
+from auth import PasswordHasher, revocationIndex, REVOCATIONS_TOPIC
+from cache import LRUCache
+from events import broker
+from runtime import declareState, WORKER
+from .instrumentation import measured, instrumentEngine, checkoutConnection
+from .profiles import profileFor
+from .overdue import DELIVERY_STATES_TOPIC
+from .stats import STATS_TRIGGERS, hourBucket
+from .search import SEARCH_TABLE, SQLITE_SEARCH_DDL, ordersSearch
+from config import PROHIBITED_DATA_UPDATE_DELIVERY, USERS_CACHE_SIZE, \
+        USERS_CACHE_TTL, ORDERS_CACHE_SIZE, ORDERS_CACHE_TTL, SEARCH_MAX_RESULTS, \
+        ORDERS_SORT_MAX_MATCHES
+
+
+logger = getLogger(__name__)
+
+declareState(
+    "AdapterDB.usersCache", WORKER,
+    "invalidated only in the worker that changed the user, stale elsewhere up to USERS_CACHE_TTL"
+)
+declareState(
+    "AdapterDB.ordersCache", WORKER,
+    "invalidated only in the worker that changed the order, stale elsewhere up to ORDERS_CACHE_TTL"
+)
+declareState(
+    "AdapterDB.deliveriesCache", WORKER,
+    "invalidated only in the worker that deleted the order, stale elsewhere up to ORDERS_CACHE_TTL"
+)
 
 
 class DatabaseAdapter:
-    def __init__(self, database_url: str):
-        self._engine = create_async_engine(database_url, echo=False)
-        self._session = async_sessionmaker(
-            self._engine, expire_on_commit=False, class_=AsyncSession
-        )
+    def __init__(
+            self,
+            database_url: str,
+            hasher: PasswordHasher,
+            pool_size: Optional[int] = None,
+            max_overflow: Optional[int] = None,
+            profile: str = "auto",
+            read_url: Optional[str] = None,
+            pragmas: Optional[Dict[str, Any]] = None
+        ):
+        """Движок и пул соединений создаются в init, то есть в каждом воркере после fork
+
+        Если задан read_url, getOrder и getUser вне транзакции записи
+        читают через отдельный движок.
+
+        :param database_url: URL базы данных
+        :type database_url: str
+        :param hasher: Пул хеширования паролей
+        :type hasher: PasswordHasher
+        :param pool_size: Размер пула соединений, defaults to None
+        :type pool_size: Optional[int], optional
+        :param max_overflow: Соединения сверх пула, defaults to None
+        :type max_overflow: Optional[int], optional
+        :param profile: Профиль движка или "auto" по диалекту URL, defaults to "auto"
+        :type profile: str, optional
+        :param read_url: URL базы данных для чтения, defaults to None
+        :type read_url: Optional[str], optional
+        :param pragmas: PRAGMA SQLite поверх профиля, defaults to None
+        :type pragmas: Optional[Dict[str, Any]], optional
+        """
+        self._url = database_url
+        self._readUrl = read_url
+        self._profile = profile
+        self._pragmas = pragmas or {}
+        self._poolOptions = {
+            option: value
+            for option, value in (("pool_size", pool_size), ("max_overflow", max_overflow))
+            if value is not None
+        }
+        self._engine = None
+        self._session = None
+        self._readEngine = None
+        self._readSession = None
         self._db = DB
+        self._hasher = hasher
+        self.searchAvailable = False
+        self.usersCache = LRUCache(
+            USERS_CACHE_SIZE, USERS_CACHE_TTL.total_seconds()
+        )
+        self.ordersCache = LRUCache(
+            ORDERS_CACHE_SIZE, ORDERS_CACHE_TTL.total_seconds()
+        )
+        # ID доставок, существование которых уже проверено (DeliveryWriteBuffer)
+        self.deliveriesCache = LRUCache(
+            ORDERS_CACHE_SIZE, ORDERS_CACHE_TTL.total_seconds()
+        )
     
+    @measured
     async def init(self) -> None:
+        """Создает движки и пулы соединений текущего процесса и схему базы данных"""
+        self._engine = self._createEngine(self._url)
+        self._session = async_sessionmaker(
+            self._engine, expire_on_commit=False, class_=AsyncSession
+        )
+        if self._readUrl is not None:
+            self._readEngine = self._createEngine(self._readUrl, read_only=True)
+            self._readSession = async_sessionmaker(
+                self._readEngine, expire_on_commit=False, class_=AsyncSession
+            )
+        await self.createSchema()
+
+    async def createSchema(self) -> None:
+        """Создает недостающие таблицы, индексы, триггеры и индекс поиска
+
+        DDL выполняется одной транзакцией под блокировкой базы (BEGIN IMMEDIATE
+        в SQLite, advisory lock в PostgreSQL): воркеры, стартующие одновременно
+        на новой базе, создают схему по очереди, и только первый видит
+        объекты созданными. Он же после фиксации пересчитывает агрегаты
+        и заполняет индекс поиска, остальные воркеры его не ждут.
+        """
         async with self._engine.begin() as conn:
+            await conn.run_sync(self._lockSchema)
             await conn.run_sync(self._db.metadata.create_all)
+            await conn.run_sync(self._createIndexes)
+            created = await conn.run_sync(self._createTriggers)
+            indexed = await conn.run_sync(self._createSearch)
+        if created:
+            await self.reconcileStats()
+        if indexed:
+            await self.rebuildSearch()
+
+    def _createEngine(self, url: str, read_only: bool = False) -> AsyncEngine:
+        """Создает движок с настройками профиля и сбором метрик
+
+        :param url: URL базы данных
+        :type url: str
+        :param read_only: Движок только для чтения, defaults to False
+        :type read_only: bool, optional
+        :return: Асинхронный движок
+        :rtype: AsyncEngine
+        """
+        profile = profileFor(url, self._profile)
+        engine = create_async_engine(url, echo=False, **profile.options(url, self._poolOptions))
+        profile.configure(engine, read_only, self._pragmas)
+        instrumentEngine(engine)
+        return engine
+
+    async def close(self) -> None:
+        """Закрывает соединения пулов текущего процесса"""
+        if self._readEngine is not None:
+            await self._readEngine.dispose()
+            self._readEngine = None
+            self._readSession = None
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._session = None
+
+    @staticmethod
+    def _lockSchema(conn: Any) -> None:
+        """Блокирует изменение схемы другими процессами до конца транзакции"""
+        dialect = conn.dialect.name
+        if dialect == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        elif dialect == "postgresql":
+            conn.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext('delivery-jwt-api schema'))")
+
+    def _createIndexes(self, conn: Any) -> None:
+        """Создает индексы, добавленные после создания таблиц"""
+        for table in self._db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+    def _createTriggers(self, conn: Any) -> bool:
+        """Создает триггеры агрегатов status_counts и orders_per_hour
+
+        :return: True, если триггеры созданы впервые и агрегаты нужно пересчитать
+        :rtype: bool
+        """
+        dialect = conn.dialect.name
+        if dialect not in STATS_TRIGGERS:
+            logger.warning("No stats triggers for %s, run reconcile-stats to refresh /stats", dialect)
+            return False
+        triggers, existing_query = STATS_TRIGGERS[dialect]
+        existing = set(conn.exec_driver_sql(existing_query).scalars())
+        created = False
+        for name, statements in triggers.items():
+            if name not in existing:
+                for statement in statements:
+                    conn.exec_driver_sql(statement)
+                created = True
+        return created
+
+    def _createSearch(self, conn: Any) -> bool:
+        """Создает полнотекстовый индекс заказов FTS5 и триггеры синхронизации
+
+        :return: True, если индекс создан впервые и его нужно заполнить
+        :rtype: bool
+        """
+        if conn.dialect.name != "sqlite":
+            logger.warning("Order search needs SQLite FTS5, GET /orders/search is disabled")
+            return False
+        existing = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (SEARCH_TABLE,)
+        ).scalar()
+        self.searchAvailable = True
+        if existing:
+            return False
+        try:
+            for statement in SQLITE_SEARCH_DDL:
+                conn.exec_driver_sql(statement)
+        except OperationalError as e:
+            self.searchAvailable = False
+            logger.warning("SQLite FTS5 is unavailable, GET /orders/search is disabled: %s", e)
+            return False
+        return True
+
+    def newSession(self) -> AsyncSession:
+        """Создает сессию для unit of work, соединение берется при первом запросе
+
+        :return: Новая сессия
+        :rtype: AsyncSession
+        """
+        return self._session()
+
+    @measured
+    async def commit(self, session: AsyncSession) -> None:
+        """Фиксирует транзакцию сессии и выполняет отложенные действия
+
+        :param session: Сессия unit of work
+        :type session: AsyncSession
+        """
+        await session.commit()
+        for callback in session.info.pop("after_commit", ()):
+            callback()
+
+    @measured
+    async def rollback(self, session: AsyncSession) -> None:
+        """Откатывает транзакцию сессии и отменяет отложенные действия
+
+        :param session: Сессия unit of work
+        :type session: AsyncSession
+        """
+        session.info.pop("after_commit", None)
+        await session.rollback()
+
+    @staticmethod
+    def _afterCommit(session: AsyncSession, callback: Callable[[], Any]) -> None:
+        session.info.setdefault("after_commit", []).append(callback)
+
+    @asynccontextmanager
+    async def _transaction(
+            self,
+            session: Optional[AsyncSession] = None
+        ) -> AsyncIterator[AsyncSession]:
+        """Использует переданную сессию или открывает собственную транзакцию
 
+        Переданную сессию фиксирует ее владелец, собственная фиксируется
+        при выходе из блока.
+
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: Сессия для выполнения запросов
+        :rtype: AsyncIterator[AsyncSession]
+        """
+        if session is not None:
+            await checkoutConnection(session)
+            yield session
+            return
+        async with self._session() as session:
+            await checkoutConnection(session)
+            yield session
+            await self.commit(session)
+
+    @asynccontextmanager
+    async def _readTransaction(
+            self,
+            session: Optional[AsyncSession] = None
+        ) -> AsyncIterator[AsyncSession]:
+        """Сессия для чтения: движок чтения, если сессия запроса еще не начала транзакцию
+
+        Начатая транзакция продолжает использоваться, чтобы запрос видел
+        собственные незафиксированные изменения.
+
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: Сессия для выполнения запросов
+        :rtype: AsyncIterator[AsyncSession]
+        """
+        if self._readSession is None or (session is not None and session.in_transaction()):
+            async with self._transaction(session) as session:
+                yield session
+            return
+        async with self._readSession() as session:
+            await checkoutConnection(session)
+            yield session
+
+    @staticmethod
+    def _deliveryConditions(
+            delivery: Any,
+            status: Optional[str] = None,
+            target_from: Optional[datetime] = None,
+            target_to: Optional[datetime] = None
+        ) -> List[Any]:
+        """Условия фильтров списка заказов по доставке"""
+        conditions = []
+        if status is not None:
+            conditions.append(delivery.Status == status)
+        if target_from is not None:
+            conditions.append(delivery.TargetTimeDelivery >= target_from)
+        if target_to is not None:
+            conditions.append(delivery.TargetTimeDelivery < target_to)
+        return conditions
+
+    @staticmethod
+    def _ordersQuery(
+            status: Optional[str] = None,
+            created_from: Optional[datetime] = None,
+            created_to: Optional[datetime] = None,
+            target_from: Optional[datetime] = None,
+            target_to: Optional[datetime] = None,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            sort_matches: bool = False,
+            walk_from: Optional[datetime] = None
+        ) -> Select:
+        """Строит запрос Order с доставкой, отсортированный по (CreationDate, ID)
+
+        По умолчанию запрос идет по индексу ix_orders_CreationDate_ID и проверяет
+        фильтры доставки через EXISTS, поэтому страница стоит пропорционально
+        ее размеру, а не числу совпадений. С sort_matches совпадения берутся
+        по индексам deliveries и сортируются: так дешевле, когда их немного.
+
+        :param cursor: (CreationDate, ID) последнего полученного ордера, defaults to None
+        :type cursor: Optional[Tuple[datetime, int]], optional
+        :param sort_matches: Выбрать совпадения по индексам deliveries и отсортировать,
+            defaults to False
+        :type sort_matches: bool, optional
+        :param walk_from: CreationDate, с которого начинать обход, defaults to None
+        :type walk_from: Optional[datetime], optional
+        :return: Запрос SELECT
+        :rtype: Select
+        """
+        query = select(Order).join(Order.delivery) \
+            .options(contains_eager(Order.delivery))
+        if sort_matches:
+            query = query.where(*DatabaseAdapter._deliveryConditions(
+                Delivery, status, target_from, target_to
+            ))
+        else:
+            delivery = aliased(Delivery)
+            conditions = DatabaseAdapter._deliveryConditions(delivery, status, target_from, target_to)
+            if conditions:
+                query = query.where(exists().where(delivery.ID == Order.ID, *conditions))
+        if created_from is not None:
+            query = query.where(Order.CreationDate >= created_from)
+        if created_to is not None:
+            query = query.where(Order.CreationDate < created_to)
+        if walk_from is not None:
+            query = query.where(Order.CreationDate >= walk_from)
+        if cursor is not None:
+            creation_date, order_id = cursor
+            query = query.where(
+                Order.CreationDate >= creation_date,
+                or_(
+                    Order.CreationDate > creation_date,
+                    and_(Order.CreationDate == creation_date, Order.ID > order_id)
+                )
+            )
+        return query.order_by(Order.CreationDate, Order.ID)
+
+    async def _targetScan(
+            self,
+            session: AsyncSession,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            **filters: Any
+        ) -> Dict[str, Any]:
+        """Выбирает обход для фильтра по диапазону TargetTimeDelivery
+
+        Ни один индекс не дает одновременно диапазон TargetTimeDelivery и порядок
+        (CreationDate, ID). Если совпадений меньше ORDERS_SORT_MAX_MATCHES,
+        их дешевле отсортировать. Иначе запрос обходит индекс CreationDate,
+        а первая страница начинается с самого раннего совпадения, чтобы не
+        просматривать заказы до него.
+
+        :param session: Сессия unit of work
+        :type session: AsyncSession
+        :param cursor: (CreationDate, ID) последнего полученного ордера, defaults to None
+        :type cursor: Optional[Tuple[datetime, int]], optional
+        :return: Дополнительные аргументы _ordersQuery
+        :rtype: Dict[str, Any]
+        """
+        if filters.get("target_from") is None and filters.get("target_to") is None:
+            return {}
+        conditions = self._deliveryConditions(
+            Delivery, filters.get("status"), filters.get("target_from"), filters.get("target_to")
+        )
+        matches = await session.scalar(
+            select(func.count()).select_from(
+                select(Delivery.ID).where(*conditions).limit(ORDERS_SORT_MAX_MATCHES).subquery()
+            )
+        )
+        if matches < ORDERS_SORT_MAX_MATCHES:
+            return {"sort_matches": True}
+        if cursor is not None:
+            return {}
+        first = await session.scalar(
+            select(func.min(Order.CreationDate))
+                .where(Order.ID.in_(select(Delivery.ID).where(*conditions)))
+        )
+        return {"walk_from": first}
+
+    @measured
     async def createOrder(
             self, 
             name: str,
@@ -28,7 +420,8 @@ class DatabaseAdapter:
             delivery: str, 
             weight: int, 
             dimensions: str,
-            description: Optional[str] = None
+            description: Optional[str] = None,
+            session: Optional[AsyncSession] = None
         ) -> Order:
         """Создание нового ордера
 
@@ -44,10 +437,12 @@ class DatabaseAdapter:
         :type dimensions: str
         :param description: Описание посылки, defaults to None
         :type description: Optional[str], optional
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: объект Order
         :rtype: Order
         """
-        async with self._session() as session:
+        async with self._transaction(session) as session:
             order = Order(
                 Description = description,
                 Name = name,
@@ -59,60 +454,267 @@ class DatabaseAdapter:
             session.add(order)
             await session.flush()
             session.add(Delivery(ID=order.ID))  
-            await session.commit()
+            order_id = order.ID
+            self._afterCommit(session, lambda: self._publishStates({order_id: None}))
             return order
+
+    @measured
+    async def createOrders(
+            self,
+            orders: List[Dict[str, Any]],
+            session: Optional[AsyncSession] = None
+        ) -> List[int]:
+        """Создание пачки ордеров и доставок в одной транзакции
+
+        :param orders: Данные ордеров с ключами name, pickup, delivery,
+            weight, dimensions и description
+        :type orders: List[Dict[str, Any]]
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: ID созданных ордеров в порядке входных данных
+        :rtype: List[int]
+        """
+        if not orders:
+            return []
+        async with self._transaction(session) as session:
+            result = await session.execute(
+                insert(Order).returning(Order.ID, sort_by_parameter_order=True),
+                [
+                    {
+                        "Description": order.get("description"),
+                        "Name": order["name"],
+                        "PickUpAddress": order["pickup"],
+                        "DeliveryAddress": order["delivery"],
+                        "Weight": order["weight"],
+                        "Dimensions": order["dimensions"]
+                    }
+                    for order in orders
+                ]
+            )
+            ids = list(result.scalars())
+            await session.execute(insert(Delivery), [{"ID": ID} for ID in ids])
+            self._afterCommit(session, lambda: self._publishStates(dict.fromkeys(ids)))
+            return ids
                     
-    async def getOrder(self, order_id: int) -> Optional[Order]:
+    @measured
+    async def getOrder(
+            self,
+            order_id: int,
+            session: Optional[AsyncSession] = None
+        ) -> Optional[Order]:
         """Возвращает объект Order при его наличии
 
         :param order_id: id ордера
         :type order_id: int
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: Возвращает объект Order при его наличии
         :rtype: Optional[Order]
         """
-        async with self._session() as session:
+        async with self._readTransaction(session) as session:
             result = await session.execute(
                 select(Order).where(Order.ID == order_id)
                     .options(joinedload(Order.delivery))
         )
             return result.scalar()
 
+    @measured
+    async def deliveryExists(
+            self,
+            order_id: int,
+            session: Optional[AsyncSession] = None
+        ) -> bool:
+        """Проверяет наличие доставки без загрузки заказа
+
+        :param order_id: ID доставки
+        :type order_id: int
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: True если доставка существует
+        :rtype: bool
+        """
+        async with self._transaction(session) as session:
+            result = await session.execute(
+                select(Delivery.ID).where(Delivery.ID == order_id).limit(1)
+            )
+            return result.scalar() is not None
+
+    @measured
+    async def listOrders(
+            self,
+            limit: int,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            session: Optional[AsyncSession] = None,
+            **filters: Any
+        ) -> List[Order]:
+        """Возвращает страницу ордеров с keyset-пагинацией по (CreationDate, ID)
+
+        :param limit: Размер страницы
+        :type limit: int
+        :param cursor: (CreationDate, ID) последнего ордера предыдущей страницы, defaults to None
+        :type cursor: Optional[Tuple[datetime, int]], optional
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: Список ордеров с загруженной доставкой
+        :rtype: List[Order]
+        """
+        async with self._transaction(session) as session:
+            scan = await self._targetScan(session, cursor, **filters)
+            result = await session.execute(
+                self._ordersQuery(cursor=cursor, **filters, **scan).limit(limit)
+            )
+            return list(result.scalars())
+
+    @measured
+    async def streamOrders(
+            self,
+            chunk_size: int,
+            cursor: Optional[Tuple[datetime, int]] = None,
+            **filters: Any
+        ) -> AsyncIterator[List[Order]]:
+        """Потоково возвращает ордера с доставкой частями по chunk_size
+
+        Использует серверный курсор, в памяти одновременно находится одна часть.
+
+        :param chunk_size: Количество ордеров в части
+        :type chunk_size: int
+        :param cursor: (CreationDate, ID) ордера, после которого продолжить, defaults to None
+        :type cursor: Optional[Tuple[datetime, int]], optional
+        :return: Асинхронный итератор частей
+        :rtype: AsyncIterator[List[Order]]
+        """
+        async with self._session() as session:
+            scan = await self._targetScan(session, cursor, **filters)
+            result = await session.stream(
+                self._ordersQuery(cursor=cursor, **filters, **scan)
+                    .execution_options(yield_per=chunk_size)
+            )
+            async for partition in result.scalars().partitions():
+                yield partition
+
+    @staticmethod
+    def _publishStates(states: Dict[int, Optional[Tuple[str, Optional[datetime]]]]) -> None:
+        """Публикует состояния доставок в DELIVERY_STATES_TOPIC для OverdueTracker
+
+        :param states: {ID доставки: (Status, TargetTimeDelivery) или None,
+            если доставка удалена или создана без срока}
+        :type states: Dict[int, Optional[Tuple[str, Optional[datetime]]]]
+        """
+        broker.publish(DELIVERY_STATES_TOPIC, {
+            str(order_id): [state[0], state[1].isoformat() if state[1] else None]
+                if state is not None else None
+            for order_id, state in states.items()
+        })
+
+    def _publishDelivery(
+            self,
+            session: AsyncSession,
+            order_id: int,
+            data: Dict[str, Any],
+            state: Tuple[str, Optional[datetime]]
+        ) -> None:
+        """Сбрасывает кэш заказа и публикует изменение доставки после фиксации
+
+        :param session: Сессия unit of work
+        :type session: AsyncSession
+        :param order_id: ID заказа
+        :type order_id: int
+        :param data: Измененные поля Delivery
+        :type data: Dict[str, Any]
+        :param state: (Status, TargetTimeDelivery) доставки после изменения
+        :type state: Tuple[str, Optional[datetime]]
+        """
+        event = {"order_id": order_id}
+        if "Status" in data:
+            event["status"] = data["Status"]
+        if "TargetTimeDelivery" in data:
+            target = data["TargetTimeDelivery"]
+            event["target_time_delivery"] = target.isoformat() if target else None
+
+        def publish() -> None:
+            self.ordersCache.invalidate(order_id)
+            broker.publish(order_id, event)
+            self._publishStates({order_id: state})
+        self._afterCommit(session, publish)
+
+    @measured
     async def updateDelivery(
             self, 
             order_id: int, 
+            session: Optional[AsyncSession] = None,
             **data: Dict[str, Any]
         ) -> bool:
-        """Обновляет информацию о доставке
+        """Обновляет информацию о доставке одним UPDATE
+
+        После фиксации изменение публикуется подписчикам заказа (events.broker).
 
         :param order_id: ID доставки
         :type order_id: int
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: True если успешно, в противном случае False
         :rtype: bool
         """
-        async with self._session() as session:
+        if not data or any(field in PROHIBITED_DATA_UPDATE_DELIVERY for field in data):
+            return False
+        async with self._transaction(session) as session:
             result = await session.execute(
-                    select(Delivery).where(Delivery.ID == order_id)
-                )
-            delivery = result.scalar()
-            if not delivery or not data:
-                    return False
-            elif any(value in PROHIBITED_DATA_UPDATE_DELIVERY for value in data.values()):
-                return False
-            await session.execute(
                 update(Delivery).where(Delivery.ID == order_id).values(**data)
-            )                    
-            await session.commit()
+                    .returning(Delivery.Status, Delivery.TargetTimeDelivery)
+            )
+            state = result.one_or_none()
+            if state is None:
+                return False
+            self._publishDelivery(session, order_id, data, tuple(state))
             return True
+
+    @measured
+    async def updateDeliveries(
+            self,
+            updates: List[Tuple[int, Dict[str, Any]]],
+            session: Optional[AsyncSession] = None
+        ) -> List[bool]:
+        """Обновляет несколько доставок в одной транзакции
+
+        :param updates: Пары (ID доставки, данные для обновления)
+        :type updates: List[Tuple[int, Dict[str, Any]]]
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: Результат обновления для каждой пары
+        :rtype: List[bool]
+        """
+        results = []
+        async with self._transaction(session) as session:
+            for order_id, data in updates:
+                if not data or any(field in PROHIBITED_DATA_UPDATE_DELIVERY for field in data):
+                    results.append(False)
+                    continue
+                result = await session.execute(
+                    update(Delivery).where(Delivery.ID == order_id).values(**data)
+                        .returning(Delivery.Status, Delivery.TargetTimeDelivery)
+                )
+                state = result.one_or_none()
+                results.append(state is not None)
+                if state is not None:
+                    self._publishDelivery(session, order_id, data, tuple(state))
+        return results
     
-    async def deleteOrder(self, order_id: int) -> bool:
+    @measured
+    async def deleteOrder(
+            self,
+            order_id: int,
+            session: Optional[AsyncSession] = None
+        ) -> bool:
         """Удаляет Order
 
         :param order_id: ID ордера
         :type order_id: int
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: True если успешно, в противном случае False
         :rtype: bool
         """
-        async with self._session() as session:
+        async with self._transaction(session) as session:
             result = await session.execute(
             select(Order).where(Order.ID == order_id)
             )
@@ -120,39 +722,346 @@ class DatabaseAdapter:
             if not order:
                 return False
             await session.delete(order)
-            await session.commit()
+
+            def publish() -> None:
+                self.ordersCache.invalidate(order_id)
+                self.deliveriesCache.invalidate(order_id)
+                self._publishStates({order_id: None})
+            self._afterCommit(session, publish)
             return True
 
+    @measured
+    async def pendingDeadlines(self, final_statuses: Iterable[str]) -> List[Tuple[int, datetime]]:
+        """Сроки доставок с TargetTimeDelivery и незавершенным статусом
+
+        :param final_statuses: Завершающие статусы доставки
+        :type final_statuses: Iterable[str]
+        :return: Пары (ID доставки, TargetTimeDelivery)
+        :rtype: List[Tuple[int, datetime]]
+        """
+        async with self._readTransaction() as session:
+            result = await session.execute(
+                select(Delivery.ID, Delivery.TargetTimeDelivery).where(
+                    Delivery.TargetTimeDelivery.is_not(None),
+                    Delivery.Status.not_in(list(final_statuses))
+                )
+            )
+            return [tuple(row) for row in result]
+
+    @measured
+    async def loadStats(self) -> Tuple[Dict[str, int], Dict[datetime, int]]:
+        """Читает агрегаты status_counts и orders_per_hour
+
+        :return: Количество доставок по Status и количество заказов по началу часа
+        :rtype: Tuple[Dict[str, int], Dict[datetime, int]]
+        """
+        async with self._readTransaction() as session:
+            statuses = await session.execute(select(StatusCount.Status, StatusCount.Count))
+            hours = await session.execute(select(HourlyOrderCount.Hour, HourlyOrderCount.Count))
+            return dict(statuses.all()), dict(hours.all())
+
+    async def _countOrdersPerHour(self, session: AsyncSession) -> Dict[datetime, int]:
+        """Количество заказов по началу часа CreationDate по таблице orders"""
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            hour = func.strftime("%Y-%m-%d %H:00:00", Order.CreationDate)
+        elif dialect == "postgresql":
+            hour = func.date_trunc("hour", Order.CreationDate)
+        else:
+            hours = Counter()
+            async for created in await session.stream_scalars(select(Order.CreationDate)):
+                if created is not None:
+                    hours[hourBucket(created)] += 1
+            return hours
+        result = await session.execute(
+            select(hour, func.count()).where(Order.CreationDate.is_not(None)).group_by(hour)
+        )
+        return {
+            datetime.fromisoformat(bucket) if isinstance(bucket, str) else bucket: count
+            for bucket, count in result
+        }
+
+    @measured
+    async def reconcileStats(self) -> Dict[str, Tuple[int, int]]:
+        """Пересчитывает агрегаты status_counts и orders_per_hour с нуля
+
+        Старые строки удаляются первым запросом, поэтому триггеры транзакций
+        записи, начатых позже, ждут пересчета и применяют свои изменения
+        к новым значениям. В PostgreSQL таблицы агрегатов дополнительно
+        блокируются до фиксации.
+
+        :return: Расхождения {"status:<Status>" или "hour:<час>": (было, стало)}
+        :rtype: Dict[str, Tuple[int, int]]
+        """
+        async with self._transaction() as session:
+            if session.get_bind().dialect.name == "postgresql":
+                await session.execute(text(
+                    f"LOCK TABLE {StatusCount.__tablename__}, {HourlyOrderCount.__tablename__} "
+                    "IN EXCLUSIVE MODE"
+                ))
+            previous_statuses = dict((await session.execute(
+                delete(StatusCount).returning(StatusCount.Status, StatusCount.Count)
+            )).all())
+            previous_hours = dict((await session.execute(
+                delete(HourlyOrderCount).returning(HourlyOrderCount.Hour, HourlyOrderCount.Count)
+            )).all())
+            result = await session.execute(
+                select(Delivery.Status, func.count()).where(Delivery.Status.is_not(None))
+                    .group_by(Delivery.Status)
+            )
+            statuses = dict(result.all())
+            hours = await self._countOrdersPerHour(session)
+            if statuses:
+                await session.execute(insert(StatusCount), [
+                    {"Status": status, "Count": count} for status, count in statuses.items()
+                ])
+            if hours:
+                await session.execute(insert(HourlyOrderCount), [
+                    {"Hour": hour, "Count": count} for hour, count in hours.items()
+                ])
+
+            drift = {}
+            for prefix, old, new in (
+                ("status", previous_statuses, statuses),
+                ("hour", previous_hours, hours),
+            ):
+                for key in old.keys() | new.keys():
+                    if old.get(key, 0) != new.get(key, 0):
+                        name = f"{prefix}:{key.isoformat() if prefix == 'hour' else key}"
+                        drift[name] = (old.get(key, 0), new.get(key, 0))
+            return drift
+
+    @measured
+    async def searchOrders(
+            self,
+            match: str,
+            limit: int,
+            offset: int = 0,
+            max_candidates: int = SEARCH_MAX_RESULTS,
+            session: Optional[AsyncSession] = None
+        ) -> List[Tuple[Order, float]]:
+        """Полнотекстовый поиск заказов по названию и адресам
+
+        Сначала индекс FTS5 возвращает страницу ID по релевантности,
+        затем загружаются только эти заказы с доставкой. Ранжируются
+        только max_candidates самых новых совпадений: индекс перебирает
+        их с конца без полного списка, поэтому стоимость запроса по
+        частому слову не растет с размером таблицы.
+
+        :param match: Запрос FTS5, см. database.search.searchQuery
+        :type match: str
+        :param limit: Размер страницы
+        :type limit: int
+        :param offset: Сколько результатов пропустить, defaults to 0
+        :type offset: int, optional
+        :param max_candidates: Максимум ранжируемых совпадений, defaults to SEARCH_MAX_RESULTS
+        :type max_candidates: int, optional
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        :return: Пары (заказ с доставкой, оценка bm25, меньше - релевантнее)
+        :rtype: List[Tuple[Order, float]]
+        """
+        matches = text(f"{SEARCH_TABLE} MATCH :match").bindparams(match=match)
+        candidates = (
+            select(ordersSearch.c.rowid).where(matches)
+                .order_by(ordersSearch.c.rowid.desc()).limit(max_candidates).subquery()
+        )
+        oldest = select(func.min(candidates.c.rowid)).scalar_subquery()
+        hits = (
+            select(ordersSearch.c.rowid.label("ID"), ordersSearch.c.rank.label("rank"))
+                .where(matches, ordersSearch.c.rowid >= func.coalesce(oldest, 0))
+                .order_by(ordersSearch.c.rank)
+                .limit(limit)
+                .offset(offset)
+                .subquery()
+        )
+        async with self._readTransaction(session) as session:
+            result = await session.execute(
+                select(Order, hits.c.rank).join(hits, Order.ID == hits.c.ID)
+                    .options(joinedload(Order.delivery))
+                    .order_by(hits.c.rank, Order.ID)
+            )
+            return [(order, rank) for order, rank in result]
+
+    @measured
+    async def rebuildSearch(self) -> None:
+        """Перестраивает полнотекстовый индекс заказов по таблице orders"""
+        async with self._transaction() as session:
+            await session.execute(text(
+                f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')"
+            ))
+
 
-    async def getUser(self, username: str) -> User:
+    @measured
+    async def getUser(
+            self,
+            username: str,
+            session: Optional[AsyncSession] = None
+        ) -> User:
         """Возвращает объект User
 
         :param username: Имя пользователя
         :type username: str
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: Объект User
         :rtype: User
         """
-        async with self._session() as session:
+        async with self._readTransaction(session) as session:
             result = await session.execute(select(User).where(User.Username == username))
             return result.scalar()
 
-    async def createUser(self, username: str, password: str) -> None:
+    @measured
+    async def createUser(
+            self,
+            username: str,
+            password: str,
+            session: Optional[AsyncSession] = None
+        ) -> None:
         """Создает нового пользователя
 
         :param username: Имя пользователя
         :type username: str
         :param password: Пароль пользователя
         :type password: str
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
         :return: None
         :rtype: None
         """
-        async with self._session() as session:
-            salt = generateSalt()
-            hashed = hashPassword(password, salt)
+        hashed = await self._hasher.hash(password)
+        async with self._transaction(session) as session:
             user = User(
                 Username=username,
-                Salt=salt,
                 Password=hashed
             )
             session.add(user)
-            await session.commit()
\ No newline at end of file
+            self._afterCommit(session, lambda: self.usersCache.invalidate(username))
+
+    @measured
+    async def updateUserPassword(
+            self,
+            username: str,
+            hashed: str,
+            session: Optional[AsyncSession] = None
+        ) -> None:
+        """Сохраняет новый хеш пароля пользователя
+
+        :param username: Имя пользователя
+        :type username: str
+        :param hashed: Хеш пароля в формате algorithm$params$salt$hash
+        :type hashed: str
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        """
+        async with self._transaction(session) as session:
+            await session.execute(
+                update(User).where(User.Username == username)
+                    .values(Salt=None, Password=hashed)
+            )
+            self._afterCommit(session, lambda: self.usersCache.invalidate(username))
+
+    @staticmethod
+    def _utc(timestamp: float) -> datetime:
+        return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+    @measured
+    async def createRefreshToken(
+            self,
+            payload: Dict[str, Any],
+            session: Optional[AsyncSession] = None
+        ) -> None:
+        """Сохраняет выданный refresh токен
+
+        :param payload: Payload refresh токена с jti, fam, sub и exp
+        :type payload: Dict[str, Any]
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        """
+        async with self._transaction(session) as session:
+            session.add(RefreshToken(
+                JTI=payload["jti"],
+                Family=payload["fam"],
+                Username=payload["sub"],
+                ExpiresAt=self._utc(payload["exp"])
+            ))
+
+    @measured
+    async def rotateRefreshToken(
+            self,
+            jti: str,
+            payload: Dict[str, Any]
+        ) -> str:
+        """Помечает refresh токен использованным и сохраняет его замену
+
+        Повторное предъявление использованного токена отзывает всё семейство.
+        Выполняется в собственной транзакции, чтобы отзыв сохранился
+        даже при ответе с ошибкой.
+
+        :param jti: jti предъявленного refresh токена
+        :type jti: str
+        :param payload: Payload нового refresh токена
+        :type payload: Dict[str, Any]
+        :return: "rotated", "reused" или "unknown"
+        :rtype: str
+        """
+        async with self._transaction() as session:
+            result = await session.execute(
+                update(RefreshToken)
+                    .where(RefreshToken.JTI == jti, RefreshToken.Used.is_(False))
+                    .values(Used=True)
+            )
+            if result.rowcount:
+                await self.createRefreshToken(payload, session=session)
+                return "rotated"
+            family = await session.scalar(
+                select(RefreshToken.Family).where(RefreshToken.JTI == jti)
+            )
+            if family is None:
+                return "unknown"
+            await self.revokeTokens([(family, payload["exp"])], session=session)
+            return "reused"
+
+    @measured
+    async def revokeTokens(
+            self,
+            entries: List[Tuple[str, float]],
+            session: Optional[AsyncSession] = None
+        ) -> None:
+        """Отзывает токены или семейства refresh токенов
+
+        После фиксации транзакции идентификаторы попадают в revocationIndex
+        и публикуются остальным воркерам через брокер событий.
+
+        :param entries: Пары (jti или fam, время истечения в секундах Unix)
+        :type entries: List[Tuple[str, float]]
+        :param session: Сессия unit of work, defaults to None
+        :type session: Optional[AsyncSession], optional
+        """
+        async with self._transaction(session) as session:
+            for jti, expires in entries:
+                await session.merge(RevokedToken(JTI=jti, ExpiresAt=self._utc(expires)))
+
+            def publish() -> None:
+                for jti, expires in entries:
+                    revocationIndex.add(jti, expires)
+                broker.publish(REVOCATIONS_TOPIC, dict(entries))
+
+            self._afterCommit(session, publish)
+
+    @measured
+    async def loadRevokedTokens(self) -> List[Tuple[str, float]]:
+        """Удаляет истекшие записи и возвращает действующие отзывы
+
+        :return: Пары (jti или fam, время истечения в секундах Unix)
+        :rtype: List[Tuple[str, float]]
+        """
+        now = self._utc(datetime.now(timezone.utc).timestamp())
+        async with self._transaction() as session:
+            await session.execute(delete(RevokedToken).where(RevokedToken.ExpiresAt <= now))
+            await session.execute(delete(RefreshToken).where(RefreshToken.ExpiresAt <= now))
+            result = await session.execute(select(RevokedToken.JTI, RevokedToken.ExpiresAt))
+            return [
+                (jti, expires.replace(tzinfo=timezone.utc).timestamp())
+                for jti, expires in result
+            ]
\ No newline at end of file
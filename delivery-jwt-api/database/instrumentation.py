@@ -0,0 +1,97 @@
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isasyncgenfunction
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from typing import Any, Callable, Optional
+
+from metrics import dbQueries, dbQueryLatency, dbPoolWait, recordPhase
+
+
+currentOperation: ContextVar[Optional[str]] = ContextVar("currentOperation", default=None)
+
+
+def measured(func: Callable) -> Callable:
+    """Помечает SQL-запросы, выполненные внутри метода, его именем
+
+    Поддерживает корутины и асинхронные генераторы.
+
+    :param func: Метод DatabaseAdapter
+    :type func: Callable
+    :return: Обернутый метод
+    :rtype: Callable
+    """
+    name = func.__name__
+
+    if isasyncgenfunction(func):
+        @wraps(func)
+        async def generator(*args: Any, **kwargs: Any) -> Any:
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    token = currentOperation.set(name)
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        currentOperation.reset(token)
+                    yield item
+            finally:
+                await iterator.aclose()
+        return generator
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = currentOperation.set(name)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            currentOperation.reset(token)
+    return wrapper
+
+async def checkoutConnection(session: AsyncSession) -> None:
+    """Берет соединение для сессии из пула, измеряя время ожидания
+
+    Сессия, уже начавшая транзакцию, не измеряется повторно.
+
+    :param session: Сессия unit of work
+    :type session: AsyncSession
+    """
+    if session.in_transaction():
+        return
+    started = perf_counter()
+    try:
+        await session.connection()
+    finally:
+        elapsed = perf_counter() - started
+        dbPoolWait.observe(elapsed)
+        recordPhase("pool", elapsed)
+
+def instrumentEngine(engine: AsyncEngine) -> None:
+    """Подключает к движку сбор метрик SQL-запросов
+
+    :param engine: Асинхронный движок SQLAlchemy
+    :type engine: AsyncEngine
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def beforeCursorExecute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def afterCursorExecute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_started"].pop()
+        operation = currentOperation.get() or "other"
+        dbQueries.inc(operation)
+        dbQueryLatency.observe(elapsed, operation)
+        recordPhase("db", elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handleError(context):
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
@@ -0,0 +1,116 @@
+from datetime import datetime
+from heapq import heapify, heappop, heappush, nsmallest
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from metrics import overdueDeliveries
+
+
+DELIVERY_STATES_TOPIC = "delivery-states"
+
+
+class OverdueTracker:
+    """Отслеживание доставок, у которых прошел TargetTimeDelivery
+
+    Незавершенные сроки хранятся в куче (срок, ID) с ленивым удалением:
+    изменение доставки стоит O(log n), устаревшие записи кучи отбрасываются
+    при извлечении. Фоновая задача спит до ближайшего срока или до
+    следующего изменения и переносит наступившие сроки в набор просроченных.
+    Изменения приходят через брокер событий, тема DELIVERY_STATES_TOPIC.
+    """
+
+    def __init__(self, final_statuses: Iterable[str]):
+        """
+        :param final_statuses: Статусы, после которых доставка не отслеживается
+        :type final_statuses: Iterable[str]
+        """
+        self._final = frozenset(final_statuses)
+        self._deadlines: Dict[int, datetime] = {}
+        self._heap: List[Tuple[datetime, int]] = []
+        self._overdue: Dict[int, datetime] = {}
+
+    def load(self, deadlines: Iterable[Tuple[int, datetime]]) -> None:
+        """Заполняет трекер сроками незавершенных доставок
+
+        :param deadlines: Пары (ID доставки, TargetTimeDelivery)
+        :type deadlines: Iterable[Tuple[int, datetime]]
+        """
+        self._deadlines = dict(deadlines)
+        self._overdue.clear()
+        self._heap = [(target, order_id) for order_id, target in self._deadlines.items()]
+        heapify(self._heap)
+        self.expire(datetime.now())
+
+    def update(self, order_id: int, status: Optional[str], target: Optional[datetime]) -> None:
+        """Учитывает новое состояние доставки
+
+        :param order_id: ID доставки
+        :type order_id: int
+        :param status: Статус, None если доставка удалена
+        :type status: Optional[str]
+        :param target: TargetTimeDelivery
+        :type target: Optional[datetime]
+        """
+        self._deadlines.pop(order_id, None)
+        self._overdue.pop(order_id, None)
+        if status is None or target is None or status in self._final:
+            overdueDeliveries.set(len(self._overdue))
+            return
+        self._deadlines[order_id] = target
+        heappush(self._heap, (target, order_id))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(target, order_id) for order_id, target in self._deadlines.items()]
+            heapify(self._heap)
+        self.expire(datetime.now())
+
+    def expire(self, now: datetime) -> Optional[float]:
+        """Переносит наступившие сроки в просроченные
+
+        :param now: Текущее время
+        :type now: datetime
+        :return: Секунд до ближайшего срока, None если сроков нет
+        :rtype: Optional[float]
+        """
+        while self._heap and self._heap[0][0] <= now:
+            target, order_id = heappop(self._heap)
+            if self._deadlines.get(order_id) == target:
+                del self._deadlines[order_id]
+                self._overdue[order_id] = target
+        overdueDeliveries.set(len(self._overdue))
+        return (self._heap[0][0] - now).total_seconds() if self._heap else None
+
+    def apply(self, event: Dict[str, Any]) -> None:
+        """Применяет событие DELIVERY_STATES_TOPIC
+
+        :param event: Словарь {ID доставки: [Status, TargetTimeDelivery в ISO 8601]
+            или None, если доставка удалена}
+        :type event: Dict[str, Any]
+        """
+        for order_id, state in event.items():
+            status, target = state if state is not None else (None, None)
+            self.update(int(order_id), status, datetime.fromisoformat(target) if target else None)
+
+    async def follow(self, subscription: Any) -> None:
+        """Применяет изменения доставок и отмечает просрочки до отмены задачи
+
+        :param subscription: Подписка брокера событий на DELIVERY_STATES_TOPIC
+        :type subscription: Any
+        """
+        while True:
+            timeout = self.expire(datetime.now())
+            for event in await subscription.get(timeout):
+                self.apply(event)
+
+    def overdue(self, limit: int) -> List[Tuple[int, datetime]]:
+        """Просроченные доставки, начиная с самого раннего срока
+
+        :param limit: Максимум доставок
+        :type limit: int
+        :return: Пары (ID доставки, TargetTimeDelivery)
+        :rtype: List[Tuple[int, datetime]]
+        """
+        self.expire(datetime.now())
+        return nsmallest(limit, self._overdue.items(), key=lambda item: (item[1], item[0]))
+
+    def __len__(self) -> int:
+        return len(self._overdue)
@@ -0,0 +1,149 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from typing import Any, Dict, Optional
+
+
+class EngineProfile:
+    """Настройки движка SQLAlchemy для одного бэкенда базы данных
+
+    Профиль задает параметры create_async_engine и пула по умолчанию,
+    а для SQLite - PRAGMA, которые выполняются на каждом новом соединении.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        engine_options: Optional[Dict[str, Any]] = None,
+        pool_options: Optional[Dict[str, Any]] = None,
+        pragmas: Optional[Dict[str, Any]] = None,
+        read_pragmas: Optional[Dict[str, Any]] = None
+    ):
+        """
+        :param name: Имя профиля, совпадает с диалектом SQLAlchemy
+        :type name: str
+        :param engine_options: Параметры create_async_engine, defaults to None
+        :type engine_options: Optional[Dict[str, Any]], optional
+        :param pool_options: Параметры пула соединений, defaults to None
+        :type pool_options: Optional[Dict[str, Any]], optional
+        :param pragmas: PRAGMA соединений записи, defaults to None
+        :type pragmas: Optional[Dict[str, Any]], optional
+        :param read_pragmas: PRAGMA соединений движка чтения, defaults to None
+        :type read_pragmas: Optional[Dict[str, Any]], optional
+        """
+        self.name = name
+        self.engineOptions = engine_options or {}
+        self.poolOptions = pool_options or {}
+        self.pragmas = pragmas or {}
+        self.readPragmas = read_pragmas or {}
+
+    def options(self, url: str, pool_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Собирает параметры create_async_engine
+
+        Явно заданные параметры пула перекрывают значения профиля.
+        Для SQLite в памяти пул не настраивается: там одно общее соединение.
+
+        :param url: URL базы данных
+        :type url: str
+        :param pool_options: Параметры пула из конфигурации
+        :type pool_options: Dict[str, Any]
+        :return: Параметры движка
+        :rtype: Dict[str, Any]
+        """
+        options = dict(self.engineOptions)
+        if make_url(url).database not in (None, "", ":memory:"):
+            options.update(self.poolOptions)
+            options.update(pool_options)
+        return options
+
+    def configure(
+        self,
+        engine: AsyncEngine,
+        read_only: bool = False,
+        pragmas: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Подключает выполнение PRAGMA на каждом новом соединении движка
+
+        :param engine: Асинхронный движок SQLAlchemy
+        :type engine: AsyncEngine
+        :param read_only: Движок только для чтения, defaults to False
+        :type read_only: bool, optional
+        :param pragmas: PRAGMA из конфигурации поверх профиля, defaults to None
+        :type pragmas: Optional[Dict[str, Any]], optional
+        """
+        statements = [
+            f"PRAGMA {pragma}={value}"
+            for pragma, value in {
+                **(self.readPragmas if read_only else self.pragmas),
+                **(pragmas or {})
+            }.items()
+        ]
+        if not statements:
+            return
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def applyPragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+
+
+_SQLITE_PRAGMAS = {
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+
+PROFILES: Dict[str, EngineProfile] = {
+    "default": EngineProfile("default"),
+    "sqlite": EngineProfile(
+        "sqlite",
+        pool_options={"pool_size": 5, "max_overflow": 5, "pool_timeout": 30},
+        pragmas={"journal_mode": "WAL", **_SQLITE_PRAGMAS},
+        read_pragmas={**_SQLITE_PRAGMAS, "query_only": "ON"}
+    ),
+    "postgresql": EngineProfile(
+        "postgresql",
+        pool_options={
+            "pool_size": 10,
+            "max_overflow": 10,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        }
+    ),
+}
+
+
+def registerProfile(profile: EngineProfile) -> None:
+    """Регистрирует профиль движка
+
+    :param profile: Профиль
+    :type profile: EngineProfile
+    """
+    PROFILES[profile.name] = profile
+
+def profileFor(url: str, name: str = "auto") -> EngineProfile:
+    """Выбирает профиль движка
+
+    "auto" выбирает профиль по диалекту URL, а при его отсутствии - "default".
+
+    :param url: URL базы данных
+    :type url: str
+    :param name: Имя профиля, defaults to "auto"
+    :type name: str, optional
+    :raises ValueError: Если профиль не зарегистрирован
+    :return: Профиль движка
+    :rtype: EngineProfile
+    """
+    if name == "auto":
+        return PROFILES.get(make_url(url).get_backend_name(), PROFILES["default"])
+    if name not in PROFILES:
+        raise ValueError(f"Unknown database profile: {name}")
+    return PROFILES[name]
@@ -0,0 +1,62 @@
+from re import compile as compileRegex
+
+from sqlalchemy import column, table
+
+from typing import Optional, Tuple
+
+
+SEARCH_TABLE = "orders_search"
+ordersSearch = table(SEARCH_TABLE, column("rowid"), column("rank"))
+
+# Внешнее содержимое: индекс хранит только токены, строки читаются из orders.
+# Вес bm25 названия заказа выше, чем адресов.
+SQLITE_SEARCH_DDL: Tuple[str, ...] = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        "Name", "PickUpAddress", "DeliveryAddress",
+        content='orders', content_rowid='ID',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(3.0, 1.0, 1.0)')",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON orders BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, "Name", "PickUpAddress", "DeliveryAddress")
+            VALUES (NEW."ID", NEW."Name", NEW."PickUpAddress", NEW."DeliveryAddress");
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON orders BEGIN
+        INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, "Name", "PickUpAddress", "DeliveryAddress")
+            VALUES ('delete', OLD."ID", OLD."Name", OLD."PickUpAddress", OLD."DeliveryAddress");
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update
+    AFTER UPDATE OF "Name", "PickUpAddress", "DeliveryAddress" ON orders BEGIN
+        INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, "Name", "PickUpAddress", "DeliveryAddress")
+            VALUES ('delete', OLD."ID", OLD."Name", OLD."PickUpAddress", OLD."DeliveryAddress");
+        INSERT INTO {SEARCH_TABLE} (rowid, "Name", "PickUpAddress", "DeliveryAddress")
+            VALUES (NEW."ID", NEW."Name", NEW."PickUpAddress", NEW."DeliveryAddress");
+    END
+    """,
+)
+
+_TERM = compileRegex(r"\w+")
+
+
+def searchQuery(text: str, max_terms: int) -> Optional[str]:
+    """Преобразует строку поиска в запрос FTS5
+
+    Каждое слово ищется как префикс, все слова обязательны. Операторы
+    и спецсимволы FTS5 из строки не попадают в запрос.
+
+    :param text: Строка поиска
+    :type text: str
+    :param max_terms: Максимум слов, остальные отбрасываются
+    :type max_terms: int
+    :return: Запрос для MATCH или None, если в строке нет слов
+    :rtype: Optional[str]
+    """
+    terms = _TERM.findall(text.lower())[:max_terms]
+    return " ".join(f'"{term}"*' for term in terms) or None
@@ -0,0 +1,174 @@
+from asyncio import Lock
+from datetime import datetime, timedelta
+from time import monotonic
+
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+SQLITE_TRIGGERS = {
+    "status_counts_insert": ("""
+        CREATE TRIGGER IF NOT EXISTS status_counts_insert AFTER INSERT ON deliveries
+        WHEN NEW."Status" IS NOT NULL BEGIN
+            INSERT INTO status_counts ("Status", "Count") VALUES (NEW."Status", 1)
+                ON CONFLICT ("Status") DO UPDATE SET "Count" = "Count" + 1;
+        END
+    """,),
+    "status_counts_update": ("""
+        CREATE TRIGGER IF NOT EXISTS status_counts_update AFTER UPDATE OF "Status" ON deliveries
+        WHEN OLD."Status" IS NOT NEW."Status" BEGIN
+            UPDATE status_counts SET "Count" = "Count" - 1 WHERE "Status" = OLD."Status";
+            INSERT INTO status_counts ("Status", "Count")
+                SELECT NEW."Status", 1 WHERE NEW."Status" IS NOT NULL
+                ON CONFLICT ("Status") DO UPDATE SET "Count" = "Count" + 1;
+        END
+    """,),
+    "status_counts_delete": ("""
+        CREATE TRIGGER IF NOT EXISTS status_counts_delete AFTER DELETE ON deliveries BEGIN
+            UPDATE status_counts SET "Count" = "Count" - 1 WHERE "Status" = OLD."Status";
+        END
+    """,),
+    "orders_per_hour_insert": ("""
+        CREATE TRIGGER IF NOT EXISTS orders_per_hour_insert AFTER INSERT ON orders
+        WHEN NEW."CreationDate" IS NOT NULL BEGIN
+            INSERT INTO orders_per_hour ("Hour", "Count")
+                VALUES (strftime('%Y-%m-%d %H:00:00.000000', NEW."CreationDate"), 1)
+                ON CONFLICT ("Hour") DO UPDATE SET "Count" = "Count" + 1;
+        END
+    """,),
+    "orders_per_hour_delete": ("""
+        CREATE TRIGGER IF NOT EXISTS orders_per_hour_delete AFTER DELETE ON orders BEGIN
+            UPDATE orders_per_hour SET "Count" = "Count" - 1
+                WHERE "Hour" = strftime('%Y-%m-%d %H:00:00.000000', OLD."CreationDate");
+        END
+    """,),
+}
+
+POSTGRESQL_TRIGGERS = {
+    "status_counts_change": (
+        """
+        CREATE OR REPLACE FUNCTION count_delivery_status() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' AND OLD."Status" IS NOT NULL THEN
+                UPDATE status_counts SET "Count" = "Count" - 1 WHERE "Status" = OLD."Status";
+            END IF;
+            IF TG_OP <> 'DELETE' AND NEW."Status" IS NOT NULL THEN
+                INSERT INTO status_counts ("Status", "Count") VALUES (NEW."Status", 1)
+                    ON CONFLICT ("Status") DO UPDATE SET "Count" = status_counts."Count" + 1;
+            END IF;
+            RETURN NULL;
+        END $$
+        """,
+        """
+        CREATE TRIGGER status_counts_change AFTER INSERT OR DELETE ON deliveries
+            FOR EACH ROW EXECUTE FUNCTION count_delivery_status()
+        """,
+        """
+        CREATE TRIGGER status_counts_update AFTER UPDATE OF "Status" ON deliveries
+            FOR EACH ROW WHEN (OLD."Status" IS DISTINCT FROM NEW."Status")
+            EXECUTE FUNCTION count_delivery_status()
+        """,
+    ),
+    "orders_per_hour_change": (
+        """
+        CREATE OR REPLACE FUNCTION count_orders_per_hour() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                UPDATE orders_per_hour SET "Count" = "Count" - 1
+                    WHERE "Hour" = date_trunc('hour', OLD."CreationDate");
+            ELSIF NEW."CreationDate" IS NOT NULL THEN
+                INSERT INTO orders_per_hour ("Hour", "Count")
+                    VALUES (date_trunc('hour', NEW."CreationDate"), 1)
+                    ON CONFLICT ("Hour") DO UPDATE SET "Count" = orders_per_hour."Count" + 1;
+            END IF;
+            RETURN NULL;
+        END $$
+        """,
+        """
+        CREATE TRIGGER orders_per_hour_change AFTER INSERT OR DELETE ON orders
+            FOR EACH ROW EXECUTE FUNCTION count_orders_per_hour()
+        """,
+    ),
+}
+
+# Триггеры по диалекту: {имя: DDL} и запрос имен существующих триггеров
+STATS_TRIGGERS: Dict[str, Tuple[Dict[str, Tuple[str, ...]], str]] = {
+    "sqlite": (SQLITE_TRIGGERS, "SELECT name FROM sqlite_master WHERE type = 'trigger'"),
+    "postgresql": (POSTGRESQL_TRIGGERS, "SELECT tgname FROM pg_trigger"),
+}
+
+
+def hourBucket(moment: datetime) -> datetime:
+    """Начало часа, к которому относится момент
+
+    :param moment: Момент времени
+    :type moment: datetime
+    :return: Момент с обнуленными минутами, секундами и микросекундами
+    :rtype: datetime
+    """
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class StatsMirror:
+    """Копия агрегатов status_counts и orders_per_hour в памяти
+
+    Агрегаты обновляются триггерами в транзакции, изменившей доставку
+    или заказ. Копия перечитывает две небольшие таблицы не чаще одного
+    раза за max_age секунд, одновременные запросы ждут одно чтение.
+    """
+
+    def __init__(self, max_age: float):
+        """
+        :param max_age: Максимальный возраст копии в секундах
+        :type max_age: float
+        """
+        self.maxAge = max_age
+        self.statuses: Dict[str, int] = {}
+        self.hours: Dict[datetime, int] = {}
+        self._loadedAt: Optional[float] = None
+        self._lock = Lock()
+
+    def load(self, statuses: Dict[str, int], hours: Dict[datetime, int]) -> None:
+        """Заменяет копию значениями из таблиц агрегатов
+
+        :param statuses: Количество доставок по Status
+        :type statuses: Dict[str, int]
+        :param hours: Количество заказов по началу часа CreationDate
+        :type hours: Dict[datetime, int]
+        """
+        self.statuses = {status: count for status, count in statuses.items() if count}
+        self.hours = {hour: count for hour, count in hours.items() if count}
+        self._loadedAt = monotonic()
+
+    def _fresh(self) -> bool:
+        return self._loadedAt is not None and monotonic() - self._loadedAt < self.maxAge
+
+    async def refresh(
+        self,
+        reload: Callable[[], Awaitable[Tuple[Dict[str, int], Dict[datetime, int]]]]
+    ) -> None:
+        """Перечитывает агрегаты, если копия старше max_age
+
+        :param reload: Загрузка агрегатов, например DatabaseAdapter.loadStats
+        :type reload: Callable[[], Awaitable[Tuple[Dict[str, int], Dict[datetime, int]]]]
+        """
+        if self._fresh():
+            return
+        async with self._lock:
+            if not self._fresh():
+                self.load(*await reload())
+
+    def series(self, hours: int, now: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        """Заказы по часам за последние hours часов, включая текущий
+
+        :param hours: Количество часов
+        :type hours: int
+        :param now: Текущее время, defaults to None
+        :type now: Optional[datetime], optional
+        :return: Пары (начало часа, количество заказов) по возрастанию, без пропусков
+        :rtype: List[Tuple[datetime, int]]
+        """
+        current = hourBucket(now or datetime.now())
+        return [
+            (hour, self.hours.get(hour, 0))
+            for hour in (current - timedelta(hours=offset) for offset in range(hours - 1, -1, -1))
+        ]
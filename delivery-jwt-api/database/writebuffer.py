@@ -0,0 +1,181 @@
+from asyncio import CancelledError, Event, Lock, Task, create_task, wait_for, \
+        TimeoutError as AsyncTimeoutError
+from datetime import datetime
+from logging import getLogger
+
+from typing import Any, Dict, Optional, Tuple
+
+from models import Order
+from metrics import deliveryBufferUpdates, deliveryBufferFlushes
+from .adapter import DatabaseAdapter
+
+
+logger = getLogger(__name__)
+
+
+class DeliveryWriteBuffer:
+    """Буфер отложенной записи обновлений доставок
+
+    Обновления копятся в памяти по ID заказа, поля сливаются по правилу
+    "последняя запись побеждает". Буфер сбрасывается одной транзакцией
+    каждые interval секунд или при накоплении max_entries заказов.
+    Записываемая пачка остается видна через pending до фиксации.
+    """
+
+    def __init__(
+        self,
+        adapter: DatabaseAdapter,
+        interval: float,
+        max_entries: int
+    ):
+        """
+        :param adapter: Адаптер базы данных
+        :type adapter: DatabaseAdapter
+        :param interval: Период сброса в секундах
+        :type interval: float
+        :param max_entries: Количество заказов в буфере, при котором сброс начинается досрочно
+        :type max_entries: int
+        """
+        self._adapter = adapter
+        self._interval = interval
+        self._maxEntries = max_entries
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._inflight: Dict[int, Dict[str, Any]] = {}
+        self._wake = Event()
+        self._lock = Lock()
+        self._task: Optional[Task] = None
+
+    def pending(self, order_id: int) -> Optional[Dict[str, Any]]:
+        """Возвращает еще не зафиксированные поля доставки
+
+        Поля пачки, которая сейчас записывается, дополняются более
+        новыми полями из буфера.
+
+        :param order_id: ID заказа
+        :type order_id: int
+        :return: Поля Delivery или None
+        :rtype: Optional[Dict[str, Any]]
+        """
+        inflight = self._inflight.get(order_id)
+        pending = self._pending.get(order_id)
+        if inflight is None or pending is None:
+            return pending if inflight is None else inflight
+        return {**inflight, **pending}
+
+    async def submit(self, order_id: int, data: Dict[str, Any]) -> bool:
+        """Добавляет обновление доставки в буфер
+
+        Существование доставки проверяется один раз и запоминается
+        в DatabaseAdapter.deliveriesCache, deleteOrder сбрасывает запись.
+        Результат проверки не запоминается, если запись сбросили во время нее.
+
+        :param order_id: ID заказа
+        :type order_id: int
+        :param data: Поля Delivery для обновления
+        :type data: Dict[str, Any]
+        :return: False если доставка не найдена
+        :rtype: bool
+        """
+        known = self._adapter.deliveriesCache
+        if known.get(order_id) is None:
+            version = known.version()
+            if not await self._adapter.deliveryExists(order_id):
+                return False
+            known.set(order_id, True, since=version)
+        pending = self._pending.get(order_id)
+        if pending is None:
+            self._pending[order_id] = dict(data)
+            deliveryBufferUpdates.inc("buffered")
+        else:
+            pending.update(data)
+            deliveryBufferUpdates.inc("coalesced")
+        self._adapter.ordersCache.invalidate(order_id)
+        if len(self._pending) >= self._maxEntries:
+            self._wake.set()
+        return True
+
+    async def flush(self) -> int:
+        """Записывает накопленные обновления одной транзакцией
+
+        При ошибке обновления возвращаются в буфер под более новые значения.
+        Обновления удаленных за это время доставок отбрасываются с записью
+        в лог и метрикой delivery_buffer_updates_total{result="dropped"}.
+
+        :return: Количество записанных заказов
+        :rtype: int
+        """
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch = self._inflight = self._pending
+            self._pending = {}
+            updates = list(batch.items())
+            try:
+                results = await self._adapter.updateDeliveries(updates)
+            except Exception:
+                logger.exception("Delivery write buffer flush failed, %d orders kept", len(batch))
+                deliveryBufferFlushes.inc("failed")
+                for order_id, data in batch.items():
+                    self._pending[order_id] = {**data, **self._pending.get(order_id, {})}
+                return 0
+            finally:
+                self._inflight = {}
+            deliveryBufferFlushes.inc("ok")
+            dropped = [order_id for (order_id, _), success in zip(updates, results) if not success]
+            for order_id in dropped:
+                self._adapter.deliveriesCache.invalidate(order_id)
+                deliveryBufferUpdates.inc("dropped")
+            if dropped:
+                logger.warning("Delivery write buffer dropped updates of deleted orders: %s", dropped)
+            return len(updates) - len(dropped)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await wait_for(self._wake.wait(), self._interval)
+            except AsyncTimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Запускает периодический сброс буфера"""
+        if self._task is None:
+            self._task = create_task(self._run())
+
+    async def close(self) -> None:
+        """Останавливает периодический сброс и записывает остаток буфера"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._pending:
+            logger.error("Delivery write buffer closed with %d unsaved orders", len(self._pending))
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+
+def deliveryState(
+    order: Order,
+    buffer: Optional[DeliveryWriteBuffer]
+) -> Tuple[Optional[str], Optional[datetime]]:
+    """Status и TargetTimeDelivery доставки с учетом еще не зафиксированных обновлений
+
+    :param order: Объект Order с загруженной доставкой
+    :type order: Order
+    :param buffer: Буфер отложенной записи или None, если он отключен
+    :type buffer: Optional[DeliveryWriteBuffer]
+    :return: Пара (Status, TargetTimeDelivery)
+    :rtype: Tuple[Optional[str], Optional[datetime]]
+    """
+    delivery_status, target = order.delivery.Status, order.delivery.TargetTimeDelivery
+    pending = buffer.pending(order.ID) if buffer is not None else None
+    if pending:
+        delivery_status = pending.get("Status", delivery_status)
+        target = pending.get("TargetTimeDelivery", target)
+    return delivery_status, target
\ No newline at end of file
@@ -0,0 +1,29 @@
+from .broker import Broker, LocalBroker, UnixSocketBroker, Subscription
+
+from config import EVENTS_BROKER, EVENTS_SOCKET_DIR
+from runtime import declareState, WORKER, SHARED
+
+
+def createBroker(kind: str) -> Broker:
+    """Создает брокер событий по имени из конфигурации
+
+    :param kind: "local" - один процесс, "unix" - все воркеры на машине
+    :type kind: str
+    :raises ValueError: Если тип брокера неизвестен
+    :return: Брокер событий
+    :rtype: Broker
+    """
+    if kind == "local":
+        return LocalBroker()
+    if kind == "unix":
+        return UnixSocketBroker(EVENTS_SOCKET_DIR)
+    raise ValueError(f"Unknown events broker: {kind}")
+
+
+broker = createBroker(EVENTS_BROKER)
+declareState(
+    "events.broker",
+    WORKER if EVENTS_BROKER == "local" else SHARED,
+    "delivery events and revocations reach subscribers of the publishing worker only"
+    if EVENTS_BROKER == "local" else "events fan out to every worker on the host"
+)
\ No newline at end of file
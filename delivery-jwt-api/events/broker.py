@@ -0,0 +1,291 @@
+from asyncio import Event, wait_for, TimeoutError as AsyncTimeoutError, get_running_loop
+from collections import OrderedDict
+from itertools import islice
+from json import loads
+from logging import getLogger
+from os import getpid, makedirs, scandir, unlink
+from os.path import join
+from socket import socket, AF_UNIX, SOCK_DGRAM, MSG_TRUNC
+from time import monotonic
+
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set
+
+from serialization import dumps
+
+
+logger = getLogger(__name__)
+
+
+class Subscription:
+    """Подписка на события по набору тем
+
+    Для каждой темы хранится одно ожидающее событие: если потребитель
+    не успевает читать, новые события сливаются с ожидающим (последнее
+    значение поля побеждает), поэтому память подписки ограничена числом тем.
+    """
+
+    def __init__(self):
+        self.topics: Set[Hashable] = set()
+        self.merged = 0
+        self._pending: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._ready = Event()
+
+    def put(self, topic: Hashable, event: Dict[str, Any]) -> None:
+        """Добавляет событие, сливая его с ожидающим событием той же темы
+
+        :param topic: Тема события
+        :type topic: Hashable
+        :param event: Событие
+        :type event: Dict[str, Any]
+        """
+        pending = self._pending.get(topic)
+        if pending is not None:
+            pending.update(event)
+            self.merged += 1
+        else:
+            self._pending[topic] = dict(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Ожидает и забирает все накопленные события
+
+        :param timeout: Максимальное время ожидания в секундах, defaults to None
+        :type timeout: Optional[float], optional
+        :return: События или пустой список, если за timeout событий не было
+        :rtype: List[Dict[str, Any]]
+        """
+        if not self._pending:
+            try:
+                await wait_for(self._ready.wait(), timeout)
+            except AsyncTimeoutError:
+                return []
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        return events
+
+
+class Broker:
+    """Интерфейс брокера событий
+
+    publish вызывается синхронно, например из колбэков после фиксации транзакции.
+    """
+
+    async def start(self) -> None:
+        """Подготавливает брокер к работе"""
+
+    async def close(self) -> None:
+        """Освобождает ресурсы брокера"""
+
+    def publish(self, topic: Hashable, event: Dict[str, Any]) -> None:
+        """Публикует событие всем подписчикам темы
+
+        :param topic: Тема события
+        :type topic: Hashable
+        :param event: Событие, значения должны кодироваться в JSON
+        :type event: Dict[str, Any]
+        """
+        raise NotImplementedError
+
+    def subscribe(
+        self,
+        topics: Iterable[Hashable],
+        subscription: Optional[Subscription] = None
+    ) -> Subscription:
+        """Подписывает на темы, создавая подписку при необходимости
+
+        :param topics: Темы
+        :type topics: Iterable[Hashable]
+        :param subscription: Существующая подписка, defaults to None
+        :type subscription: Optional[Subscription], optional
+        :return: Подписка
+        :rtype: Subscription
+        """
+        raise NotImplementedError
+
+    def unsubscribe(
+        self,
+        subscription: Subscription,
+        topics: Optional[Iterable[Hashable]] = None
+    ) -> None:
+        """Отписывает от тем, по умолчанию от всех
+
+        :param subscription: Подписка
+        :type subscription: Subscription
+        :param topics: Темы, defaults to None
+        :type topics: Optional[Iterable[Hashable]], optional
+        """
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """Брокер событий внутри одного процесса"""
+
+    def __init__(self):
+        self._subscribers: Dict[Hashable, Set[Subscription]] = {}
+
+    def _deliver(self, topic: Hashable, event: Dict[str, Any]) -> None:
+        for subscription in self._subscribers.get(topic, ()):
+            subscription.put(topic, event)
+
+    def publish(self, topic: Hashable, event: Dict[str, Any]) -> None:
+        self._deliver(topic, event)
+
+    def subscribe(
+        self,
+        topics: Iterable[Hashable],
+        subscription: Optional[Subscription] = None
+    ) -> Subscription:
+        subscription = subscription or Subscription()
+        for topic in topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+            subscription.topics.add(topic)
+        return subscription
+
+    def unsubscribe(
+        self,
+        subscription: Subscription,
+        topics: Optional[Iterable[Hashable]] = None
+    ) -> None:
+        for topic in list(subscription.topics if topics is None else topics):
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+            subscription.topics.discard(topic)
+
+    def __len__(self) -> int:
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+class UnixSocketBroker(LocalBroker):
+    """Брокер, рассылающий события воркерам на одной машине
+
+    Каждый процесс слушает свой unix datagram сокет в общем каталоге,
+    publish доставляет событие локально и отправляет его во все остальные
+    сокеты каталога. Если очередь сокета получателя заполнена или отправка
+    не удалась, событие для него отбрасывается, чтобы не блокировать
+    event loop и не ломать уже зафиксированную запись.
+
+    Событие больше max_datagram делится по ключам на несколько датаграмм:
+    подписки и так сливают события темы, поэтому результат тот же.
+    Список сокетов кэшируется и перечитывается раз в peers_ttl секунд,
+    после ошибки отправки и когда новый воркер присылает пустую датаграмму
+    при старте.
+    """
+
+    def __init__(self, directory: str, max_datagram: int = 65536, peers_ttl: float = 1.0):
+        """
+        :param directory: Каталог сокетов воркеров
+        :type directory: str
+        :param max_datagram: Максимальный размер датаграммы в байтах, defaults to 65536
+        :type max_datagram: int, optional
+        :param peers_ttl: Время жизни кэша сокетов в секундах, defaults to 1.0
+        :type peers_ttl: float, optional
+        """
+        super().__init__()
+        self._directory = directory
+        self._maxDatagram = max_datagram
+        self._peersTTL = peers_ttl
+        self._peers: Optional[List[str]] = None
+        self._peersLoadedAt = 0.0
+        self._path: Optional[str] = None
+        self._socket: Optional[socket] = None
+        self.dropped = 0
+
+    async def start(self) -> None:
+        makedirs(self._directory, exist_ok=True)
+        self._path = join(self._directory, f"{getpid()}.sock")
+        try:
+            unlink(self._path)
+        except FileNotFoundError:
+            pass
+        self._socket = socket(AF_UNIX, SOCK_DGRAM)
+        self._socket.bind(self._path)
+        self._socket.setblocking(False)
+        get_running_loop().add_reader(self._socket.fileno(), self._receive)
+        for peer in self._listPeers():
+            self._send(b"", peer)
+
+    async def close(self) -> None:
+        if self._socket is None:
+            return
+        get_running_loop().remove_reader(self._socket.fileno())
+        self._socket.close()
+        self._socket = None
+        try:
+            unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                data, _, flags, _ = self._socket.recvmsg(self._maxDatagram)
+            except BlockingIOError:
+                return
+            except OSError:
+                logger.exception("Events broker failed to receive a datagram")
+                return
+            if not data:
+                self._peers = None
+                continue
+            try:
+                if flags & MSG_TRUNC:
+                    raise ValueError(f"datagram exceeds {self._maxDatagram} bytes")
+                topic, event = loads(data)
+            except ValueError as e:
+                self.dropped += 1
+                logger.warning("Events broker dropped an undecodable datagram: %s", e)
+                continue
+            self._deliver(topic, event)
+
+    def _listPeers(self) -> List[str]:
+        now = monotonic()
+        if self._peers is None or now - self._peersLoadedAt >= self._peersTTL:
+            self._peers = [
+                entry.path for entry in scandir(self._directory)
+                if entry.path != self._path and entry.name.endswith(".sock")
+            ]
+            self._peersLoadedAt = now
+        return self._peers
+
+    def _datagrams(self, topic: Hashable, event: Dict[str, Any]) -> Iterator[bytes]:
+        data = dumps([topic, event])
+        if len(data) <= self._maxDatagram:
+            yield data
+        elif len(event) > 1:
+            half = len(event) // 2
+            yield from self._datagrams(topic, dict(islice(event.items(), half)))
+            yield from self._datagrams(topic, dict(islice(event.items(), half, None)))
+        else:
+            self.dropped += 1
+            logger.warning("Events broker dropped a %d byte event of topic %r", len(data), topic)
+
+    def _send(self, data: bytes, peer: str) -> None:
+        try:
+            self._socket.sendto(data, peer)
+        except BlockingIOError:
+            self.dropped += 1
+        except (ConnectionRefusedError, FileNotFoundError):
+            try:
+                unlink(peer)
+            except OSError:
+                pass
+            self._peers = None
+        except OSError as e:
+            self.dropped += 1
+            logger.warning("Events broker failed to send to %s: %s", peer, e)
+            self._peers = None
+
+    def publish(self, topic: Hashable, event: Dict[str, Any]) -> None:
+        self._deliver(topic, event)
+        if self._socket is None:
+            return
+        peers = self._listPeers()
+        if not peers:
+            return
+        for data in self._datagrams(topic, event):
+            for peer in peers:
+                self._send(data, peer)
\ No newline at end of file
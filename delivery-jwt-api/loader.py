@@ -1,21 +1,96 @@
-from database import DatabaseAdapter
+from database import DatabaseAdapter, DeliveryWriteBuffer, OverdueTracker, StatsMirror, \
+        DELIVERY_STATES_TOPIC
+from auth import PasswordHasher, revocationIndex, REVOCATIONS_TOPIC
+from events import broker
+from runtime import declareState, WORKER, SHARED
 from fastapi import FastAPI
-from contextlib import asynccontextmanager
+from asyncio import CancelledError, create_task
+from contextlib import asynccontextmanager, suppress
 
-from config import DATABASE_URL
+from config import DATABASE_URL, HASH_WORKERS, HASH_QUEUE_SIZE, \
+        HASH_EXECUTOR, PASSWORD_HASH_ALGORITHM, PASSWORD_HASH_PARAMS, \
+        DELIVERY_WRITE_BUFFER, DELIVERY_FLUSH_INTERVAL, DELIVERY_FLUSH_MAX_ENTRIES, \
+        DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, \
+        DATABASE_PROFILE, DATABASE_READ_URL, DATABASE_PRAGMAS, \
+        OVERDUE_TRACKER, DELIVERY_FINAL_STATUSES, STATS_MAX_AGE
 
 
-app = FastAPI(title="Delivery Service API")
-AdapterDB = DatabaseAdapter(DATABASE_URL)
+Hasher = PasswordHasher(
+    HASH_WORKERS,
+    HASH_QUEUE_SIZE,
+    HASH_EXECUTOR,
+    PASSWORD_HASH_ALGORITHM,
+    PASSWORD_HASH_PARAMS
+)
+AdapterDB = DatabaseAdapter(
+    DATABASE_URL,
+    Hasher,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    DATABASE_PROFILE,
+    DATABASE_READ_URL,
+    DATABASE_PRAGMAS
+)
+DeliveryBuffer = DeliveryWriteBuffer(
+    AdapterDB,
+    DELIVERY_FLUSH_INTERVAL.total_seconds(),
+    DELIVERY_FLUSH_MAX_ENTRIES
+) if DELIVERY_WRITE_BUFFER else None
+OverdueDeliveries = OverdueTracker(DELIVERY_FINAL_STATUSES) if OVERDUE_TRACKER else None
+DeliveryStats = StatsMirror(STATS_MAX_AGE.total_seconds())
+
+declareState("Hasher", WORKER, "HASH_WORKERS and HASH_QUEUE_SIZE apply to each worker")
+declareState(
+    "DeliveryStats", WORKER,
+    "reloaded from status_counts and orders_per_hour when older than STATS_MAX_AGE"
+)
+if DeliveryBuffer is not None:
+    declareState(
+        "DeliveryBuffer", WORKER,
+        "other workers read buffered updates only after the flush"
+    )
+if OverdueDeliveries is not None:
+    declareState(
+        "OverdueDeliveries", SHARED,
+        "loaded from deliveries at startup, changes arrive through the events broker "
+        "(needs EVENTS_BROKER = \"unix\" with several workers)"
+    )
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    """Инициализация базы данных
+    """Инициализация ресурсов воркера
+
+    Выполняется в каждом процессе после fork: движок и пул соединений,
+    брокер событий и фоновые задачи создаются здесь, а не при импорте.
 
     :param _: app FastAPI
     :type _: FastAPI
     """
     await AdapterDB.init()
+    revocationIndex.load(await AdapterDB.loadRevokedTokens())
+    await broker.start()
+    revocations = broker.subscribe([REVOCATIONS_TOPIC])
+    follower = create_task(revocationIndex.follow(revocations))
+    if OverdueDeliveries is not None:
+        states = broker.subscribe([DELIVERY_STATES_TOPIC])
+        OverdueDeliveries.load(await AdapterDB.pendingDeadlines(DELIVERY_FINAL_STATUSES))
+        tracker = create_task(OverdueDeliveries.follow(states))
+    if DeliveryBuffer is not None:
+        DeliveryBuffer.start()
     yield
+    if DeliveryBuffer is not None:
+        await DeliveryBuffer.close()
+    if OverdueDeliveries is not None:
+        tracker.cancel()
+        with suppress(CancelledError):
+            await tracker
+        broker.unsubscribe(states)
+    follower.cancel()
+    with suppress(CancelledError):
+        await follower
+    broker.unsubscribe(revocations)
+    await broker.close()
+    await AdapterDB.close()
+    Hasher.shutdown()
 
 app = FastAPI(lifespan=lifespan, title="Delivery Service API")
\ No newline at end of file
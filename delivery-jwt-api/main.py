@@ -1,5 +1,9 @@
 import routes
 from loader import app
-from middlewaries import jwtMiddleware
+from middlewaries import JWTMiddleware, SessionMiddleware, MetricsMiddleware, \
+        AdmissionMiddleware
 
-app.middleware("http")(jwtMiddleware)
\ No newline at end of file
+app.add_middleware(JWTMiddleware)
+app.add_middleware(SessionMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
\ No newline at end of file
@@ -0,0 +1,62 @@
+"""Служебные команды обслуживания базы данных
+
+Запуск из каталога delivery-jwt-api:
+    python manage.py create-schema
+    python manage.py reconcile-stats
+    python manage.py rebuild-search
+
+Команды работают с DATABASE_URL из config.py и могут выполняться
+при запущенном сервисе: воркеры перечитывают агрегаты не реже
+STATS_MAX_AGE.
+"""
+from argparse import ArgumentParser
+from asyncio import run
+from time import perf_counter
+
+from loader import AdapterDB
+
+
+async def createSchema() -> None:
+    """Создает недостающие таблицы, индексы, триггеры и индекс поиска"""
+    started = perf_counter()
+    await AdapterDB.init()
+    await AdapterDB.close()
+    print(f"schema is up to date in {perf_counter() - started:.1f}s")
+
+async def reconcileStats() -> None:
+    """Пересчитывает status_counts и orders_per_hour и выводит расхождения"""
+    await AdapterDB.init()
+    try:
+        drift = await AdapterDB.reconcileStats()
+    finally:
+        await AdapterDB.close()
+    for name, (previous, current) in sorted(drift.items()):
+        print(f"{name}: {previous} -> {current}")
+    print(f"stats reconciled, {len(drift)} counter(s) drifted")
+
+async def rebuildSearch() -> None:
+    """Перестраивает полнотекстовый индекс заказов orders_search"""
+    await AdapterDB.init()
+    try:
+        if not AdapterDB.searchAvailable:
+            print("order search is unavailable: SQLite with FTS5 is required")
+            return
+        started = perf_counter()
+        await AdapterDB.rebuildSearch()
+    finally:
+        await AdapterDB.close()
+    print(f"search index rebuilt in {perf_counter() - started:.1f}s")
+
+
+COMMANDS = {
+    "create-schema": createSchema,
+    "reconcile-stats": reconcileStats,
+    "rebuild-search": rebuildSearch,
+}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    arguments = parser.parse_args()
+    run(COMMANDS[arguments.command]())
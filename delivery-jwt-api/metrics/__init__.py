@@ -0,0 +1,53 @@
+from .registry import Registry, Counter, Gauge, Histogram, DEFAULT_BUCKETS, FAST_BUCKETS
+from .trace import RequestTrace, currentTrace, recordPhase
+
+from runtime import declareState, WORKER
+
+
+registry = Registry()
+declareState("metrics.registry", WORKER, "/metrics reports the worker that served the scrape")
+
+httpRequests = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+))
+httpLatency = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+httpInFlight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being processed", ("method",)
+))
+dbQueries = registry.register(Counter(
+    "db_queries_total", "SQL statements by DatabaseAdapter method", ("operation",)
+))
+dbQueryLatency = registry.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency by DatabaseAdapter method",
+    ("operation",), FAST_BUCKETS
+))
+dbPoolWait = registry.register(Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a pooled connection", (), FAST_BUCKETS
+))
+passwordHashLatency = registry.register(Histogram(
+    "password_hash_duration_seconds", "Password key derivation time by algorithm",
+    ("algorithm",)
+))
+deliveryBufferUpdates = registry.register(Counter(
+    "delivery_buffer_updates_total", "Buffered delivery updates: new, coalesced or dropped at flush", ("result",)
+))
+deliveryBufferFlushes = registry.register(Counter(
+    "delivery_buffer_flushes_total", "Delivery write buffer flushes by result", ("result",)
+))
+jwtVerifyLatency = registry.register(Histogram(
+    "jwt_verify_duration_seconds", "JWT verification time by cache result",
+    ("cache",), FAST_BUCKETS
+))
+admissionRejections = registry.register(Counter(
+    "admission_rejections_total", "Requests rejected by admission control",
+    ("route_class", "reason")
+))
+admissionWait = registry.register(Histogram(
+    "admission_queue_wait_seconds", "Time spent waiting for a concurrency slot",
+    ("route_class",), FAST_BUCKETS
+))
+overdueDeliveries = registry.register(Gauge(
+    "overdue_deliveries", "Deliveries past TargetTimeDelivery without a final status"
+))
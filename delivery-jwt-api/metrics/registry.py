@@ -0,0 +1,184 @@
+from bisect import bisect_left
+from threading import Lock
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 7.5, 10.0)
+FAST_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _formatLabels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _formatValue(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Семейство метрик с метками, значения хранятся по кортежу значений меток"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        """
+        :param name: Имя метрики
+        :type name: str
+        :param documentation: Описание для # HELP
+        :type documentation: str
+        :param labelnames: Имена меток, defaults to ()
+        :type labelnames: Iterable[str], optional
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Возвращает метрику в текстовом формате Prometheus
+
+        :return: Строки # HELP, # TYPE и значения
+        :rtype: str
+        """
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счетчик"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        """Увеличивает счетчик
+
+        :param labelvalues: Значения меток в порядке labelnames
+        :type labelvalues: str
+        :param amount: Приращение, defaults to 1
+        :type amount: float, optional
+        """
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _samples(self) -> Iterable[str]:
+        for labelvalues, value in self._values.items():
+            yield f"{self.name}{_formatLabels(self.labelnames, labelvalues)} {_formatValue(value)}"
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться"""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        """Уменьшает значение
+
+        :param labelvalues: Значения меток в порядке labelnames
+        :type labelvalues: str
+        :param amount: Уменьшение, defaults to 1
+        :type amount: float, optional
+        """
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        """Устанавливает значение
+
+        :param value: Новое значение
+        :type value: float
+        :param labelvalues: Значения меток в порядке labelnames
+        :type labelvalues: str
+        """
+        with self._lock:
+            self._values[labelvalues] = value
+
+
+class Histogram(Metric):
+    """Гистограмма наблюдений с фиксированными границами корзин"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        """
+        :param buckets: Верхние границы корзин, defaults to DEFAULT_BUCKETS
+        :type buckets: Sequence[float], optional
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        """Добавляет наблюдение
+
+        :param value: Наблюдаемое значение, например длительность в секундах
+        :type value: float
+        :param labelvalues: Значения меток в порядке labelnames
+        :type labelvalues: str
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self) -> Iterable[str]:
+        bounds = self.buckets + (float("inf"),)
+        for labelvalues, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                labels = _formatLabels(self.labelnames, labelvalues, f'le="{_formatValue(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _formatLabels(self.labelnames, labelvalues)
+            yield f"{self.name}_sum{labels} {_formatValue(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """Набор метрик, отдаваемых на /metrics"""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Добавляет метрику в реестр
+
+        :param metric: Метрика
+        :type metric: Metric
+        :return: Та же метрика
+        :rtype: Metric
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus
+
+        :return: Текст экспозиции
+        :rtype: str
+        """
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
\ No newline at end of file
@@ -0,0 +1,53 @@
+from contextvars import ContextVar
+
+from typing import Dict, Optional
+
+
+class RequestTrace:
+    """Время запроса по фазам: аутентификация, база данных, хеширование и т.д."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Добавляет время к фазе
+
+        :param phase: Имя фазы
+        :type phase: str
+        :param seconds: Длительность в секундах
+        :type seconds: float
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self.counts[phase] = self.counts.get(phase, 0) + 1
+
+    def format(self, total: float) -> str:
+        """Форматирует разбивку по фазам для лога
+
+        :param total: Полное время запроса в секундах
+        :type total: float
+        :return: Строка вида "db=0.120s/4 auth=0.003s/1 other=0.010s"
+        :rtype: str
+        """
+        parts = [
+            f"{phase}={seconds:.3f}s/{self.counts[phase]}"
+            for phase, seconds in sorted(self.phases.items(), key=lambda item: -item[1])
+        ]
+        parts.append(f"other={max(total - sum(self.phases.values()), 0.0):.3f}s")
+        return " ".join(parts)
+
+
+currentTrace: ContextVar[Optional[RequestTrace]] = ContextVar("currentTrace", default=None)
+
+
+def recordPhase(phase: str, seconds: float) -> None:
+    """Добавляет время к фазе текущего запроса, если он трассируется
+
+    :param phase: Имя фазы
+    :type phase: str
+    :param seconds: Длительность в секундах
+    :type seconds: float
+    """
+    trace = currentTrace.get()
+    if trace is not None:
+        trace.add(phase, seconds)
\ No newline at end of file
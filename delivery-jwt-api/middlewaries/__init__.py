@@ -1 +1,4 @@
-from .jwt import jwtMiddleware
\ No newline at end of file
+from .jwt import JWTMiddleware
+from .session import SessionMiddleware, requestSession, RequestSession
+from .metrics import MetricsMiddleware
+from .admission import AdmissionMiddleware
\ No newline at end of file
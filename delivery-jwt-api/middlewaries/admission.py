@@ -0,0 +1,99 @@
+from fastapi import status
+from starlette.types import ASGIApp, Receive, Scope, Send
+from time import perf_counter
+from re import compile as compileRegex, escape, split
+
+from misc import retryResponse, compilePathMatcher
+from admission import ConcurrencyLimiter, Overloaded, limiters as defaultLimiters
+from metrics import admissionRejections, admissionWait
+from typing import Callable, Dict, Iterable, Optional
+from config import ADMISSION_EXEMPT_ENDPOINTS, ADMISSION_STREAM_ENDPOINTS
+
+
+def _compileRoutes(templates: Iterable[str]) -> Callable[[str], bool]:
+    """Компилирует шаблоны маршрутов вида "/deliveries/{order_id}/events"
+
+    :param templates: Шаблоны путей, параметр занимает один сегмент
+    :type templates: Iterable[str]
+    :return: Функция точной проверки пути
+    :rtype: Callable[[str], bool]
+    """
+    patterns = [
+        "".join("[^/]+" if part.startswith("{") else escape(part) for part in split(r"(\{[^}]*\})", template))
+        for template in templates
+    ]
+    if not patterns:
+        return lambda path: False
+    pattern = compileRegex("(?:" + "|".join(patterns) + ")")
+    return lambda path: pattern.fullmatch(path) is not None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware ограничения одновременных запросов по классам маршрутов
+
+    Класс "auth" - пути /auth/..., "reads" - GET и HEAD, остальное "writes".
+    Запрос ждет слот своего класса в ограниченной очереди не дольше
+    deadline, иначе получает 503 с Retry-After, не заняв соединение с БД
+    и воркер хеширования. GET-маршруты потоков Server-Sent Events из
+    stream_routes не ограничиваются; решение принимается только по
+    маршруту, заголовки клиента на него не влияют.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiters: Optional[Dict[str, ConcurrencyLimiter]] = None,
+        exempt_paths: Iterable[str] = ADMISSION_EXEMPT_ENDPOINTS,
+        auth_paths: Iterable[str] = ("/auth",),
+        stream_routes: Iterable[str] = ADMISSION_STREAM_ENDPOINTS
+    ):
+        """
+        :param app: Следующее ASGI приложение
+        :type app: ASGIApp
+        :param limiters: Ограничители по классам маршрутов, defaults to admission.limiters
+        :type limiters: Optional[Dict[str, ConcurrencyLimiter]], optional
+        :param exempt_paths: Пути без ограничений, включая вложенные,
+            defaults to ADMISSION_EXEMPT_ENDPOINTS
+        :type exempt_paths: Iterable[str], optional
+        :param auth_paths: Пути класса "auth", defaults to ("/auth",)
+        :type auth_paths: Iterable[str], optional
+        :param stream_routes: Шаблоны маршрутов долгих потоков,
+            defaults to ADMISSION_STREAM_ENDPOINTS
+        :type stream_routes: Iterable[str], optional
+        """
+        self.app = app
+        self._limiters = defaultLimiters if limiters is None else limiters
+        self._isExempt = compilePathMatcher(exempt_paths)
+        self._isAuth = compilePathMatcher(auth_paths)
+        self._isStreamRoute = _compileRoutes(stream_routes)
+
+    def _routeClass(self, scope: Scope) -> str:
+        if self._isAuth(scope["path"]):
+            return "auth"
+        return "reads" if scope["method"] in ("GET", "HEAD") else "writes"
+
+    def _isStream(self, scope: Scope) -> bool:
+        return scope["method"] == "GET" and self._isStreamRoute(scope["path"])
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._isExempt(scope["path"]) or self._isStream(scope):
+            await self.app(scope, receive, send)
+            return
+        limiter = self._limiters.get(self._routeClass(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        started = perf_counter()
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            admissionRejections.inc(limiter.name, e.reason)
+            response = retryResponse(status.HTTP_503_SERVICE_UNAVAILABLE, str(e), e.retry_after)
+            await response(scope, receive, send)
+            return
+        admissionWait.observe(perf_counter() - started, limiter.name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
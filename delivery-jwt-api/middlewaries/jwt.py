@@ -1,46 +1,106 @@
-from fastapi import Request, status, Response
-from loader import AdapterDB
+from fastapi import status
+from starlette.types import ASGIApp, Receive, Scope, Send
+from urllib.parse import parse_qsl
 
 from jwt import PyJWTError
+from time import time
 
-from misc import problemResponse
-from auth import verifyToken
+from misc import problemResponse, compilePathMatcher
+from auth import verifyToken, revocationIndex
 from loader import AdapterDB
-from typing import Any, Callable
+from typing import Iterable, Optional
 from config import ALLOWED_ENDPOINTS_WITHOUT_AUTH
 
 
-async def jwtMiddleware(request: Request, call_next: Callable[[Request], Any]) -> Response:
-    """Middleware для JWT аутентификации
+class JWTMiddleware:
+    """ASGI middleware для JWT аутентификации
 
-    :param request: HTTP-запрос
-    :type request: Request
-    :param call_next: Следующий обработчик
-    :type call_next: Callable[[Request], Any]
-    :return: Ответ приложения или ошибка аутентификации
-    :rtype: Response
+    Заголовок Authorization читается напрямую из scope, пользователь
+    сохраняется в request.state.user, payload токена в request.state.token.
+    Отозванные токены отклоняются по revocationIndex без обращения к базе.
+    WebSocket-соединения проверяются так же, браузерные клиенты могут
+    передать токен в параметре access_token, при ошибке соединение
+    закрывается с кодом 1008.
     """
-    if request.url.path in ALLOWED_ENDPOINTS_WITHOUT_AUTH:
-        return await call_next(request)
-    
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        return problemResponse(detail="Missing authorization header", status_code=status.HTTP_401_UNAUTHORIZED)
-    
-    token = auth_header.split(" ")[1]
-    try:
-        payload = verifyToken(token)
-        username = payload.get("sub")
-        if not username:
-            return problemResponse(detail="Invalid token", status_code=status.HTTP_401_UNAUTHORIZED)
-        
-        request.state.user = await AdapterDB.getUser(username)
-        if not request.state.user:
-            return problemResponse(detail="User not found", status_code=status.HTTP_401_UNAUTHORIZED)
-    
-    except PyJWTError as e:
-        return problemResponse(detail=str(e), status_code=status.HTTP_401_UNAUTHORIZED)
-    except Exception as e:
-        return problemResponse(detail=str(e), status_code=status.HTTP_401_UNAUTHORIZED)
-    
-    return await call_next(request)
\ No newline at end of file
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        public_paths: Iterable[str] = ALLOWED_ENDPOINTS_WITHOUT_AUTH
+    ):
+        """
+        :param app: Следующее ASGI приложение
+        :type app: ASGIApp
+        :param public_paths: Пути без авторизации, включая вложенные,
+            defaults to ALLOWED_ENDPOINTS_WITHOUT_AUTH
+        :type public_paths: Iterable[str], optional
+        """
+        self.app = app
+        self._isPublic = compilePathMatcher(public_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or self._isPublic(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        error = await self._authenticate(scope)
+        if error is not None and scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008, "reason": error})
+            return
+        if error is not None:
+            response = problemResponse(detail=error, status_code=status.HTTP_401_UNAUTHORIZED)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    async def _authenticate(self, scope: Scope) -> Optional[str]:
+        """Проверяет токен и сохраняет пользователя в scope["state"]
+
+        :param scope: ASGI scope запроса
+        :type scope: Scope
+        :return: Текст ошибки или None при успешной аутентификации
+        :rtype: Optional[str]
+        """
+        auth_header = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                auth_header = value.decode("latin-1")
+                break
+        if auth_header is None and scope["type"] == "websocket":
+            query = dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+            if query.get("access_token"):
+                auth_header = f"Bearer {query['access_token']}"
+        if not auth_header or not auth_header.startswith("Bearer "):
+            return "Missing authorization header"
+
+        token = auth_header.split(" ")[1]
+        state = scope.setdefault("state", {})
+        try:
+            payload = verifyToken(token)
+            username = payload.get("sub")
+            if not username or payload.get("type") != "access":
+                return "Invalid token"
+            if revocationIndex.isRevoked(payload.get("jti")) \
+                    or revocationIndex.isRevoked(payload.get("fam")):
+                return "Token revoked"
+
+            user = AdapterDB.usersCache.get(username)
+            if user is None:
+                holder = state.get("db")
+                user = await AdapterDB.getUser(
+                    username, session=holder.get() if holder is not None else None
+                )
+                if not user:
+                    return "User not found"
+                expires = payload.get("exp")
+                AdapterDB.usersCache.set(
+                    username, user, expires - time() if expires is not None else None
+                )
+            state["user"] = user
+            state["token"] = payload
+
+        except PyJWTError as e:
+            return str(e)
+        except Exception as e:
+            return str(e)
+        return None
@@ -0,0 +1,67 @@
+from logging import getLogger
+from time import perf_counter
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from metrics import httpRequests, httpLatency, httpInFlight, RequestTrace, currentTrace
+from typing import Optional
+from config import SLOW_REQUEST_THRESHOLD
+
+
+logger = getLogger(__name__)
+
+
+class MetricsMiddleware:
+    """ASGI middleware: задержка и количество запросов по маршрутам, запросы в обработке
+
+    Маршрут берется из шаблона пути ("/orders/{order_id}"), запросы без
+    найденного маршрута попадают в метку "unmatched". Если задан
+    SLOW_REQUEST_THRESHOLD, медленные запросы логируются с разбивкой по фазам.
+    """
+
+    def __init__(self, app: ASGIApp, slow_threshold: Optional[float] = None):
+        """
+        :param app: Следующее ASGI приложение
+        :type app: ASGIApp
+        :param slow_threshold: Порог медленного запроса в секундах,
+            defaults to SLOW_REQUEST_THRESHOLD
+        :type slow_threshold: Optional[float], optional
+        """
+        self.app = app
+        if slow_threshold is None and SLOW_REQUEST_THRESHOLD is not None:
+            slow_threshold = SLOW_REQUEST_THRESHOLD.total_seconds()
+        self._slowThreshold = slow_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        trace = RequestTrace() if self._slowThreshold is not None else None
+        token = currentTrace.set(trace)
+
+        async def sendWithStatus(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        httpInFlight.inc(method)
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, sendWithStatus)
+        finally:
+            elapsed = perf_counter() - started
+            httpInFlight.dec(method)
+            currentTrace.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            httpRequests.inc(method, path, str(status_code))
+            httpLatency.observe(elapsed, method, path)
+            if trace is not None and elapsed >= self._slowThreshold:
+                logger.warning(
+                    "Slow request %s %s -> %s in %.3fs: %s",
+                    method, scope["path"], status_code, elapsed, trace.format(elapsed)
+                )
\ No newline at end of file
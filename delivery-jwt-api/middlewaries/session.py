@@ -0,0 +1,99 @@
+from fastapi import Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from misc import problemResponse
+from loader import AdapterDB
+from typing import Optional
+from config import DATABASE_REQUEST_SESSION
+
+
+class RequestSession:
+    """Сессия базы данных на время одного запроса, создается при первом обращении"""
+
+    def __init__(self):
+        self._session: Optional[AsyncSession] = None
+
+    def get(self) -> AsyncSession:
+        """Возвращает сессию запроса
+
+        :return: Сессия unit of work
+        :rtype: AsyncSession
+        """
+        if self._session is None:
+            self._session = AdapterDB.newSession()
+        return self._session
+
+    async def finish(self, commit: bool) -> None:
+        """Фиксирует или откатывает транзакцию и закрывает сессию
+
+        :param commit: True для фиксации, False для отката
+        :type commit: bool
+        """
+        if self._session is None:
+            return
+        try:
+            if commit:
+                await AdapterDB.commit(self._session)
+            else:
+                await AdapterDB.rollback(self._session)
+        finally:
+            await self._session.close()
+            self._session = None
+
+
+def requestSession(request: Request) -> Optional[AsyncSession]:
+    """Dependency: сессия текущего запроса или None, если режим отключен
+
+    :param request: HTTP-запрос
+    :type request: Request
+    :return: Сессия unit of work
+    :rtype: Optional[AsyncSession]
+    """
+    holder = getattr(request.state, "db", None)
+    return holder.get() if holder is not None else None
+
+
+class SessionMiddleware:
+    """ASGI middleware unit of work: одна сессия на запрос, фиксация один раз в конце
+
+    Транзакция фиксируется перед отправкой заголовков ответа со статусом
+    меньше 400, в остальных случаях откатывается.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        :param app: Следующее ASGI приложение
+        :type app: ASGIApp
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not DATABASE_REQUEST_SESSION:
+            await self.app(scope, receive, send)
+            return
+
+        holder = scope.setdefault("state", {})["db"] = RequestSession()
+        failed = False
+
+        async def sendAfterCommit(message: Message) -> None:
+            nonlocal failed
+            if message["type"] == "http.response.start":
+                try:
+                    await holder.finish(commit=message["status"] < status.HTTP_400_BAD_REQUEST)
+                except Exception as e:
+                    failed = True
+                    response = problemResponse(
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        title="Internal server error",
+                        detail=f"Transaction commit failed: {e}"
+                    )
+                    await response(scope, receive, send)
+                    return
+            if not failed:
+                await send(message)
+
+        try:
+            await self.app(scope, receive, sendAfterCommit)
+        finally:
+            await holder.finish(commit=False)
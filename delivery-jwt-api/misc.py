@@ -1,10 +1,16 @@
 from fastapi.responses import JSONResponse
 
-from binascii import hexlify
-from hashlib import pbkdf2_hmac
+from serialization import SerializedResponse, successBody, problemBody
 
+from binascii import hexlify, Error as BinasciiError
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from hashlib import pbkdf2_hmac, blake2b
+
+from math import ceil
 from os import urandom
-from typing import Any
+from re import compile as compileRegex, escape
+from typing import Any, Tuple, Optional, Iterable, Callable
 
 
 def problemResponse(
@@ -24,20 +30,35 @@ def problemResponse(
     :return: JSON ответ
     :rtype: JSONResponse
     """
-    problem_data = {
-        "success": False,
-        "data": {
-            "error": title,
-            "detail": detail
-        }
-    }
-    problem_data.update(kwargs)
-    return JSONResponse(
-        content=problem_data,
+    return SerializedResponse(
+        content=problemBody({"error": title, "detail": detail}, kwargs),
         status_code=status_code,
         media_type="application/problem+json"
     )
 
+def retryResponse(
+    status_code: int,
+    detail: Any,
+    retry_after: float,
+    title: str = "Service busy"
+) -> JSONResponse:
+    """Формирует ответ об ошибке с заголовком Retry-After
+
+    :param status_code: HTTP Status code, обычно 429 или 503
+    :type status_code: int
+    :param detail: Детали ошибки
+    :type detail: str
+    :param retry_after: Через сколько секунд повторить запрос
+    :type retry_after: float
+    :param title: Ошибка, defaults to "Service busy"
+    :type title: str, optional
+    :return: JSON ответ
+    :rtype: JSONResponse
+    """
+    response = problemResponse(status_code, detail, title)
+    response.headers["Retry-After"] = str(max(1, ceil(retry_after)))
+    return response
+
 def successResponse(
     status_code: int,
     **kwargs
@@ -49,8 +70,34 @@ def successResponse(
     :return: JSON ответ
     :rtype: JSONResponse
     """
-    return JSONResponse(
-        content={"success": True, "data": kwargs},
+    return SerializedResponse(
+        content=successBody(kwargs),
+        status_code=status_code,
+        media_type="application/json"
+    )
+
+def modelResponse(
+    status_code: int,
+    payload: Any,
+    model: Any,
+    **options: Any
+) -> JSONResponse:
+    """Формирует успешный JSON-ответ по типизированной модели ответа
+
+    Данные кодируются через закэшированный TypeAdapter модели и вставляются
+    в заранее закодированный конверт {"success": true, "data": ...}.
+
+    :param status_code: HTTP Status code
+    :type status_code: int
+    :param payload: Данные ответа
+    :type payload: Any
+    :param model: Модель ответа (см. models.responses)
+    :type model: Any
+    :return: JSON ответ
+    :rtype: JSONResponse
+    """
+    return SerializedResponse(
+        content=successBody(payload, model, **options),
         status_code=status_code,
         media_type="application/json"
     )
@@ -66,6 +113,9 @@ def generateSalt() -> str:
 def hashPassword(password: str, salt: str) -> str:
     """Вычисляет хеш пароля с использованием PBKDF2-HMAC-SHA256
 
+    Старый формат хранения паролей, используется только для проверки
+    и перехеширования существующих пользователей (см. auth.passwords).
+
     :param password: Пароль пользователя
     :type password: str
     :param salt: Salt для создания пароля в hex формате
@@ -80,4 +130,76 @@ def hashPassword(password: str, salt: str) -> str:
         salt.encode('utf-8'),
         iterations,
         dklen=128
-    ).hex()
\ No newline at end of file
+    ).hex()
+
+def encodeCursor(creation_date: datetime, order_id: int) -> str:
+    """Кодирует позицию keyset-пагинации в непрозрачный курсор
+
+    :param creation_date: CreationDate последнего ордера
+    :type creation_date: datetime
+    :param order_id: ID последнего ордера
+    :type order_id: int
+    :return: Курсор в формате base64
+    :rtype: str
+    """
+    raw = f"{creation_date.isoformat()}|{order_id}".encode()
+    return urlsafe_b64encode(raw).decode()
+
+def decodeCursor(cursor: str) -> Tuple[datetime, int]:
+    """Декодирует курсор keyset-пагинации
+
+    :param cursor: Курсор в формате base64
+    :type cursor: str
+    :raises ValueError: Если курсор поврежден
+    :return: CreationDate и ID последнего ордера
+    :rtype: Tuple[datetime, int]
+    """
+    try:
+        creation_date, order_id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(creation_date), int(order_id)
+    except (BinasciiError, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+def makeETag(body: bytes) -> str:
+    """Вычисляет строгий ETag по содержимому ответа
+
+    :param body: Тело ответа
+    :type body: bytes
+    :return: ETag в кавычках
+    :rtype: str
+    """
+    return f'"{blake2b(body, digest_size=12).hexdigest()}"'
+
+def etagMatches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет заголовок If-None-Match на совпадение с ETag
+
+    :param if_none_match: Значение заголовка If-None-Match
+    :type if_none_match: Optional[str]
+    :param etag: Текущий ETag ресурса
+    :type etag: str
+    :return: True если клиент уже имеет актуальную версию
+    :rtype: bool
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+def compilePathMatcher(paths: Iterable[str]) -> Callable[[str], bool]:
+    """Компилирует список путей в проверку по префиксу
+
+    Путь совпадает, если равен одному из путей или вложен в него:
+    "/docs" совпадает с "/docs" и "/docs/oauth2-redirect", но не с "/docsx".
+
+    :param paths: Список путей
+    :type paths: Iterable[str]
+    :return: Функция проверки пути
+    :rtype: Callable[[str], bool]
+    """
+    prefixes = sorted({path.rstrip("/") for path in paths}, key=len, reverse=True)
+    if not prefixes:
+        return lambda path: False
+    pattern = compileRegex(
+        "(?:" + "|".join(escape(prefix) for prefix in prefixes) + ")(?:/|$)"
+    )
+    return lambda path: pattern.match(path) is not None
\ No newline at end of file
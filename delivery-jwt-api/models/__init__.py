@@ -1,3 +1,7 @@
 from .scheme import DB, Order, Delivery, \
-        User
-from .auth import UserAuth, UserBase, UserCreate
\ No newline at end of file
+        User, RefreshToken, RevokedToken, StatusCount, HourlyOrderCount
+from .auth import UserAuth, UserBase, UserCreate, TokenRefresh
+from .responses import OrderResponse, OrderExportRow, OrderPage, \
+        OrderSearchResult, OrderSearchPage, \
+        DeliveryResult, DeliveryBatchResult, OverdueDelivery, OverdueList, \
+        HourlyOrders, ServiceStats
\ No newline at end of file
@@ -9,4 +9,7 @@ class UserCreate(UserBase):
     ...
     
 class UserAuth(UserBase):
-    ...
\ No newline at end of file
+    ...
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
\ No newline at end of file
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing_extensions import TypedDict, NotRequired
+
+from typing import Dict, List, Optional
+
+
+class OrderResponse(TypedDict):
+    id: int
+    description: Optional[str]
+    status: Optional[str]
+    target_time_delivery: Optional[datetime]
+    dimensions: str
+    weight: int
+    deliveryAddress: str
+    pickUpAddress: str
+    name: str
+    creation_date: Optional[datetime]
+
+class OrderExportRow(OrderResponse):
+    cursor: str
+
+class OrderPage(TypedDict):
+    orders: List[OrderResponse]
+    next_cursor: Optional[str]
+
+class OrderSearchResult(OrderResponse):
+    rank: float
+
+class OrderSearchPage(TypedDict):
+    orders: List[OrderSearchResult]
+    next_offset: Optional[int]
+
+class DeliveryResult(TypedDict):
+    id: int
+    success: bool
+    error: NotRequired[str]
+
+class DeliveryBatchResult(TypedDict):
+    results: List[DeliveryResult]
+
+class OverdueDelivery(TypedDict):
+    id: int
+    target_time_delivery: datetime
+    overdue_seconds: float
+
+class OverdueList(TypedDict):
+    deliveries: List[OverdueDelivery]
+    total: int
+
+class HourlyOrders(TypedDict):
+    hour: datetime
+    count: int
+
+class ServiceStats(TypedDict):
+    deliveries: Dict[str, int]
+    total: int
+    orders_per_hour: List[HourlyOrders]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, \
-        ForeignKey, DateTime
+        ForeignKey, DateTime, Index, Boolean
 from sqlalchemy.orm import declarative_base, relationship
 
 from datetime import datetime
@@ -19,6 +19,10 @@ class Order(DB):
     Dimensions = Column(String, nullable=False)
     CreationDate = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        Index('ix_orders_CreationDate_ID', 'CreationDate', 'ID'),
+    )
+
     delivery = relationship(
         'Delivery', 
         back_populates='order', 
@@ -31,8 +35,8 @@ class Delivery(DB):
     
     DeliveryID = Column(Integer, primary_key=True, autoincrement=True)
     ID = Column(Integer, ForeignKey('orders.ID', ondelete='CASCADE'), unique=True, nullable=False)
-    Status = Column(String, default="created delivery request")
-    TargetTimeDelivery = Column(DateTime, nullable = True)
+    Status = Column(String, default="created delivery request", index=True)
+    TargetTimeDelivery = Column(DateTime, nullable = True, index=True)
 
     order = relationship('Order', back_populates='delivery')
 
@@ -42,4 +46,31 @@ class User(DB):
     ID = Column(Integer, primary_key=True)
     Username = Column(String(32), unique=True)
     Salt = Column(String(64))
-    Password = Column(String(256))
\ No newline at end of file
+    Password = Column(String(256))
+
+class RefreshToken(DB):
+    __tablename__ = "refresh_tokens"
+
+    JTI = Column(String(32), primary_key=True)
+    Family = Column(String(32), nullable=False, index=True)
+    Username = Column(String(32), nullable=False)
+    ExpiresAt = Column(DateTime, nullable=False, index=True)
+    Used = Column(Boolean, nullable=False, default=False)
+
+class RevokedToken(DB):
+    __tablename__ = "revoked_tokens"
+
+    JTI = Column(String(32), primary_key=True)
+    ExpiresAt = Column(DateTime, nullable=False, index=True)
+
+class StatusCount(DB):
+    __tablename__ = "status_counts"
+
+    Status = Column(String, primary_key=True)
+    Count = Column(Integer, nullable=False, default=0)
+
+class HourlyOrderCount(DB):
+    __tablename__ = "orders_per_hour"
+
+    Hour = Column(DateTime, primary_key=True)
+    Count = Column(Integer, nullable=False, default=0)
\ No newline at end of file
@@ -1,3 +1,6 @@
 from .deliveries import *
 from .orders import *
-from .auth import *
\ No newline at end of file
+from .auth import *
+from .cache import *
+from .metrics import *
+from .stats import *
\ No newline at end of file
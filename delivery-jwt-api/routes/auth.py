@@ -1,31 +1,73 @@
-from fastapi import Depends, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.responses import JSONResponse
-from loader import AdapterDB, app
+from loader import AdapterDB, Hasher, app
 
-from misc import hashPassword, problemResponse, successResponse
-from models import UserCreate, UserBase
-from auth.jwt import createTokens
+from misc import problemResponse, successResponse, retryResponse
+from models import UserCreate, UserBase, TokenRefresh
+from auth.jwt import issueTokens, keyRing
+from auth import HashingQueueFull, verifyToken, revocationIndex
+from admission import loginByUsername, loginByAddress
+from metrics import admissionRejections
+from config import REFRESH_EXPIRE
+from time import time
 
 
 @app.post("/auth/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()) -> JSONResponse:
+async def login(
+    request: Request,
+    form_data: OAuth2PasswordRequestForm = Depends()
+) -> JSONResponse:
     """Авторизация и получение токенов для пользователей
 
+    Попытки ограничиваются token bucket по IP и по имени пользователя
+    до обращения к базе и хеширования пароля.
+
+    :param request: HTTP-запрос
+    :type request: Request
     :param form_data: username и password, defaults to Depends()
     :type form_data: OAuth2PasswordRequestForm, optional
     :return: Ответ в JSON формате
     :rtype: JSONResponse
     """
+    address = request.client.host if request.client is not None else None
+    for reason, buckets, key in (
+        ("address", loginByAddress, address),
+        ("username", loginByUsername, form_data.username.lower()),
+    ):
+        retry_after = buckets.take(key)
+        if retry_after:
+            admissionRejections.inc("login", reason)
+            return retryResponse(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many login attempts",
+                retry_after,
+                title="Too many requests"
+            )
+
     user = await AdapterDB.getUser(form_data.username)
-    if not user or hashPassword(form_data.password, user.Salt) != user.Password:
+    try:
+        verified = user is not None and await Hasher.verify(
+            form_data.password, user.Password, user.Salt
+        )
+    except HashingQueueFull as e:
+        return retryResponse(status.HTTP_503_SERVICE_UNAVAILABLE, str(e), 1)
+    if verified and Hasher.needsRehash(user.Password):
+        try:
+            await AdapterDB.updateUserPassword(
+                user.Username, await Hasher.hash(form_data.password)
+            )
+        except HashingQueueFull:
+            pass
+    if not verified:
         return problemResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             title="Authentication failed",
             detail="Invalid credentials"
         )
     
-    tokens = createTokens(user.Username)
+    tokens, refresh_payload = issueTokens(user.Username)
+    await AdapterDB.createRefreshToken(refresh_payload)
     return successResponse(
         result=tokens,
         status_code=status.HTTP_202_ACCEPTED,
@@ -63,5 +105,92 @@ async def register(user_data: UserCreate) -> JSONResponse:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=errors
         )
-    await AdapterDB.createUser(user_data.username, user_data.password)
-    return successResponse(status_code=status.HTTP_201_CREATED, username=user_data.username)
\ No newline at end of file
+    try:
+        await AdapterDB.createUser(user_data.username, user_data.password)
+    except HashingQueueFull as e:
+        return problemResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            title="Service busy",
+            detail=str(e)
+        )
+    return successResponse(status_code=status.HTTP_201_CREATED, username=user_data.username)
+
+@app.post("/auth/refresh")
+async def refresh(refresh_data: TokenRefresh) -> JSONResponse:
+    """Обновление пары токенов по refresh токену с ротацией
+
+    Каждый refresh токен принимается один раз, повторное предъявление
+    отзывает всё семейство токенов.
+
+    :param refresh_data: refresh_token
+    :type refresh_data: TokenRefresh
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    try:
+        payload = verifyToken(refresh_data.refresh_token)
+    except HTTPException as e:
+        return problemResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            title="Authentication failed",
+            detail=e.detail
+        )
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        return problemResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            title="Authentication failed",
+            detail="Invalid token"
+        )
+    if revocationIndex.isRevoked(payload["jti"]) or revocationIndex.isRevoked(payload.get("fam")):
+        return problemResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            title="Authentication failed",
+            detail="Token revoked"
+        )
+
+    tokens, refresh_payload = issueTokens(payload["sub"], family=payload.get("fam"))
+    result = await AdapterDB.rotateRefreshToken(payload["jti"], refresh_payload)
+    if result == "reused":
+        return problemResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            title="Authentication failed",
+            detail="Refresh token reuse detected, token family revoked"
+        )
+    if result != "rotated":
+        return problemResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            title="Authentication failed",
+            detail="Invalid token"
+        )
+    return successResponse(
+        result=tokens,
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+@app.post("/auth/logout")
+async def logout(request: Request) -> JSONResponse:
+    """Отзыв текущего access токена и всех refresh токенов его семейства
+
+    :param request: HTTP-запрос с payload токена в request.state.token
+    :type request: Request
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    payload = request.state.token
+    entries = [(payload["jti"], payload["exp"])] if payload.get("jti") else []
+    if payload.get("fam"):
+        entries.append((payload["fam"], time() + REFRESH_EXPIRE.total_seconds()))
+    await AdapterDB.revokeTokens(entries)
+    return successResponse(status_code=status.HTTP_200_OK, revoked=len(entries))
+
+@app.get("/.well-known/jwks.json")
+async def jwks() -> JSONResponse:
+    """Открытые ключи для локальной проверки токенов другими сервисами
+
+    :return: Документ JWKS
+    :rtype: JSONResponse
+    """
+    return JSONResponse(
+        content=keyRing.jwks(),
+        headers={"Cache-Control": "public, max-age=300"}
+    )
\ No newline at end of file
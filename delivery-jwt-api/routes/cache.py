@@ -0,0 +1,22 @@
+from fastapi import status
+from fastapi.responses import JSONResponse
+
+from misc import successResponse
+from loader import AdapterDB, app
+from auth.jwt import tokenCache
+
+
+@app.get("/cache/stats")
+async def cacheStats() -> JSONResponse:
+    """Счетчики попаданий, промахов и вытеснений кэшей
+
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    return successResponse(
+        status_code=status.HTTP_200_OK,
+        users=AdapterDB.usersCache.stats(),
+        orders=AdapterDB.ordersCache.stats(),
+        deliveries=AdapterDB.deliveriesCache.stats(),
+        tokens=tokenCache.stats()
+    )
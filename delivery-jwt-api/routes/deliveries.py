@@ -1,20 +1,43 @@
-from fastapi import status
-from fastapi.responses import JSONResponse
-from validators import DeliveryUpdate, DeliveryBase
+from fastapi import status, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from validators import DeliveryUpdate, DeliveryBase, DeliveryBatchUpdate
+from asyncio import FIRST_COMPLETED, create_task, wait
+from datetime import datetime
+from json import loads
+from logging import getLogger
+from typing import List, Optional, Dict, Any, AsyncIterator
 
-from misc import problemResponse, successResponse
-from loader import AdapterDB, app
-from config import PROHIBITED_DATA_UPDATE_DELIVERY
+from misc import problemResponse, successResponse, modelResponse
+from models import DeliveryBatchResult, OverdueList, Order
+from loader import AdapterDB, DeliveryBuffer, OverdueDeliveries, app
+from middlewaries import requestSession
+from events import broker, Subscription
+from database import deliveryState
+from serialization import dumps
+from config import PROHIBITED_DATA_UPDATE_DELIVERY, DELIVERIES_BATCH_MAX_SIZE, \
+        EVENTS_HEARTBEAT, EVENTS_MAX_TOPICS, ORDERS_PAGE_SIZE, ORDERS_PAGE_MAX_SIZE
 
 
+logger = getLogger(__name__)
+
 @app.patch("/deliveries/{order_id}")
-async def updateDelivery(order_id: int, delivery_data: DeliveryUpdate) -> JSONResponse:
+async def updateDelivery(
+    order_id: int,
+    delivery_data: DeliveryUpdate,
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
     """Обновление данных о доставке
 
+    В режиме DELIVERY_WRITE_BUFFER обновление попадает в буфер отложенной
+    записи и подтверждается кодом 202.
+
     :param order_id: ID доставки
     :type order_id: int
     :param delivery_data: Словарь с data для обновления
     :type delivery_data: DeliveryUpdate
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
     :return: Ответ в формате JSON
     :rtype: JSONResponse
     """
@@ -27,8 +50,16 @@ async def updateDelivery(order_id: int, delivery_data: DeliveryUpdate) -> JSONRe
                 detail=f"Cannot update restricted fields: {', '.join(prohibited_fields)}",
                 invalid_params=[{"field": field, "reason": "read-only"} for field in prohibited_fields]
             )
+    if DeliveryBuffer is not None:
+        if not await DeliveryBuffer.submit(order_id, update_data):
+            return problemResponse(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    title="Delivery not found",
+                    detail=f"Delivery with id {order_id} does not exist"
+                )
+        return successResponse(status_code=status.HTTP_202_ACCEPTED, id=order_id)
     try:
-        success = await AdapterDB.updateDelivery(order_id, **update_data)
+        success = await AdapterDB.updateDelivery(order_id, session=session, **update_data)
         if not success:
             return problemResponse(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -42,4 +73,265 @@ async def updateDelivery(order_id: int, delivery_data: DeliveryUpdate) -> JSONRe
             detail=str(e)
         )
 
-    return successResponse(status_code=status.HTTP_200_OK, id=order_id)
\ No newline at end of file
+    return successResponse(status_code=status.HTTP_200_OK, id=order_id)
+
+@app.patch("/deliveries")
+async def updateDeliveries(
+    deliveries_data: List[DeliveryBatchUpdate],
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
+    """Обновление нескольких доставок в одной транзакции
+
+    Накопленные в DeliveryBuffer обновления записываются раньше пачки.
+
+    :param deliveries_data: Список с order_id и data для обновления
+    :type deliveries_data: List[DeliveryBatchUpdate]
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
+    :return: Ответ в формате JSON с результатом для каждой доставки
+    :rtype: JSONResponse
+    """
+    if not deliveries_data:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail="Batch must contain at least one delivery"
+        )
+    if len(deliveries_data) > DELIVERIES_BATCH_MAX_SIZE:
+        return problemResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            title="Batch too large",
+            detail=f"Batch size must not exceed {DELIVERIES_BATCH_MAX_SIZE} deliveries"
+        )
+    updates = [
+        (item.order_id, item.model_dump(exclude_unset=True, exclude={"order_id"}))
+        for item in deliveries_data
+    ]
+    if DeliveryBuffer is not None:
+        await DeliveryBuffer.flush()
+    try:
+        results = await AdapterDB.updateDeliveries(updates, session=session)
+    except Exception as e:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail=str(e)
+        )
+
+    return modelResponse(
+        status.HTTP_200_OK,
+        {"results": [
+            {"id": order_id, "success": True} if success else
+            {"id": order_id, "success": False, "error": "Delivery not found"}
+            for (order_id, _), success in zip(updates, results)
+        ]},
+        DeliveryBatchResult
+    )
+
+@app.get("/deliveries/overdue")
+async def overdueDeliveries(
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_PAGE_MAX_SIZE)
+) -> JSONResponse:
+    """Доставки, у которых прошел TargetTimeDelivery без завершающего статуса
+
+    Список берется из OverdueTracker в памяти, без запроса к базе.
+
+    :param limit: Максимум доставок, defaults to ORDERS_PAGE_SIZE
+    :type limit: int, optional
+    :return: Ответ в формате JSON, самые давние просрочки первыми
+    :rtype: JSONResponse
+    """
+    if OverdueDeliveries is None:
+        return problemResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="Overdue tracking disabled",
+            detail="Set OVERDUE_TRACKER = True to track overdue deliveries"
+        )
+    now = datetime.now()
+    return modelResponse(
+        status.HTTP_200_OK,
+        {
+            "deliveries": [
+                {
+                    "id": order_id,
+                    "target_time_delivery": target,
+                    "overdue_seconds": round((now - target).total_seconds(), 3)
+                }
+                for order_id, target in OverdueDeliveries.overdue(limit)
+            ],
+            "total": len(OverdueDeliveries)
+        },
+        OverdueList
+    )
+
+def _deliverySnapshot(order: Order) -> Dict[str, Any]:
+    """Текущее состояние доставки в формате события
+
+    Учитывает обновления доставки, еще не записанные из DeliveryBuffer.
+
+    :param order: Объект Order с загруженной доставкой
+    :type order: Order
+    :return: Событие доставки
+    :rtype: Dict[str, Any]
+    """
+    delivery_status, target = deliveryState(order, DeliveryBuffer)
+    return {
+        "order_id": order.ID,
+        "status": delivery_status,
+        "target_time_delivery": target.isoformat() if target else None
+    }
+
+async def _serverSentEvents(
+    subscription: Subscription,
+    snapshot: Dict[str, Any]
+) -> AsyncIterator[bytes]:
+    """Поток SSE: текущее состояние, затем изменения и heartbeat-комментарии
+
+    :param subscription: Подписка на заказ
+    :type subscription: Subscription
+    :param snapshot: Текущее состояние доставки
+    :type snapshot: Dict[str, Any]
+    :return: Асинхронный итератор сообщений SSE
+    :rtype: AsyncIterator[bytes]
+    """
+    heartbeat = EVENTS_HEARTBEAT.total_seconds()
+    try:
+        yield b"event: delivery\ndata: " + dumps(snapshot) + b"\n\n"
+        while True:
+            events = await subscription.get(heartbeat)
+            if not events:
+                yield b": heartbeat\n\n"
+                continue
+            yield b"".join(
+                b"event: delivery\ndata: " + dumps(event) + b"\n\n" for event in events
+            )
+    finally:
+        broker.unsubscribe(subscription)
+
+@app.get("/deliveries/{order_id}/events")
+async def deliveryEvents(
+    order_id: int,
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> StreamingResponse:
+    """Поток изменений статуса доставки в формате Server-Sent Events
+
+    Первое событие содержит текущее состояние, дальше приходят только
+    изменения. Медленный клиент получает последнее значение каждого поля.
+
+    :param order_id: ID заказа
+    :type order_id: int
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
+    :return: Поток text/event-stream
+    :rtype: StreamingResponse
+    """
+    subscription = broker.subscribe([order_id])
+    order = await AdapterDB.getOrder(order_id, session=session)
+    if not order:
+        broker.unsubscribe(subscription)
+        return problemResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="Delivery not found",
+            detail=f"Delivery with id {order_id} does not exist"
+        )
+    return StreamingResponse(
+        _serverSentEvents(subscription, _deliverySnapshot(order)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _orderIds(values: List[Any]) -> bool:
+    """Проверяет, что все ID заказов в команде клиента целые числа
+
+    bool не принимается, хотя и является подклассом int.
+    """
+    return all(type(value) is int for value in values)
+
+async def _subscribeOrders(
+    websocket: WebSocket,
+    subscription: Subscription,
+    order_ids: List[Any]
+) -> None:
+    """Подписывает WebSocket на заказы и отправляет их текущее состояние"""
+    if not _orderIds(order_ids):
+        await websocket.send_text('{"type":"error","detail":"Order ids must be integers"}')
+        return
+    order_ids = list(dict.fromkeys(order_ids))
+    order_ids = [order_id for order_id in order_ids if order_id not in subscription.topics]
+    if len(subscription.topics) + len(order_ids) > EVENTS_MAX_TOPICS:
+        await websocket.send_text(dumps({
+            "type": "error",
+            "detail": f"Subscription must not exceed {EVENTS_MAX_TOPICS} orders"
+        }).decode())
+        return
+    broker.subscribe(order_ids, subscription)
+    found, missing = [], []
+    for order_id in order_ids:
+        order = await AdapterDB.getOrder(order_id)
+        if order is None:
+            missing.append(order_id)
+            continue
+        found.append(order_id)
+        await websocket.send_text(dumps({"type": "delivery", **_deliverySnapshot(order)}).decode())
+    broker.unsubscribe(subscription, missing)
+    await websocket.send_text(dumps({
+        "type": "subscribed", "orders": found, "not_found": missing
+    }).decode())
+
+async def _receiveCommands(websocket: WebSocket, subscription: Subscription) -> None:
+    """Обрабатывает команды клиента subscribe/unsubscribe до отключения"""
+    while True:
+        try:
+            message = loads(await websocket.receive_text())
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            await websocket.send_text('{"type":"error","detail":"Invalid message"}')
+            continue
+        if isinstance(message.get("subscribe"), list):
+            await _subscribeOrders(websocket, subscription, message["subscribe"])
+        if isinstance(message.get("unsubscribe"), list):
+            if not _orderIds(message["unsubscribe"]):
+                await websocket.send_text('{"type":"error","detail":"Order ids must be integers"}')
+                continue
+            broker.unsubscribe(subscription, [
+                order_id for order_id in message["unsubscribe"]
+                if order_id in subscription.topics
+            ])
+
+@app.websocket("/deliveries/events")
+async def deliveryEventsFeed(websocket: WebSocket) -> None:
+    """WebSocket-лента изменений доставок для нескольких заказов
+
+    Клиент отправляет {"subscribe": [ID, ...]} и {"unsubscribe": [ID, ...]},
+    сервер присылает текущее состояние подписанных заказов, события
+    {"type": "delivery", ...} и {"type": "heartbeat"} при отсутствии событий.
+
+    :param websocket: WebSocket-соединение
+    :type websocket: WebSocket
+    """
+    await websocket.accept()
+    heartbeat = EVENTS_HEARTBEAT.total_seconds()
+    subscription = Subscription()
+    receiver = create_task(_receiveCommands(websocket, subscription))
+    try:
+        while True:
+            getter = create_task(subscription.get(heartbeat))
+            done, _ = await wait({receiver, getter}, return_when=FIRST_COMPLETED)
+            if receiver in done:
+                getter.cancel()
+                error = receiver.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.error("Delivery events feed failed", exc_info=error)
+                    await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+                break
+            events = getter.result()
+            if not events:
+                await websocket.send_text('{"type":"heartbeat"}')
+            for event in events:
+                await websocket.send_text(dumps({"type": "delivery", **event}).decode())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        broker.unsubscribe(subscription)
\ No newline at end of file
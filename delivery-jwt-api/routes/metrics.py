@@ -0,0 +1,17 @@
+from fastapi import Response
+
+from loader import app
+from metrics import registry
+
+
+@app.get("/metrics", include_in_schema=False)
+async def exportMetrics() -> Response:
+    """Метрики сервиса в текстовом формате Prometheus
+
+    :return: Текст экспозиции Prometheus
+    :rtype: Response
+    """
+    return Response(
+        content=registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
\ No newline at end of file
@@ -1,21 +1,69 @@
-from fastapi import status
-from fastapi.responses import JSONResponse
+from fastapi import status, Query, Header, Response, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from misc import problemResponse, successResponse
+from csv import writer
+from datetime import datetime
+from io import StringIO
+from typing import List, Optional, Any, AsyncIterator, Literal, Union
+
+from misc import problemResponse, successResponse, modelResponse, encodeCursor, \
+        decodeCursor, makeETag, etagMatches
+from models import Order, OrderResponse, OrderExportRow, OrderPage, OrderSearchPage
+from serialization import dumpModel, typeAdapter
 from validators import OrderCreate
-from loader import AdapterDB, app
+from database import searchQuery, deliveryState
+from loader import AdapterDB, DeliveryBuffer, app
+from middlewaries import requestSession
+from config import ORDERS_BATCH_MAX_SIZE, ORDERS_PAGE_SIZE, ORDERS_PAGE_MAX_SIZE, \
+        ORDERS_EXPORT_CHUNK_SIZE, SEARCH_MAX_RESULTS, SEARCH_MAX_TERMS
+
+
+def _serializeOrder(order: Order) -> OrderResponse:
+    """Формирует представление заказа и его доставки для ответа
 
+    Учитывает обновления доставки, еще не записанные из DeliveryBuffer.
+
+    :param order: Объект Order с загруженной доставкой
+    :type order: Order
+    :return: Данные заказа
+    :rtype: OrderResponse
+    """
+    delivery_status, target = deliveryState(order, DeliveryBuffer)
+    return {
+        "id": order.ID,
+        "description": order.Description,
+        "status": delivery_status,
+        "target_time_delivery": target,
+        "dimensions": order.Dimensions,
+        "weight": order.Weight,
+        "deliveryAddress": order.DeliveryAddress,
+        "pickUpAddress": order.PickUpAddress,
+        "name": order.Name,
+        "creation_date": order.CreationDate
+    }
+
+
+EXPORT_COLUMNS = (
+    "id", "name", "description", "pickUpAddress", "deliveryAddress", "weight",
+    "dimensions", "status", "target_time_delivery", "creation_date", "cursor"
+)
 
 @app.delete("/orders/{order_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def deleteOrder(order_id: int) -> JSONResponse:
+async def deleteOrder(
+    order_id: int,
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
     """Удаляет Order
 
     :param order_id: ID ордера
     :type order_id: int
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
     :return: Ответ в формате JSON
     :rtype: JSONResponse
     """
-    success = await AdapterDB.deleteOrder(order_id)
+    success = await AdapterDB.deleteOrder(order_id, session=session)
     if not success:
         return problemResponse(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -25,11 +73,16 @@ async def deleteOrder(order_id: int) -> JSONResponse:
     return successResponse(status_code=status.HTTP_200_OK, id=order_id)
 
 @app.post("/orders", status_code=status.HTTP_201_CREATED)
-async def createOrder(order_data: OrderCreate) -> JSONResponse:
+async def createOrder(
+    order_data: OrderCreate,
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
     """Создание нового Order
 
     :param order_data: Информация для создания заказа
     :type order_data: OrderCreate
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
     :return: Ответ в формате JSON
     :rtype: JSONResponse
     """
@@ -40,7 +93,8 @@ async def createOrder(order_data: OrderCreate) -> JSONResponse:
             delivery=order_data.deliveryAddress,
             weight=order_data.weight,
             dimensions=order_data.dimensions,
-            description=order_data.description
+            description=order_data.description,
+            session=session
         )
                 
         return successResponse(
@@ -61,33 +115,287 @@ async def createOrder(order_data: OrderCreate) -> JSONResponse:
             detail=f"An unexpected error occurred: {e}",
         )
 
+@app.post("/orders/batch", status_code=status.HTTP_201_CREATED)
+async def createOrders(
+    orders_data: List[OrderCreate],
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
+    """Создание пачки Order в одной транзакции
+
+    :param orders_data: Список заказов для создания
+    :type orders_data: List[OrderCreate]
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
+    :return: Ответ в формате JSON с ID каждого созданного заказа
+    :rtype: JSONResponse
+    """
+    if not orders_data:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail="Batch must contain at least one order",
+        )
+    if len(orders_data) > ORDERS_BATCH_MAX_SIZE:
+        return problemResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            title="Batch too large",
+            detail=f"Batch size must not exceed {ORDERS_BATCH_MAX_SIZE} orders",
+        )
+    try:
+        ids = await AdapterDB.createOrders([
+            {
+                "name": order_data.name,
+                "pickup": order_data.pickUpAddress,
+                "delivery": order_data.deliveryAddress,
+                "weight": order_data.weight,
+                "dimensions": order_data.dimensions,
+                "description": order_data.description
+            }
+            for order_data in orders_data
+        ], session=session)
+    except Exception as e:
+        return problemResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            title="Internal server error",
+            detail=f"An unexpected error occurred: {e}",
+        )
+    return successResponse(
+        status_code=status.HTTP_201_CREATED,
+        results=[{"index": index, "id": ID} for index, ID in enumerate(ids)]
+    )
+
+@app.get("/orders")
+async def listOrders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    target_from: Optional[datetime] = None,
+    target_to: Optional[datetime] = None,
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_PAGE_MAX_SIZE),
+    cursor: Optional[str] = None,
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
+    """Список заказов с фильтрами и keyset-пагинацией по (CreationDate, ID)
+
+    :param status_filter: Статус доставки, defaults to None
+    :type status_filter: Optional[str], optional
+    :param created_from: Начало диапазона CreationDate, defaults to None
+    :type created_from: Optional[datetime], optional
+    :param created_to: Конец диапазона CreationDate (не включая), defaults to None
+    :type created_to: Optional[datetime], optional
+    :param target_from: Начало диапазона TargetTimeDelivery, defaults to None
+    :type target_from: Optional[datetime], optional
+    :param target_to: Конец диапазона TargetTimeDelivery (не включая), defaults to None
+    :type target_to: Optional[datetime], optional
+    :param limit: Размер страницы, defaults to ORDERS_PAGE_SIZE
+    :type limit: int, optional
+    :param cursor: Курсор next_cursor из предыдущей страницы, defaults to None
+    :type cursor: Optional[str], optional
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    try:
+        position = decodeCursor(cursor) if cursor else None
+    except ValueError as e:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail=str(e),
+        )
+    orders = await AdapterDB.listOrders(
+        limit + 1,
+        position,
+        session=session,
+        status=status_filter,
+        created_from=created_from,
+        created_to=created_to,
+        target_from=target_from,
+        target_to=target_to
+    )
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encodeCursor(orders[-1].CreationDate, orders[-1].ID)
+    return modelResponse(
+        status.HTTP_200_OK,
+        {"orders": [_serializeOrder(order) for order in orders], "next_cursor": next_cursor},
+        OrderPage
+    )
+
+async def _exportRows(
+    export_format: str,
+    position: Optional[Any],
+    **filters: Any
+) -> AsyncIterator[Union[str, bytes]]:
+    """Формирует строки выгрузки заказов по частям
+
+    Каждая строка содержит cursor для продолжения выгрузки после обрыва.
+
+    :param export_format: Формат выгрузки: ndjson или csv
+    :type export_format: str
+    :param position: Позиция, после которой продолжить выгрузку
+    :type position: Optional[Any]
+    :return: Асинхронный итератор частей выгрузки
+    :rtype: AsyncIterator[Union[str, bytes]]
+    """
+    buffer = StringIO()
+    csv_writer = writer(buffer)
+    if export_format == "csv":
+        csv_writer.writerow(EXPORT_COLUMNS)
+    async for orders in AdapterDB.streamOrders(ORDERS_EXPORT_CHUNK_SIZE, position, **filters):
+        rows: List[OrderExportRow] = []
+        for order in orders:
+            row = _serializeOrder(order)
+            row["cursor"] = encodeCursor(order.CreationDate, order.ID)
+            rows.append(row)
+        if export_format != "csv":
+            yield b"".join(dumpModel(row, OrderExportRow) + b"\n" for row in rows)
+            continue
+        for row in typeAdapter(List[OrderExportRow]).dump_python(rows, mode="json"):
+            csv_writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.get("/orders/export")
+async def exportOrders(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    target_from: Optional[datetime] = None,
+    target_to: Optional[datetime] = None,
+    cursor: Optional[str] = None
+) -> StreamingResponse:
+    """Потоковая выгрузка всех заказов с доставкой в NDJSON или CSV
+
+    Фильтры совпадают с GET /orders, cursor из последней полученной строки
+    продолжает выгрузку после обрыва соединения.
+
+    :param export_format: Формат выгрузки, defaults to "ndjson"
+    :type export_format: str, optional
+    :param cursor: cursor последней полученной строки, defaults to None
+    :type cursor: Optional[str], optional
+    :return: Потоковый ответ
+    :rtype: StreamingResponse
+    """
+    try:
+        position = decodeCursor(cursor) if cursor else None
+    except ValueError as e:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail=str(e),
+        )
+    return StreamingResponse(
+        _exportRows(
+            export_format,
+            position,
+            status=status_filter,
+            created_from=created_from,
+            created_to=created_to,
+            target_from=target_from,
+            target_to=target_to
+        ),
+        media_type="text/csv" if export_format == "csv" else "application/x-ndjson"
+    )
+
+@app.get("/orders/search")
+async def searchOrders(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(ORDERS_PAGE_SIZE, ge=1, le=ORDERS_PAGE_MAX_SIZE),
+    offset: int = Query(0, ge=0, lt=SEARCH_MAX_RESULTS),
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> JSONResponse:
+    """Полнотекстовый поиск заказов по названию и адресам, лучшие совпадения первыми
+
+    Каждое слово q ищется как префикс слова в Name, PickUpAddress или
+    DeliveryAddress, все слова обязательны. Ранжируются SEARCH_MAX_RESULTS
+    самых новых совпадений.
+
+    :param q: Строка поиска
+    :type q: str
+    :param limit: Размер страницы, defaults to ORDERS_PAGE_SIZE
+    :type limit: int, optional
+    :param offset: Сколько результатов пропустить, next_offset предыдущей страницы, defaults to 0
+    :type offset: int, optional
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    if not AdapterDB.searchAvailable:
+        return problemResponse(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            title="Search unavailable",
+            detail="Order search requires SQLite with FTS5"
+        )
+    match = searchQuery(q, SEARCH_MAX_TERMS)
+    if match is None:
+        return problemResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid input data",
+            detail="Search query must contain at least one word"
+        )
+    results = await AdapterDB.searchOrders(match, limit + 1, offset, session=session)
+    next_offset = None
+    if len(results) > limit:
+        results = results[:limit]
+        if offset + limit < SEARCH_MAX_RESULTS:
+            next_offset = offset + limit
+    return modelResponse(
+        status.HTTP_200_OK,
+        {
+            "orders": [dict(_serializeOrder(order), rank=rank) for order, rank in results],
+            "next_offset": next_offset
+        },
+        OrderSearchPage
+    )
+
 @app.get("/orders/{order_id}")
-async def getOrder(order_id: int) -> JSONResponse:
+async def getOrder(
+    order_id: int,
+    if_none_match: Optional[str] = Header(None),
+    session: Optional[AsyncSession] = Depends(requestSession)
+) -> Response:
     """Получение информации о заказе и его доставке
 
+    Сериализованный ответ кэшируется, при совпадении If-None-Match
+    возвращается 304 без обращения к базе данных. Ответ не попадает
+    в кэш, если заказ изменили, пока он читался.
+
     :param order_id: ID заказа
     :type order_id: int
+    :param if_none_match: ETag, сохраненный клиентом, defaults to None
+    :type if_none_match: Optional[str], optional
+    :param session: Сессия запроса, defaults to Depends(requestSession)
+    :type session: Optional[AsyncSession], optional
     :return: Ответ в формате JSON
-    :rtype: JSONResponse
+    :rtype: Response
     """
-    order = await AdapterDB.getOrder(order_id)
-    if not order:
-        return problemResponse(
-            status_code=status.HTTP_404_NOT_FOUND,
-            title="Order not found",
-            detail=f"Order with id {order_id} not found",
-        )
-    return successResponse(
+    cached = AdapterDB.ordersCache.get(order_id)
+    if cached is None:
+        version = AdapterDB.ordersCache.version()
+        order = await AdapterDB.getOrder(order_id, session=session)
+        if not order:
+            return problemResponse(
+                status_code=status.HTTP_404_NOT_FOUND,
+                title="Order not found",
+                detail=f"Order with id {order_id} not found",
+            )
+        body = modelResponse(status.HTTP_200_OK, _serializeOrder(order), OrderResponse).body
+        cached = (body, makeETag(body))
+        AdapterDB.ordersCache.set(order_id, cached, since=version)
+    body, etag = cached
+    if etagMatches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(
+        content=body,
         status_code=status.HTTP_200_OK,
-        id=order.ID,
-        description=order.Description,
-        status=order.delivery.Status,
-        target_time_delivery=order.delivery.TargetTimeDelivery.isoformat() \
-                 if order.delivery.TargetTimeDelivery else None,
-        dimensions=order.Dimensions,
-        weight=order.Weight,
-        deliveryAddress=order.DeliveryAddress,
-        pickUpAddress=order.PickUpAddress,
-        name=order.Name,
-        creation_date=order.CreationDate.isoformat()   
+        media_type="application/json",
+        headers={"ETag": etag}
     )
\ No newline at end of file
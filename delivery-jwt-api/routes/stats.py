@@ -0,0 +1,34 @@
+from fastapi import status, Query
+from fastapi.responses import JSONResponse
+
+from misc import modelResponse
+from models import ServiceStats
+from loader import AdapterDB, DeliveryStats, app
+from config import STATS_HOURS, STATS_MAX_HOURS
+
+
+@app.get("/stats")
+async def serviceStats(hours: int = Query(STATS_HOURS, ge=1, le=STATS_MAX_HOURS)) -> JSONResponse:
+    """Количество доставок по статусам и заказов по часам
+
+    Значения берутся из копии агрегатов в памяти, которая перечитывает
+    небольшие таблицы status_counts и orders_per_hour не чаще STATS_MAX_AGE.
+
+    :param hours: Количество последних часов, включая текущий, defaults to STATS_HOURS
+    :type hours: int, optional
+    :return: Ответ в формате JSON
+    :rtype: JSONResponse
+    """
+    await DeliveryStats.refresh(AdapterDB.loadStats)
+    deliveries = dict(sorted(DeliveryStats.statuses.items()))
+    return modelResponse(
+        status.HTTP_200_OK,
+        {
+            "deliveries": deliveries,
+            "total": sum(deliveries.values()),
+            "orders_per_hour": [
+                {"hour": hour, "count": count} for hour, count in DeliveryStats.series(hours)
+            ]
+        },
+        ServiceStats
+    )
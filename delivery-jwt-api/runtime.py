@@ -0,0 +1,35 @@
+from typing import Dict, Tuple
+
+
+WORKER = "worker"
+SHARED = "shared"
+
+_declarations: Dict[str, Tuple[str, str]] = {}
+
+
+def declareState(name: str, scope: str, description: str) -> None:
+    """Объявляет состояние, которое живет в памяти процесса
+
+    При запуске нескольких воркеров каждый процесс получает свою копию
+    состояния: WORKER - копии независимы и могут расходиться,
+    SHARED - копии синхронизируются через базу данных или брокер событий.
+
+    :param name: Имя состояния
+    :type name: str
+    :param scope: WORKER или SHARED
+    :type scope: str
+    :param description: Что происходит с состоянием при нескольких воркерах
+    :type description: str
+    :raises ValueError: Если scope неизвестен
+    """
+    if scope not in (WORKER, SHARED):
+        raise ValueError(f"Unknown state scope: {scope}")
+    _declarations[name] = (scope, description)
+
+def stateDeclarations() -> Dict[str, Tuple[str, str]]:
+    """Возвращает объявленные состояния процесса
+
+    :return: Имя состояния -> (scope, описание)
+    :rtype: Dict[str, Tuple[str, str]]
+    """
+    return dict(_declarations)
\ No newline at end of file
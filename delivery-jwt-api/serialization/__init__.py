@@ -0,0 +1,6 @@
+from .backends import BACKENDS, dumps, dumpModel, registerBackend, typeAdapter, useBackend
+from .responses import SerializedResponse, successBody, problemBody
+
+from config import JSON_BACKEND
+
+useBackend(JSON_BACKEND)
\ No newline at end of file
@@ -0,0 +1,110 @@
+from datetime import date, datetime
+from functools import lru_cache
+from json import dumps as stdlibDumps
+
+from pydantic import BaseModel, TypeAdapter
+
+from typing import Any, Callable, Dict
+
+try:
+    from orjson import dumps as orjsonDumps
+except ImportError:
+    orjsonDumps = None
+
+
+def _default(value: Any) -> Any:
+    """Приводит типы, которые JSON-бэкенд не кодирует сам
+
+    :param value: Значение
+    :type value: Any
+    :raises TypeError: Если тип не поддерживается
+    :return: Значение, пригодное для JSON
+    :rtype: Any
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _stdlib(content: Any) -> bytes:
+    return stdlibDumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default
+    ).encode("utf-8")
+
+def _orjson(content: Any) -> bytes:
+    return orjsonDumps(content, default=_default)
+
+
+BACKENDS: Dict[str, Callable[[Any], bytes]] = {"stdlib": _stdlib}
+if orjsonDumps is not None:
+    BACKENDS["orjson"] = _orjson
+
+_dumps: Callable[[Any], bytes] = _stdlib
+
+
+def registerBackend(name: str, dumps: Callable[[Any], bytes]) -> None:
+    """Регистрирует JSON-бэкенд
+
+    :param name: Имя бэкенда
+    :type name: str
+    :param dumps: Функция, кодирующая объект в UTF-8 JSON
+    :type dumps: Callable[[Any], bytes]
+    """
+    BACKENDS[name] = dumps
+
+def useBackend(name: str = "auto") -> str:
+    """Выбирает JSON-бэкенд для всех ответов
+
+    "auto" выбирает orjson, если он установлен, иначе stdlib.
+
+    :param name: Имя бэкенда, defaults to "auto"
+    :type name: str, optional
+    :raises ValueError: Если бэкенд не зарегистрирован
+    :return: Имя выбранного бэкенда
+    :rtype: str
+    """
+    global _dumps
+    if name == "auto":
+        name = "orjson" if "orjson" in BACKENDS else "stdlib"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    _dumps = BACKENDS[name]
+    return name
+
+def dumps(content: Any) -> bytes:
+    """Кодирует объект в компактный UTF-8 JSON выбранным бэкендом
+
+    :param content: Объект
+    :type content: Any
+    :return: JSON
+    :rtype: bytes
+    """
+    return _dumps(content)
+
+@lru_cache(maxsize=None)
+def typeAdapter(model: Any) -> TypeAdapter:
+    """Возвращает TypeAdapter для типа, создавая его один раз
+
+    :param model: Тип ответа
+    :type model: Any
+    :return: TypeAdapter
+    :rtype: TypeAdapter
+    """
+    return TypeAdapter(model)
+
+def dumpModel(payload: Any, model: Any, **options: Any) -> bytes:
+    """Кодирует ответ по типизированной модели через закэшированный TypeAdapter
+
+    :param payload: Данные ответа
+    :type payload: Any
+    :param model: Модель ответа (см. models.responses)
+    :type model: Any
+    :return: JSON
+    :rtype: bytes
+    """
+    return typeAdapter(model).dump_json(payload, **options)
\ No newline at end of file
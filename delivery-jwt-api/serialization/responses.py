@@ -0,0 +1,53 @@
+from fastapi.responses import JSONResponse
+
+from typing import Any, Mapping, Optional
+
+from .backends import dumps, dumpModel
+
+
+SUCCESS_PREFIX = b'{"success":true,"data":'
+PROBLEM_PREFIX = b'{"success":false,"data":'
+ENVELOPE_SUFFIX = b"}"
+
+
+class SerializedResponse(JSONResponse):
+    """JSONResponse, который кодирует содержимое выбранным JSON-бэкендом
+    и принимает уже закодированное тело как есть"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def successBody(data: Any, model: Optional[Any] = None, **options: Any) -> bytes:
+    """Собирает тело успешного ответа из заранее закодированного конверта
+
+    Без модели data кодируется JSON-бэкендом, с моделью - через TypeAdapter,
+    options передаются в TypeAdapter.dump_json.
+
+    :param data: Содержимое data
+    :type data: Any
+    :param model: Модель ответа, defaults to None
+    :type model: Optional[Any], optional
+    :return: JSON
+    :rtype: bytes
+    """
+    payload = dumps(data) if model is None else dumpModel(data, model, **options)
+    return b"".join((SUCCESS_PREFIX, payload, ENVELOPE_SUFFIX))
+
+def problemBody(data: Mapping[str, Any], extra: Optional[Mapping[str, Any]] = None) -> bytes:
+    """Собирает тело ответа с ошибкой из заранее закодированного конверта
+
+    :param data: Содержимое data
+    :type data: Mapping[str, Any]
+    :param extra: Дополнительные поля верхнего уровня, defaults to None
+    :type extra: Optional[Mapping[str, Any]], optional
+    :return: JSON
+    :rtype: bytes
+    """
+    parts = [PROBLEM_PREFIX, dumps(data)]
+    if extra:
+        parts.append(b"," + dumps(extra)[1:-1])
+    parts.append(ENVELOPE_SUFFIX)
+    return b"".join(parts)
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""Запуск сервиса в одном или нескольких процессах
+
+Запуск из каталога delivery-jwt-api:
+    python server.py --workers 4
+
+Схема базы данных создается один раз до запуска воркеров. Каждый воркер
+создает движок базы данных, пул соединений и фоновые задачи в lifespan,
+поэтому приложение безопасно и для prefork-серверов:
+    python manage.py create-schema
+    gunicorn main:app -k uvicorn.workers.UvicornWorker -w 4 --preload
+"""
+from argparse import ArgumentParser
+from asyncio import run as runAsync
+from logging import basicConfig, getLogger, INFO
+from os import cpu_count
+
+from uvicorn import run
+
+from runtime import stateDeclarations, WORKER
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS
+
+
+logger = getLogger("server")
+
+
+def resolveWorkers(workers: int) -> int:
+    """Количество воркеров, 0 - по числу ядер
+
+    :param workers: Запрошенное количество воркеров
+    :type workers: int
+    :return: Количество воркеров
+    :rtype: int
+    """
+    return workers if workers > 0 else cpu_count() or 1
+
+def reportState() -> None:
+    """Логирует состояние, которое у каждого воркера свое"""
+    import main  # noqa: F401 - собирает объявления состояния всех модулей
+
+    for name, (scope, description) in sorted(stateDeclarations().items()):
+        if scope == WORKER:
+            logger.warning("Per-worker state %s: %s", name, description)
+
+async def createSchema() -> None:
+    """Создает схему базы данных, пересчитывает агрегаты и индекс поиска при создании"""
+    from loader import AdapterDB
+
+    await AdapterDB.init()
+    await AdapterDB.close()
+
+def main(host: str, port: int, workers: int) -> None:
+    workers = resolveWorkers(workers)
+    runAsync(createSchema())
+    if workers > 1:
+        reportState()
+    logger.info("Starting %d worker(s) on %s:%d", workers, host, port)
+    run("main:app", host=host, port=port, workers=workers)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    arguments = parser.parse_args()
+    basicConfig(level=INFO, format="%(levelname)s: %(message)s")
+    main(arguments.host, arguments.port, arguments.workers)
\ No newline at end of file
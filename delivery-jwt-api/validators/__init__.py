@@ -1,2 +1,2 @@
-from .deliveries import DeliveryBase, DeliveryUpdate
+from .deliveries import DeliveryBase, DeliveryUpdate, DeliveryBatchUpdate
 from .orders import OrderBase, OrderCreate, OrderDelete
\ No newline at end of file
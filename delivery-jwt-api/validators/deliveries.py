@@ -17,4 +17,7 @@ class DeliveryUpdate(BaseModel):
             raise ValueError(
                 "A mandatory parametr skipped: TargetTimeDelivery or Status needed"
             )
-        return self
\ No newline at end of file
+        return self
+
+class DeliveryBatchUpdate(DeliveryUpdate):
+    order_id: int
\ No newline at end of file